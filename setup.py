@@ -72,6 +72,7 @@ setuptools.setup(
     extras_require={
         "preview": ["PyQtWebEngine==5.15.5"],
         "ftml": ["PyQtWebEngine==5.15.5", "pyftml==0.1.2"],
+        "power": ["psutil==5.8.0"],
     },
     package_dir={"skippy": "skippy"},
     package_data={
@@ -2,6 +2,9 @@
 """
 from skippy.app import run
 
+import multiprocessing
+
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     run()
@@ -2,8 +2,6 @@
 # Decorator decorator is a simplified version of the code from the funcy lib.
 # https://github.com/Suor/funcy
 ###############################################################################
-from skippy.gui import CriticalMessageBox
-
 from skippy.utils.logger import log
 
 import functools
@@ -57,6 +55,8 @@ def critical(call):
     try:
         return call()
     except Exception as error:
+        from skippy.gui import CriticalMessageBox
+
         log.error(error, exc_info=True)
         CriticalMessageBox(type(error).__name__, traceback.format_exc())
 
@@ -1,14 +1,12 @@
 """Initialization of Skippy and application-wide things.
 """
-from skippy.gui import start_ui
-
-from skippy.core import plugins
-
-from skippy.utils import logger, standarddir, discord_rpc, excepthook
+from skippy.utils import logger, standarddir
 import skippy.config
 
 from prettytable import PrettyTable
+from pathlib import Path
 import argparse
+import json
 import sys
 
 
@@ -39,6 +37,25 @@ def get_argparser() -> argparse.ArgumentParser:
         default="INFO",
     )
 
+    subparsers = parser.add_subparsers(dest="command")
+    render = subparsers.add_parser(
+        "render", help="render session file or directory of page sources to HTML - will not run the ui"
+    )
+    render.add_argument("source", type=Path, help="session JSON file or directory of page sources")
+    render.add_argument(
+        "-o", "--output", type=Path, default=Path("rendered"), help="output folder - defaults to ./rendered"
+    )
+    render.add_argument(
+        "-j", "--jobs", type=int, default=None, help="count of worker processes - defaults to count of CPU cores"
+    )
+    render.add_argument("--site", help="site of pages in directory, used for themes and ListPages")
+    render.add_argument(
+        "--offline",
+        action="store_true",
+        help="render without network - offline renderer, includes, themes and page index from local caches only",
+    )
+    render.add_argument("--report", type=Path, help="file to write JSON report to - defaults to stdout")
+
     return parser
 
 
@@ -64,8 +81,10 @@ class App:
             self.version()
         elif self.args.plugins:
             self.plugins()
+        elif self.args.command == "render":
+            return self.render()
         else:
-            self.start_ui()
+            return self.start_ui()
 
     def version(self):
         """Print Skippy version"""
@@ -73,6 +92,9 @@ class App:
 
     def plugins(self):
         """Print plugins list with additional data"""
+        import skippy.gui  # plugin system depends on GUI, which must be imported first
+        from skippy.core import plugins
+
         table = PrettyTable()
         table.field_names = ["Alias", "Description", "Author", "Version"]
 
@@ -88,12 +110,38 @@ class App:
 
         print(table)
 
+    def render(self) -> int:
+        """Render pages without GUI and print JSON report
+
+        Returns:
+            int: Exit code (1 if any page failed)
+        """
+        from skippy.core import batch
+
+        logger.log.setLevel(logger.LOG_LEVELS[self.args.logging_level])
+        standarddir.initdirs()
+
+        pages = batch.load(self.args.source, self.args.site)
+        report = batch.render(pages, self.args.output, self.args.jobs, self.args.offline)
+
+        data = json.dumps(report, ensure_ascii=False, indent=2)
+        if self.args.report is not None:
+            self.args.report.write_text(data, encoding="utf-8")
+        else:
+            print(data)
+        return 1 if report["failed"] else 0
+
     def start_ui(self) -> int:
         """Initialize everything and run the application.
 
         Returns:
             int: Exit code
         """
+        from skippy.gui import start_ui
+        from skippy.core import plugins
+        from skippy.utils import discord_rpc, excepthook
+
+        excepthook.init()
         logger.log.setLevel(logger.LOG_LEVELS[self.args.logging_level])
 
         standarddir.initdirs()
@@ -128,8 +176,6 @@ class App:
 
 def run():
     """Initialize everything and run the application."""
-    excepthook.init()
-
     parser = get_argparser()
 
     app = App(parser.parse_args())
@@ -1,6 +1,10 @@
 """Configures various variables used by Skippy.
 
 Attributes:
+    ASSETS_FOLDER (Path): Theme assets bundle folder
+    CACHE_FOLDER (Path): Cache folder
+    FILES_FOLDER (Path): Content-addressed store of page attachments
+    INDEX_FILE (Path): SQLite database of site page indexes
     LANG_FOLDER (Path): Language folder
     LOGS_FOLDER (Path): Logs folder
     PLUGINS_FOLDER (Path): Plugins folder
@@ -25,6 +29,14 @@ RESOURCES_FOLDER = SKIPPY_FOLDER / "resources"
 
 PROPERTY_FOLDER = SKIPPY_FOLDER / "property"
 
+CACHE_FOLDER = PROPERTY_FOLDER / "cache"
+
+ASSETS_FOLDER = PROPERTY_FOLDER / "assets"
+
+FILES_FOLDER = PROPERTY_FOLDER / "files"
+
+INDEX_FILE = PROPERTY_FOLDER / "sites.sqlite"
+
 LOGS_FOLDER = SKIPPY_FOLDER / "logs"
 
 LANG_FOLDER = SKIPPY_FOLDER / "lang"
@@ -36,8 +48,18 @@ if is_frozen():
 
     PROPERTY_FOLDER = APPDATA_FOLDER / "property"
 
+    CACHE_FOLDER = PROPERTY_FOLDER / "cache"
+
+    ASSETS_FOLDER = PROPERTY_FOLDER / "assets"
+
+    FILES_FOLDER = PROPERTY_FOLDER / "files"
+
+    INDEX_FILE = PROPERTY_FOLDER / "sites.sqlite"
+
     LOGS_FOLDER = APPDATA_FOLDER / "logs"
 
     PLUGINS_FOLDER = APPDATA_FOLDER / "plugins"
 
-LOG_FILE = LOGS_FOLDER / f"{datetime.datetime.today().strftime('%Y-%m-%d-%H-%M-%S')}.log"
+LOG_FILE = Path(os.environ["SKIPPY_LOG_FILE"]) if "SKIPPY_LOG_FILE" in os.environ else (
+    LOGS_FOLDER / f"{datetime.datetime.today().strftime('%Y-%m-%d-%H-%M-%S')}.log"
+)
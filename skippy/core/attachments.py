@@ -0,0 +1,198 @@
+"""Page attachments shared between tabs and previewer
+
+Attributes:
+    PLACEHOLDER (str): Tab key of attachment URLs in cached pages
+    SCHEME (str): URL scheme used by previewer to request attachments
+"""
+from skippy.api import Singleton
+
+from skippy.core.filestore import AttachmentStore
+
+from multiprocessing import shared_memory
+from typing import Optional, NamedTuple, Iterator, Mapping, Iterable, Dict
+from urllib.parse import quote
+import threading
+import hashlib
+import base64
+import uuid
+
+
+SCHEME = "skippy-file"
+
+PLACEHOLDER = "skippy-tab"
+
+
+class AttachmentRegistry(metaclass=Singleton):
+
+    """Registry of attachments by tab key
+
+    Files dicts are stored by reference, so attachments added to a tab after
+    registration are available without registering it again.
+    """
+
+    def __init__(self):
+        """Initializing attachment registry"""
+        self._files: Dict[str, Dict[str, str]] = {}
+        self._lock = threading.Lock()
+
+    def register(self, files: Dict[str, str], key: Optional[str] = None) -> str:
+        """Register files dict of a tab
+
+        Args:
+            files (Dict[str, str]): Files dict (name -> base64 source or stored file reference)
+            key (Optional[str], optional): Tab key (default - new random key)
+
+        Returns:
+            str: Tab key
+        """
+        key = key or uuid.uuid4().hex
+        with self._lock:
+            self._files[key] = files
+        return key
+
+    def registered(self, key: str) -> bool:
+        """Check if tab key is registered
+
+        Args:
+            key (str): Tab key
+
+        Returns:
+            bool: Is key registered
+        """
+        return key in self._files
+
+    def unregister(self, key: str):
+        """Remove files dict of a tab
+
+        Args:
+            key (str): Tab key
+        """
+        with self._lock:
+            self._files.pop(key, None)
+
+    def key(self, files: Dict[str, str]) -> Optional[str]:
+        """Get key of registered files dict
+
+        Args:
+            files (Dict[str, str]): Files dict
+
+        Returns:
+            Optional[str]: Tab key or None if files dict is not registered
+        """
+        with self._lock:
+            for key, registered in self._files.items():
+                if registered is files:
+                    return key
+        return None
+
+    def read(self, key: str, name: str) -> Optional[bytes]:
+        """Read attachment
+
+        Args:
+            key (str): Tab key
+            name (str): File name
+
+        Returns:
+            Optional[bytes]: File source or None if attachment doesn't exist
+        """
+        with self._lock:
+            data = self._files.get(key, {}).get(name)
+        if data is None:
+            return None
+        try:
+            return AttachmentStore().read(data)
+        except OSError:
+            return None
+
+
+def url(key: str, name: str = "") -> str:
+    """Get previewer URL of attachment
+
+    Args:
+        key (str): Tab key
+        name (str, optional): File name (empty - rendered page itself)
+
+    Returns:
+        str: Attachment URL
+    """
+    return f"{SCHEME}://{key}/{quote(name)}"
+
+
+def resolve(page: str, key: Optional[str]) -> str:
+    """Put tab key in place of placeholder in attachment URLs of rendered page
+
+    Tab keys are random for every session, so rendered pages are cached with
+    the placeholder and get the actual key only after the cache lookup.
+
+    Args:
+        page (str): Rendered HTML page
+        key (Optional[str]): Tab key (None - page has no attachment URLs)
+
+    Returns:
+        str: Rendered HTML page
+    """
+    if key is None:
+        return page
+    return page.replace(url(PLACEHOLDER), url(key))
+
+
+def digests(files: Mapping[str, str]) -> Dict[str, str]:
+    """Get SHA-256 digests of files
+
+    Args:
+        files (Mapping[str, str]): Files dict (name -> base64 source)
+
+    Returns:
+        Dict[str, str]: Hex digests of base64 sources by file name
+    """
+    if isinstance(files, SharedFiles):
+        return files.digests()
+    return {name: hashlib.sha256(data.encode("utf-8")).hexdigest() for name, data in files.items()}
+
+
+class SharedFile(NamedTuple):
+    name: str
+    segment: str
+    size: int
+    digest: str
+
+
+class SharedFiles(Mapping):
+
+    """Read-only files dict backed by shared memory segments
+
+    Sources are read from shared memory and encoded only when accessed.
+    """
+
+    def __init__(self, files: Iterable[SharedFile]):
+        """Initializing shared files
+
+        Args:
+            files (Iterable[SharedFile]): Shared files
+        """
+        self._files = {file.name: file for file in files}
+        self._sources: Dict[str, str] = {}
+
+    def __getitem__(self, name: str) -> str:
+        if name not in self._sources:
+            file = self._files[name]
+            memory = shared_memory.SharedMemory(name=file.segment)
+            try:
+                self._sources[name] = base64.b64encode(bytes(memory.buf[:file.size])).decode("utf-8")
+            finally:
+                memory.close()
+        return self._sources[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._files)
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def digests(self) -> Dict[str, str]:
+        """Get digests of files without reading them
+
+        Returns:
+            Dict[str, str]: Hex digests of base64 sources by file name
+        """
+        return {name: file.digest for name, file in self._files.items()}
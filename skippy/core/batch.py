@@ -0,0 +1,185 @@
+"""Headless batch rendering of sessions and page directories
+
+Pages are rendered in a pool of spawned processes by the same preview
+pipeline as the previewer, without importing PyQt.
+
+Attributes:
+    SOURCE_SUFFIXES (Tuple[str, ...]): Suffixes of page source files in directories
+"""
+from skippy.api import PageData
+
+from skippy.core import connections, preview
+from skippy.core.renderer import RendererRouter
+from skippy.core.themes import AssetBundle
+
+from skippy.utils.filehandlers import SessionHandler
+from skippy.utils.logger import log
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Optional, Tuple, Dict, List, Any
+from pathlib import Path
+import multiprocessing
+import traceback
+import time
+import os
+import re
+
+
+SOURCE_SUFFIXES = (".txt", ".ftml", ".wikidot")
+
+
+def _slug(title: str) -> str:
+    """Get file name part of page title
+
+    Args:
+        title (str): Page title
+
+    Returns:
+        str: Lowercase title with non-word characters replaced by dashes
+    """
+    return re.sub(r"[^\w]+", "-", title.lower()).strip("-") or "page"
+
+
+def load(path: Path, site: Optional[str] = None) -> List[Tuple[str, PageData]]:
+    """Load pages of session file or directory of page sources
+
+    Session pages are named by their position and title. Directory pages are
+    named by their path relative to the directory, their title is the file
+    name and, if site is set, they are linked to the page of the same name.
+
+    Args:
+        path (Path): Session JSON file or directory
+        site (Optional[str], optional): Site of directory pages
+
+    Returns:
+        List[Tuple[str, PageData]]: Page names and page data
+    """
+    if path.is_dir():
+        pages = []
+        for file in sorted(path.rglob("*")):
+            if file.is_file() and file.suffix.lower() in SOURCE_SUFFIXES:
+                name = file.relative_to(path).with_suffix("").as_posix()
+                pages.append(
+                    (
+                        name,
+                        {
+                            "title": file.stem,
+                            "source": file.read_text(encoding="utf-8"),
+                            "tags": [],
+                            "files": {},
+                            "link": (site, file.stem) if site else None,
+                        },
+                    )
+                )
+        return pages
+
+    pages = []
+    for index, page in enumerate(SessionHandler(path).load()["session"], 1):
+        pdata = {
+            "title": page["title"],
+            "source": page["source"],
+            "tags": page["tags"].split() if isinstance(page["tags"], str) else page["tags"],
+            "files": page["files"],
+            "link": page["link"] if "link" in page else page.get("parent"),
+        }
+        pages.append((f"{index:03d}-{_slug(page['title'])}", pdata))
+    return pages
+
+
+def _initialize(level: int, offline: bool):
+    """Prepare worker process
+
+    Args:
+        level (int): Log level of parent process
+        offline (bool): Render without network
+    """
+    log.setLevel(level)
+    RendererRouter().offline_only = offline
+    connections.set_offline(offline)
+
+
+def _render(name: str, pdata: PageData, output: Path) -> Dict[str, Any]:
+    """Render page and write its HTML in worker process
+
+    Args:
+        name (str): Page name
+        pdata (PageData): Page data
+        output (Path): Output folder
+
+    Returns:
+        Dict[str, Any]: Page report
+    """
+    start = time.perf_counter()
+    try:
+        html, report = preview.render_with_report(pdata)
+        path = output / f"{name}.html"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(html, encoding="utf-8")
+    except Exception as e:
+        return {
+            "name": name,
+            "ok": False,
+            "seconds": time.perf_counter() - start,
+            "error": f"{e.__class__.__name__}: {e}",
+            "traceback": traceback.format_exc(),
+        }
+    return {
+        "name": name,
+        "ok": True,
+        "seconds": report.seconds,
+        "output": path.as_posix(),
+        "renderer": report.renderer,
+        "cached": report.cached,
+        "stages": {stage: report.stage(stage) for stage in ("pre", "markdown", "html", "post")},
+        "failed_processors": [timing.processor for timing in report.timings if timing.failed],
+    }
+
+
+def render(
+        pages: List[Tuple[str, PageData]],
+        output: Path,
+        jobs: Optional[int] = None,
+        offline: bool = False,
+) -> Dict[str, Any]:
+    """Render pages in process pool and write their HTML to output folder
+
+    Args:
+        pages (List[Tuple[str, PageData]]): Page names and page data
+        output (Path): Output folder
+        jobs (Optional[int], optional): Count of worker processes (None - count of CPU cores)
+        offline (bool, optional): Render without network, includes, themes and page index are taken from disk
+
+    Returns:
+        Dict[str, Any]: Batch report with page reports in input order
+    """
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(pages) or 1))
+    output.mkdir(parents=True, exist_ok=True)
+    start = time.perf_counter()
+
+    if not offline:
+        for site in {preview.site(pdata) for _, pdata in pages}:
+            AssetBundle().theme(site)
+
+    reports = {}
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_initialize,
+        initargs=(log.level, offline),
+    ) as executor:
+        futures = {executor.submit(_render, name, pdata, output): name for name, pdata in pages}
+        for future in as_completed(futures):
+            report = future.result()
+            reports[futures[future]] = report
+            log.info(
+                f"{'Rendered' if report['ok'] else 'Failed'} {report['name']} in {report['seconds'] * 1000:.1f} ms"
+            )
+
+    ordered = [reports[name] for name, _ in pages]
+    return {
+        "pages": ordered,
+        "total": len(ordered),
+        "failed": sum(not report["ok"] for report in ordered),
+        "jobs": jobs,
+        "seconds": time.perf_counter() - start,
+    }
@@ -0,0 +1,135 @@
+"""Bulk download of Wikidot pages by list, tags or category
+
+Pages are downloaded by a few threads at once, each through SCPClient, so
+their files go through the transfer pool as usual. Page requests are
+spaced out to keep the site from throttling the client.
+
+Attributes:
+    JOBS (int): Pages downloaded at once
+    RATE (float): Page downloads started per second at most
+"""
+from skippy.api import PageData
+
+from skippy.core.filestore import AttachmentStore
+from skippy.core.scpclient import SCPClient
+from skippy.core.siteindex import SiteIndex
+
+from skippy.utils.filehandlers import SessionHandler
+from skippy.utils.logger import log
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional, Iterable, Iterator, Tuple, List
+from pathlib import Path
+import threading
+import time
+import re
+
+
+JOBS = 4
+
+RATE = 5.0
+
+
+class RateLimiter:
+
+    """Spacer of calls made from many threads"""
+
+    def __init__(self, rate: float):
+        """Initializing rate limiter
+
+        Args:
+            rate (float): Calls per second at most
+        """
+        self.interval = 1 / rate
+
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self):
+        """Wait until the next call is allowed"""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        time.sleep(start - now)
+
+
+def names(text: str) -> List[str]:
+    """Parse page list, names are separated by whitespace or commas, URLs are accepted
+
+    Args:
+        text (str): Page list
+
+    Returns:
+        List[str]: Unique page names in input order
+    """
+    found = []
+    for item in re.split(r"[\s,]+", text):
+        name = item.split("//", 1)[-1].split("/", 1)[-1] if "//" in item else item.strip("/")
+        if name and name not in found:
+            found.append(name)
+    return found
+
+
+def pages(site: str, text: str = "", tags: Optional[str] = None, category: Optional[str] = None) -> List[str]:
+    """Get names of pages to download
+
+    Args:
+        site (str): Wikidot site name
+        text (str, optional): Page list, takes precedence over tags and category
+        tags (Optional[str], optional): ListPages tags parameter
+        category (Optional[str], optional): ListPages category parameter
+
+    Returns:
+        List[str]: Page names
+    """
+    if text.strip():
+        return names(text)
+    return SiteIndex().query(site, tags, category)
+
+
+def download(
+        site: str,
+        targets: Iterable[str],
+        jobs: int = JOBS,
+        rate: float = RATE,
+) -> Iterator[Tuple[str, Optional[PageData]]]:
+    """Download pages concurrently, yielding them as they are done
+
+    Args:
+        site (str): Wikidot site name
+        targets (Iterable[str]): Page names
+        jobs (int, optional): Pages downloaded at once
+        rate (float, optional): Page downloads started per second at most
+
+    Yields:
+        Tuple[str, Optional[PageData]]: Page name and page data (None - page failed)
+    """
+    limiter = RateLimiter(rate)
+
+    def fetch(page: str) -> Optional[PageData]:
+        limiter.wait()
+        return SCPClient().download(site, page) or None
+
+    with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="bulk") as executor:
+        futures = {executor.submit(fetch, page): page for page in targets}
+        for future in as_completed(futures):
+            try:
+                pdata = future.result()
+            except Exception as e:
+                log.error(f"Can't download page {futures[future]}: {e}")
+                pdata = None
+            yield futures[future], pdata
+
+
+def save(path: Path, pages: List[PageData]):
+    """Write pages to session file, file data is inlined so it can be used anywhere
+
+    Args:
+        path (Path): Session file
+        pages (List[PageData]): Pages
+    """
+    store = AttachmentStore()
+    SessionHandler(path).save(
+        {"session": [dict(pdata, files=store.inline(pdata["files"])) for pdata in pages], "pos": 0}
+    )
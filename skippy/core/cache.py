@@ -0,0 +1,439 @@
+"""Two-level (memory + disk) caches used by the previewer.
+
+Attributes:
+    INCLUDE_TTL (int): Lifetime of cached included pages in seconds
+    RENDER_TTL (int): Lifetime of cached renders in seconds
+"""
+from skippy.api import Singleton
+
+from skippy.core.themes import host
+
+from skippy.utils.logger import log
+
+import skippy.config
+
+from typing import Hashable, Optional, Callable, Tuple, Dict, Any
+from collections import OrderedDict
+from pathlib import Path
+import threading
+import tempfile
+import hashlib
+import json
+import time
+import os
+
+
+INCLUDE_TTL = 60 * 60
+
+RENDER_TTL = 24 * 60 * 60
+
+
+def digest(*parts: Any) -> str:
+    """Get SHA-256 digest of JSON serializable parts
+
+    Args:
+        *parts (Any): Key parts
+
+    Returns:
+        str: Hex digest
+    """
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+
+    """Thread-safe in-memory LRU cache with optional TTL"""
+
+    def __init__(self, maxsize: int = 128, ttl: Optional[float] = None):
+        """Initializing LRU cache
+
+        Args:
+            maxsize (int, optional): Maximum count of stored items
+            ttl (Optional[float], optional): Item lifetime in seconds (None - forever)
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Get item by key and mark it as recently used
+
+        Args:
+            key (Hashable): Item key
+
+        Returns:
+            Optional[Any]: Item value or None if item is missing or expired
+        """
+        with self._lock:
+            if key not in self._data:
+                return None
+            created, value = self._data[key]
+            if self.ttl is not None and time.time() - created > self.ttl:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, created: Optional[float] = None):
+        """Store item and evict least recently used items
+
+        Args:
+            key (Hashable): Item key
+            value (Any): Item value
+            created (Optional[float], optional): Item creation time (default - now)
+        """
+        with self._lock:
+            self._data[key] = (created or time.time(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        """Remove item by key
+
+        Args:
+            key (Hashable): Item key
+        """
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Remove all items"""
+        with self._lock:
+            self._data.clear()
+
+
+class DiskCache:
+
+    """JSON disk cache with optional TTL and LRU size limit"""
+
+    def __init__(self, folder: Path, ttl: Optional[float] = None, maxsize: Optional[int] = None):
+        """Initializing disk cache
+
+        Args:
+            folder (Path): Cache folder
+            ttl (Optional[float], optional): Item lifetime in seconds (None - forever)
+            maxsize (Optional[int], optional): Maximum count of stored items (None - unlimited)
+        """
+        self.folder = folder
+        self.ttl = ttl
+        self.maxsize = maxsize
+
+    def _path(self, key: Hashable) -> Path:
+        """Get item file path by key
+
+        Args:
+            key (Hashable): Item key
+
+        Returns:
+            Path: Item file path
+        """
+        name = hashlib.sha1(json.dumps(key, ensure_ascii=False).encode("utf-8")).hexdigest()
+        return self.folder / f"{name}.json"
+
+    def get(self, key: Hashable) -> Optional[Dict[str, Any]]:
+        """Get item record by key
+
+        Args:
+            key (Hashable): Item key
+
+        Returns:
+            Optional[Dict[str, Any]]: Record with "time" and "value" keys or None if item is missing or expired
+        """
+        path = self._path(key)
+        try:
+            record = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if self.ttl is not None and time.time() - record["time"] > self.ttl:
+            self.invalidate(key)
+            return None
+        if self.maxsize is not None:
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+        return record
+
+    def set(self, key: Hashable, value: Any, created: Optional[float] = None):
+        """Store item atomically and evict least recently used items
+
+        Args:
+            key (Hashable): Item key
+            value (Any): JSON serializable item value
+            created (Optional[float], optional): Item creation time (default - now)
+        """
+        self.folder.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            "w", dir=self.folder, suffix=".tmp", delete=False, encoding="utf-8"
+        ) as tmp:
+            json.dump({"time": created or time.time(), "value": value}, tmp, ensure_ascii=False)
+        os.replace(tmp.name, self._path(key))
+
+        if self.maxsize is not None:
+            self._evict()
+
+    def _evict(self):
+        """Remove least recently used items over the size limit"""
+        files = []
+        for file in self.folder.glob("*.json"):
+            try:
+                files.append((file.stat().st_mtime, file))
+            except OSError:
+                pass
+        files.sort()
+        for _, file in files[:max(len(files) - self.maxsize, 0)]:
+            file.unlink(missing_ok=True)
+
+    def invalidate(self, key: Hashable):
+        """Remove item by key
+
+        Args:
+            key (Hashable): Item key
+        """
+        self._path(key).unlink(missing_ok=True)
+
+    def clear(self):
+        """Remove all items"""
+        for file in self.folder.glob("*.json"):
+            file.unlink(missing_ok=True)
+
+
+class Cache:
+
+    """Two-level cache: in-memory LRU in front of a disk store
+
+    Attributes:
+        generation (int): Count of invalidations and clears of all caches in this process
+        hits (int): Count of successful lookups
+        misses (int): Count of failed lookups
+    """
+
+    generation: int = 0
+    _generation_lock = threading.Lock()
+
+    def __init__(
+            self,
+            name: str,
+            maxsize: int = 128,
+            ttl: Optional[float] = None,
+            disk_maxsize: Optional[int] = None,
+    ):
+        """Initializing two-level cache
+
+        Args:
+            name (str): Cache name, also used as disk folder name
+            maxsize (int, optional): Maximum count of items in memory
+            ttl (Optional[float], optional): Item lifetime in seconds (None - forever)
+            disk_maxsize (Optional[int], optional): Maximum count of items on disk (None - unlimited)
+        """
+        self.name = name
+        self.memory = LRUCache(maxsize, ttl)
+        self.disk = DiskCache(skippy.config.CACHE_FOLDER / name, ttl, disk_maxsize)
+
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Get item from memory, then from disk
+
+        Args:
+            key (Hashable): Item key
+
+        Returns:
+            Optional[Any]: Item value or None on cache miss
+        """
+        value = self.memory.get(key)
+        if value is None:
+            record = self.disk.get(key)
+            if record is not None:
+                value = record["value"]
+                self.memory.set(key, value, record["time"])
+
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        log.debug(f"{self.name} cache {'miss' if value is None else 'hit'}: {key}")
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        """Store item in memory and on disk
+
+        Args:
+            key (Hashable): Item key
+            value (Any): JSON serializable item value
+        """
+        self.memory.set(key, value)
+        try:
+            self.disk.set(key, value)
+        except OSError as e:
+            log.error(e)
+
+    def get_or_set(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        """Get item or compute and store it on cache miss
+
+        Args:
+            key (Hashable): Item key
+            func (Callable[[], Any]): Function that computes item value
+
+        Returns:
+            Any: Item value
+        """
+        value = self.get(key)
+        if value is None:
+            value = func()
+            if value is not None:
+                self.set(key, value)
+        return value
+
+    def invalidate(self, key: Hashable):
+        """Remove item from both levels
+
+        Args:
+            key (Hashable): Item key
+        """
+        self.memory.invalidate(key)
+        self.disk.invalidate(key)
+        self._advance()
+
+    def clear(self):
+        """Remove all items from both levels and reset counters"""
+        self.memory.clear()
+        self.disk.clear()
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+        self._advance()
+
+    def forget(self):
+        """Remove all items from memory level, they are loaded from disk level again"""
+        self.memory.clear()
+
+    @staticmethod
+    def _advance():
+        """Count invalidation, so render workers drop their memory levels"""
+        with Cache._generation_lock:
+            Cache.generation += 1
+
+    def stats(self) -> Dict[str, float]:
+        """Get cache statistics
+
+        Returns:
+            Dict[str, float]: Hits, misses, hit rate and count of items in memory
+        """
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / total if total else 0.0,
+            "size": len(self.memory),
+        }
+
+
+class IncludeCache(Cache, metaclass=Singleton):
+
+    """Cache of included pages sources keyed by (site, page)
+
+    Sources are kept in memory together with their compiled templates, so a
+    template is compiled once per fetched source.
+
+    Attributes:
+        templates (LRUCache): Sources and their templates by (site, page)
+    """
+
+    def __init__(self):
+        """Initializing include cache"""
+        super(IncludeCache, self).__init__("includes", maxsize=256, ttl=INCLUDE_TTL)
+        self.templates = LRUCache(self.memory.maxsize, INCLUDE_TTL)
+
+    def template(
+            self, key: Hashable, func: Callable[[], Optional[str]], compile: Callable[[str], Any]
+    ) -> Optional[Any]:
+        """Get compiled template of included page, fetching and compiling it on cache miss
+
+        Args:
+            key (Hashable): (site, page) key
+            func (Callable[[], Optional[str]]): Function that fetches page source
+            compile (Callable[[str], Any]): Function that compiles page source
+
+        Returns:
+            Optional[Any]: Compiled template or None if page has no source
+        """
+        source = self.get_or_set(key, func)
+        if source is None:
+            return None
+        cached = self.templates.get(key)
+        if cached is None or cached[0] != source:
+            cached = (source, compile(source))
+            self.templates.set(key, cached)
+        return cached[1]
+
+    def invalidate(self, key: Hashable):
+        """Remove item and its template from both levels
+
+        Args:
+            key (Hashable): Item key
+        """
+        super(IncludeCache, self).invalidate(key)
+        self.templates.invalidate(key)
+
+    def clear(self):
+        """Remove all items and templates from both levels and reset counters"""
+        super(IncludeCache, self).clear()
+        self.templates.clear()
+
+    def forget(self):
+        """Remove all items and templates from memory level"""
+        super(IncludeCache, self).forget()
+        self.templates.clear()
+
+    def invalidate_page(self, site: str, page: str):
+        """Remove included page, as included from its site and without site
+
+        Args:
+            site (str): Wikidot site name, host or URL
+            page (str): Page name
+        """
+        for key in {self.key(site, page), self.key("", page)}:
+            self.invalidate(key)
+
+    @staticmethod
+    def key(site: str, page: str) -> Tuple[str, str]:
+        """Get key of included page, the same for every spelling of site and page
+
+        Args:
+            site (str): Wikidot site name, host or URL (empty - include without site)
+            page (str): Page name
+
+        Returns:
+            Tuple[str, str]: (site host, page) key
+        """
+        return host(site) if site else "", page.lower()
+
+
+class MarkdownCache(Cache, metaclass=Singleton):
+
+    """Cache of rendered page bodies keyed by digest of preprocessed source and renderer"""
+
+    def __init__(self):
+        """Initializing markdown cache"""
+        super(MarkdownCache, self).__init__("markdown", maxsize=64, ttl=RENDER_TTL, disk_maxsize=512)
+
+
+class RenderCache(Cache, metaclass=Singleton):
+
+    """Cache of complete preview pages keyed by digest of everything they depend on"""
+
+    def __init__(self):
+        """Initializing render cache"""
+        super(RenderCache, self).__init__("render", maxsize=32, ttl=RENDER_TTL, disk_maxsize=256)
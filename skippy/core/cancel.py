@@ -0,0 +1,222 @@
+"""Cancellation of superseded preview renders
+
+Every render is requested on a channel (a previewer of a tab, the live preview
+dock) and gets the next generation of that channel. A newer request makes older
+renders of the channel stale, stale renders stop at the next check and their
+results are discarded.
+
+Attributes:
+    POLL (float): Seconds between cancellation checks while waiting for network requests
+"""
+from skippy.api import Singleton
+
+from concurrent.futures import Future, ALL_COMPLETED, FIRST_COMPLETED, wait
+from collections import OrderedDict
+from contextlib import contextmanager
+from multiprocessing.sharedctypes import SynchronizedArray
+from typing import Optional, Callable, Iterable, Iterator, Tuple, Set
+import multiprocessing
+import threading
+
+
+POLL = 0.05
+
+
+class RenderCancelled(BaseException):
+
+    """Render was superseded by a newer one
+
+    Derived from BaseException, so handlers of failing processors don't
+    swallow it.
+    """
+
+
+class CancelToken:
+
+    """Token telling a render if it was superseded"""
+
+    def __init__(self, cancelled: Optional[Callable[[], bool]] = None):
+        """Initializing cancel token
+
+        Args:
+            cancelled (Optional[Callable[[], bool]], optional): Check if render is stale (None - never)
+        """
+        self._cancelled = cancelled
+
+    @property
+    def cancelled(self) -> bool:
+        """Is render superseded
+
+        Returns:
+            bool: Is render stale
+        """
+        return self._cancelled is not None and self._cancelled()
+
+    def check(self):
+        """Stop stale render
+
+        Raises:
+            RenderCancelled: Render is stale
+        """
+        if self.cancelled:
+            raise RenderCancelled()
+
+    def wait(
+            self, futures: Iterable[Future], return_when: str = ALL_COMPLETED
+    ) -> Tuple[Set[Future], Set[Future]]:
+        """Wait for futures, stopping if render gets stale
+
+        Args:
+            futures (Iterable[Future]): Futures
+            return_when (str, optional): concurrent.futures.wait condition (ALL_COMPLETED or FIRST_COMPLETED)
+
+        Returns:
+            Tuple[Set[Future], Set[Future]]: Done and not done futures
+
+        Raises:
+            RenderCancelled: Render is stale
+        """
+        pending = set(futures)
+        while True:
+            done, pending = wait(pending, timeout=POLL, return_when=return_when)
+            if not pending or (done and return_when == FIRST_COMPLETED):
+                return done, pending
+            self.check()
+
+    def result(self, future: Future):
+        """Get result of future, stopping if render gets stale
+
+        Args:
+            future (Future): Future
+
+        Returns:
+            Any: Future result
+
+        Raises:
+            RenderCancelled: Render is stale
+        """
+        self.wait([future])
+        return future.result()
+
+
+_local = threading.local()
+
+
+def current() -> CancelToken:
+    """Get cancel token of render running in current thread
+
+    Returns:
+        CancelToken: Cancel token (never cancelled outside of render scope)
+    """
+    return getattr(_local, "token", None) or CancelToken()
+
+
+def check():
+    """Stop render running in current thread if it's stale
+
+    Raises:
+        RenderCancelled: Render is stale
+    """
+    current().check()
+
+
+@contextmanager
+def scope(token: CancelToken) -> Iterator[CancelToken]:
+    """Make token current for renders in current thread
+
+    Args:
+        token (CancelToken): Cancel token
+
+    Yields:
+        CancelToken: Cancel token
+    """
+    previous = getattr(_local, "token", None)
+    _local.token = token
+    try:
+        yield token
+    finally:
+        _local.token = previous
+
+
+class Generations(metaclass=Singleton):
+
+    """Render generations of channels shared with render pool workers
+
+    Channels are mapped to slots of a shared array, least recently used
+    channels give their slot away when the array is full.
+
+    Attributes:
+        slots (int): Count of channels tracked at the same time
+    """
+
+    slots: int = 256
+
+    def __init__(self):
+        """Initializing generations"""
+        self.array: SynchronizedArray = multiprocessing.get_context("spawn").Array("Q", self.slots)
+        self._channels: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def share(self, array: SynchronizedArray):
+        """Use generations of parent process in worker process
+
+        Args:
+            array (SynchronizedArray): Generations array of parent process
+        """
+        self.array = array
+
+    def _slot(self, channel: str) -> int:
+        """Get slot of channel, taking one from least recently used channel if needed
+
+        Args:
+            channel (str): Channel name
+
+        Returns:
+            int: Slot index
+        """
+        if channel in self._channels:
+            self._channels.move_to_end(channel)
+        elif len(self._channels) < self.slots:
+            self._channels[channel] = len(self._channels)
+        else:
+            _, slot = self._channels.popitem(last=False)
+            self._channels[channel] = slot
+        return self._channels[channel]
+
+    def advance(self, channel: str) -> Tuple[int, int]:
+        """Start a new render generation of channel, making older renders stale
+
+        Args:
+            channel (str): Channel name
+
+        Returns:
+            Tuple[int, int]: Slot and generation of the new render
+        """
+        with self._lock:
+            slot = self._slot(channel)
+            with self.array.get_lock():
+                self.array[slot] += 1
+                return slot, self.array[slot]
+
+    def cancel(self, channel: str):
+        """Make all renders of channel stale
+
+        Args:
+            channel (str): Channel name
+        """
+        with self._lock:
+            if channel in self._channels:
+                with self.array.get_lock():
+                    self.array[self._channels[channel]] += 1
+
+    def token(self, slot: int, generation: int) -> CancelToken:
+        """Get cancel token of render
+
+        Args:
+            slot (int): Slot index
+            generation (int): Render generation
+
+        Returns:
+            CancelToken: Token cancelled when the slot moves to another generation
+        """
+        return CancelToken(lambda: self.array[slot] != generation)
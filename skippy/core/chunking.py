@@ -0,0 +1,383 @@
+"""Chunked rendering of large pages
+
+A page is split at blank lines outside of blocks and comments, every chunk is
+rendered on its own and the fragments are stitched back. Numbering of
+footnotes and headings is continued across chunks by hidden dummy footnotes
+and headings prepended to a chunk. Tables of contents and the footnote block
+are rendered from a synthetic source holding every heading and footnote of the
+page, and are put in place of the original ones.
+
+A section of a page is previewed the same way as a single chunk, with page
+CSS modules and includes it may depend on.
+
+Attributes:
+    CHUNK_SIZE (int): Preferred chunk length in characters
+    CHUNK_THRESHOLD (int): Page length from which page is rendered in chunks
+    COMMENT (Pattern): Pattern of source comment
+    HEADING (Pattern): Pattern of heading listed in table of contents
+    MARKER (str): Class prefix of service divs
+    PARAGRAPH (Pattern): Pattern of blank lines separating paragraphs
+    TOC_BLOCKS (Tuple[str, ...]): Table of contents block names
+    UNSPLITTABLE (Tuple[str, ...]): Blocks whose rendering depends on the whole page
+"""
+from skippy.core.tokenizer import Document, Block, tokenize, splice
+
+from skippy.utils import cached_property
+
+from typing import Optional, Tuple, List
+import bisect
+import re
+
+
+CHUNK_SIZE = 32 * 1024
+
+CHUNK_THRESHOLD = 100 * 1024
+
+COMMENT = re.compile(r"\[!--.*?--\]", re.DOTALL)
+
+HEADING = re.compile(r"^\+{1,6} .*$", re.MULTILINE)
+
+PARAGRAPH = re.compile(r"\n[ \t]*\n\s*")
+
+MARKER = "skippy-chunk"
+
+TOC_BLOCKS: Tuple[str, ...] = ("toc", "f<toc", "f>toc")
+
+UNSPLITTABLE: Tuple[str, ...] = ("bibliography", "bibcite")
+
+
+def _spans(source: str, document: Document) -> Tuple[List[int], List[int]]:
+    """Get sorted disjoint ranges which can't be split
+
+    Args:
+        source (str): Page source
+        document (Document): Tokenized source
+
+    Returns:
+        Tuple[List[int], List[int]]: Range starts and range ends
+    """
+    ranges = sorted(
+        [(block.start, block.end) for block in document.blocks if block.closed]
+        + [match.span() for match in COMMENT.finditer(source)]
+    )
+    starts: List[int] = []
+    ends: List[int] = []
+    for start, end in ranges:
+        if ends and start < ends[-1]:
+            ends[-1] = max(ends[-1], end)
+        else:
+            starts.append(start)
+            ends.append(end)
+    return starts, ends
+
+
+def split(source: str, size: int = CHUNK_SIZE) -> List[Tuple[int, int]]:
+    """Split source at blank lines outside of blocks and comments
+
+    Args:
+        source (str): Page source
+        size (int, optional): Preferred chunk length
+
+    Returns:
+        List[Tuple[int, int]]: Chunk ranges covering the whole source
+    """
+    starts, ends = _spans(source, tokenize(source))
+    ranges = []
+    start = 0
+    for match in PARAGRAPH.finditer(source):
+        position = match.end()
+        if position - start < size or position >= len(source):
+            continue
+        index = bisect.bisect_right(starts, position) - 1
+        if index >= 0 and ends[index] > position:
+            continue
+        ranges.append((start, position))
+        start = position
+    ranges.append((start, len(source)))
+    return ranges
+
+
+def _element(html: str, name: str) -> Optional[Tuple[int, int, int, int]]:
+    """Find service div in rendered HTML
+
+    Args:
+        html (str): Rendered HTML
+        name (str): Service div class
+
+    Returns:
+        Optional[Tuple[int, int, int, int]]: Start, content start, content end and end of the div
+    """
+    opening = re.search(
+        r"<div\b[^>]*\bclass=\"[^\"]*(?<![\w-])" + re.escape(name) + r"(?![\w-])[^\"]*\"[^>]*>", html
+    )
+    if opening is None:
+        return None
+    depth = 1
+    for tag in re.finditer(r"<(/?)div\b", html[opening.end():]):
+        depth += -1 if tag.group(1) else 1
+        if not depth:
+            inner_end = opening.end() + tag.start()
+            end = html.find(">", inner_end) + 1
+            return opening.start(), opening.end(), inner_end, end
+    return None
+
+
+def _remove(html: str, name: str) -> str:
+    """Remove every service div of a class
+
+    Args:
+        html (str): Rendered HTML
+        name (str): Service div class
+
+    Returns:
+        str: HTML without service divs
+    """
+    element = _element(html, name)
+    while element is not None:
+        html = html[:element[0]] + html[element[3]:]
+        element = _element(html, name)
+    return html
+
+
+def _inner(html: str, name: str) -> str:
+    """Get content of service div
+
+    Args:
+        html (str): Rendered HTML
+        name (str): Service div class
+
+    Returns:
+        str: Div content (empty if div is missing)
+    """
+    element = _element(html, name)
+    return html[element[1]:element[2]] if element is not None else ""
+
+
+def _div(name: str, content: str, hidden: bool = False) -> str:
+    """Get source of service div
+
+    Args:
+        name (str): Service div class
+        content (str): Div content
+        hidden (bool, optional): Hide div
+
+    Returns:
+        str: Div source on its own lines
+    """
+    style = ' style="display: none"' if hidden else ""
+    return f'\n[[div class="{name}"{style}]]\n{content}\n[[/div]]\n'
+
+
+class ChunkedPage:
+
+    """Page split to chunks rendered apart
+
+    Attributes:
+        source (str): Page source
+        size (int): Preferred chunk length
+        document (Document): Tokenized source
+        headings (List[re.Match]): Headings listed in table of contents
+        footnotes (List[Block]): Footnotes
+        tocs (List[Block]): Tables of contents
+        footnoteblock (Optional[Block]): Footnote block
+    """
+
+    def __init__(self, source: str, size: int = CHUNK_SIZE):
+        """Initializing chunked page
+
+        Args:
+            source (str): Page source
+            size (int, optional): Preferred chunk length
+        """
+        self.source = source
+        self.size = size
+        self.document = tokenize(source)
+
+        hidden = [
+            (block.start, block.end) for block in self.document.blocks if block.closed and block.name in ("code", "html")
+        ] + [match.span() for match in COMMENT.finditer(source)]
+        self.headings = [
+            heading for heading in HEADING.finditer(source)
+            if not any(start < heading.start() < end for start, end in hidden)
+        ]
+        self.footnotes = [footnote for footnote in self.document.find("footnote") if footnote.closed]
+        self.tocs = [toc for name in TOC_BLOCKS for toc in self.document.find(name)]
+        self.tocs.sort(key=lambda toc: toc.start)
+        blocks = self.document.find("footnoteblock")
+        self.footnoteblock = blocks[0] if blocks else None
+
+    @cached_property
+    def ranges(self) -> List[Tuple[int, int]]:
+        """Get chunk ranges
+
+        Returns:
+            List[Tuple[int, int]]: Chunk ranges covering the whole source
+        """
+        return split(self.source, self.size)
+
+    @property
+    def splittable(self) -> bool:
+        """Can page be rendered in chunks
+
+        Returns:
+            bool: Has page several chunks and no blocks depending on the whole page
+        """
+        return len(self.ranges) > 1 and not any(self.document.has(name) for name in UNSPLITTABLE)
+
+    def chunk(self, start: int, end: int, stitched: bool = True) -> str:
+        """Get source of chunk with numbering offsets and service divs
+
+        Args:
+            start (int): Chunk start
+            end (int): Chunk end
+            stitched (bool, optional): Will chunk be stitched with others (False - chunk keeps its tables of contents and footnotes)
+
+        Returns:
+            str: Chunk source
+        """
+        footnotes = [footnote for footnote in self.footnotes if start <= footnote.start < end]
+        footnotes_before = sum(footnote.start < start for footnote in self.footnotes)
+        headings = [heading for heading in self.headings if start <= heading.start() < end]
+        headings_before = sum(heading.start() < start for heading in self.headings)
+
+        replacements: List[Tuple[Block, str]] = []
+        if stitched:
+            replacements.extend(
+                (toc, _div(f"{MARKER}-slot-toc-{index}", MARKER))
+                for index, toc in enumerate(self.tocs) if start <= toc.start < end
+            )
+            if self.footnoteblock is not None and start <= self.footnoteblock.start < end:
+                replacements.append((self.footnoteblock, _div(f"{MARKER}-slot-footnotes", MARKER)))
+
+        offset = ""
+        if footnotes and footnotes_before:
+            offset += "[[footnote]]-[[/footnote]]" * footnotes_before + "\n"
+        if headings and headings_before:
+            offset += "+ -\n" * headings_before
+        source = _div(f"{MARKER}-offset", offset, True) if offset else ""
+        source += splice(self.source, start, end, replacements)
+        if footnotes and stitched:
+            source += _div(f"{MARKER}-footer", "[[footnoteblock]]")
+        return source
+
+    def section(self, start: int, end: int) -> Tuple[int, int]:
+        """Get range of page section to preview
+
+        A selection is taken as is. For a cursor the smaller of the enclosing
+        top-level block and the enclosing heading range is taken, falling back
+        to the paragraph under cursor. The range is widened so it doesn't cut
+        any block.
+
+        Args:
+            start (int): Selection start or cursor position
+            end (int): Selection end or cursor position
+
+        Returns:
+            Tuple[int, int]: Section range
+        """
+        if start == end:
+            candidates = []
+            for block in self.document.blocks:
+                if block.closed and block.start <= start < block.end:
+                    candidates.append((block.start, block.end))
+            before = [heading for heading in self.headings if heading.start() <= start]
+            if before:
+                heading = before[-1]
+                level = len(heading.group()) - len(heading.group().lstrip("+"))
+                following = [
+                    other.start() for other in self.headings
+                    if other.start() > heading.start() and len(other.group()) - len(other.group().lstrip("+")) <= level
+                ]
+                candidates.append((heading.start(), following[0] if following else len(self.source)))
+            if candidates:
+                start, end = min(candidates, key=lambda candidate: candidate[1] - candidate[0])
+            else:
+                paragraphs = [match.end() for match in PARAGRAPH.finditer(self.source)]
+                index = bisect.bisect_right(paragraphs, start)
+                start = paragraphs[index - 1] if index else 0
+                end = paragraphs[index] if index < len(paragraphs) else len(self.source)
+
+        blocks = [block for blocks in self.document.index.values() for block in blocks if block.closed]
+        widened = True
+        while widened:
+            widened = False
+            for block in blocks:
+                if block.start < start < block.end <= end or start <= block.start < end < block.end:
+                    start, end = min(start, block.start), max(end, block.end)
+                    widened = True
+        return start, end
+
+    def excerpt(self, start: int, end: int) -> str:
+        """Get source rendering page section like the whole page would render it
+
+        Footnote and heading numbering is continued from the page. Page CSS
+        modules and includes above the section are kept, the includes are
+        hidden, so components styling the page still apply.
+
+        Args:
+            start (int): Section start
+            end (int): Section end
+
+        Returns:
+            str: Section source
+        """
+        styles = [
+            module.text for module in self.document.find("module")
+            if module.closed and module.args.lower().split()[:1] == ["css"]
+            and not start <= module.start < end
+        ]
+        includes = [include.text for include in self.document.find("include") if include.end <= start]
+        context = "\n".join(styles)
+        if includes:
+            context += _div(f"{MARKER}-context", "\n".join(includes), True)
+        return context + self.chunk(start, end, stitched=False)
+
+    def sources(self) -> List[str]:
+        """Get sources to render: chunks, then tables of contents and footnote block
+
+        Returns:
+            List[str]: Sources
+        """
+        sources = [self.chunk(start, end) for start, end in self.ranges]
+        if self.tocs:
+            sources.append(
+                "".join(_div(f"{MARKER}-toc-{index}", toc.text) for index, toc in enumerate(self.tocs))
+                + "\n".join(heading.group() for heading in self.headings)
+            )
+        if self.footnotes:
+            footnoteblock = self.footnoteblock.text if self.footnoteblock is not None else "[[footnoteblock]]"
+            sources.append(
+                " ".join(footnote.text for footnote in self.footnotes)
+                + "\n"
+                + _div(f"{MARKER}-footnotes", footnoteblock)
+            )
+        return sources
+
+    def stitch(self, fragments: List[str]) -> str:
+        """Stitch rendered sources to the page
+
+        Args:
+            fragments (List[str]): Rendered sources in order of sources()
+
+        Returns:
+            str: Rendered page
+        """
+        chunks = fragments[:len(self.ranges)]
+        extra = fragments[len(self.ranges):]
+        html = "".join(_remove(_remove(chunk, f"{MARKER}-offset"), f"{MARKER}-footer") for chunk in chunks)
+
+        if self.tocs:
+            tocs = extra.pop(0)
+            for index in range(len(self.tocs)):
+                slot = _element(html, f"{MARKER}-slot-toc-{index}")
+                if slot is not None:
+                    html = html[:slot[0]] + _inner(tocs, f"{MARKER}-toc-{index}") + html[slot[3]:]
+
+        if self.footnotes:
+            footer = _inner(extra.pop(0), f"{MARKER}-footnotes")
+            slot = _element(html, f"{MARKER}-slot-footnotes")
+            if slot is not None:
+                html = html[:slot[0]] + footer + html[slot[3]:]
+            else:
+                html += footer
+        return _remove(html, f"{MARKER}-slot-footnotes")
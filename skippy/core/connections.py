@@ -0,0 +1,122 @@
+"""HTTP connection pool shared by all network clients of the process
+
+Plain requests go through one session, pyscp keeps its own retrying
+sessions, but they are mounted on the same adapter, so every client reuses
+the same kept-alive connections instead of doing a handshake per request.
+
+In offline mode background clients (theme bundling, subresources, site
+index, includes) don't make requests and use what is stored on disk.
+
+Attributes:
+    POOL_HOSTS (int): Hosts kept in connection pool
+    POOL_SIZE (int): Connections kept per host
+    PREWARM_TIMEOUT (Tuple[float, float]): Connect and read timeouts of pre-warm requests
+"""
+from skippy.utils.logger import log
+
+from concurrent.futures import ThreadPoolExecutor
+from requests.exceptions import RequestException
+from requests.adapters import HTTPAdapter
+from http.cookiejar import DefaultCookiePolicy
+from typing import Optional
+import threading
+import requests
+
+
+POOL_HOSTS = 32
+
+POOL_SIZE = 16
+
+PREWARM_TIMEOUT = (3.05, 5.0)
+
+_lock = threading.RLock()
+_adapter: Optional[HTTPAdapter] = None
+_session: Optional[requests.Session] = None
+_executor: Optional[ThreadPoolExecutor] = None
+_offline = False
+
+
+def set_offline(offline: bool):
+    """Turn offline mode of current process on or off
+
+    Args:
+        offline (bool): Don't make requests of background clients
+    """
+    global _offline
+    _offline = offline
+
+
+def is_offline() -> bool:
+    """Check if current process is in offline mode
+
+    Returns:
+        bool: Are requests of background clients disabled
+    """
+    return _offline
+
+
+def adapter() -> HTTPAdapter:
+    """Get shared adapter holding kept-alive connections
+
+    Returns:
+        HTTPAdapter: Shared adapter
+    """
+    global _adapter
+    with _lock:
+        if _adapter is None:
+            _adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=POOL_SIZE)
+        return _adapter
+
+
+def mount(session: requests.Session) -> requests.Session:
+    """Make session use shared connection pool
+
+    Cookies set by responses aren't stored, sessions are used from many
+    threads and Wikidot cookies are sent explicitly by pyscp.
+
+    Args:
+        session (requests.Session): Session
+
+    Returns:
+        requests.Session: The same session
+    """
+    session.mount("http://", adapter())
+    session.mount("https://", adapter())
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    return session
+
+
+def session() -> requests.Session:
+    """Get shared session
+
+    Returns:
+        requests.Session: Shared session
+    """
+    global _session
+    with _lock:
+        if _session is None:
+            _session = mount(requests.Session())
+        return _session
+
+
+def prewarm(*urls: str):
+    """Open connections to sites in background
+
+    Args:
+        *urls (str): Site URLs
+    """
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="prewarm")
+    for url in urls:
+        if url:
+            _executor.submit(_prewarm, url)
+
+
+def _prewarm(url: str):
+    try:
+        session().head(url, timeout=PREWARM_TIMEOUT)
+        log.debug(f"Connection to {url} pre-warmed")
+    except RequestException as e:
+        log.debug(f"Can't pre-warm connection to {url}: {e}")
@@ -0,0 +1,224 @@
+"""Content-addressed store of page attachments on disk
+
+Downloaded attachments are streamed to disk chunk by chunk and hashed on the
+way, page data keeps only a reference ("skippy-store:<sha256>") in place of
+the base64 source. Both kinds of sources are accepted everywhere files are
+read, so sessions with inline base64 files keep working. References are
+local to this store: only the default session keeps them, sessions saved to
+a chosen path get file data inlined.
+
+Attributes:
+    CHUNK_SIZE (int): Bytes read and written at once
+    REFERENCE (str): Prefix of stored file references
+    STORE_TTL (int): Seconds after which unreferenced and unused files are pruned
+"""
+from skippy.api import Singleton
+
+from skippy.core import connections
+
+from skippy.utils.logger import log
+
+import skippy.config
+
+from typing import Optional, Iterable, Mapping, Tuple, Dict
+from pathlib import Path
+import tempfile
+import hashlib
+import base64
+import time
+import os
+
+
+CHUNK_SIZE = 64 * 1024
+
+REFERENCE = "skippy-store:"
+
+STORE_TTL = 30 * 24 * 60 * 60
+
+
+def is_reference(source: str) -> bool:
+    """Check if file source is a reference to stored file
+
+    Args:
+        source (str): Base64 source or reference
+
+    Returns:
+        bool: Is source a reference
+    """
+    return source.startswith(REFERENCE)
+
+
+class AttachmentStore(metaclass=Singleton):
+
+    """Store of attachments named by SHA-256 digest of their data
+
+    Reads touch file modification time, which is used as last access time
+    on pruning.
+
+    Attributes:
+        timeout (Tuple[float, float]): Connect and read timeouts of downloads in seconds
+    """
+
+    timeout: Tuple[float, float] = (3.05, 60.0)
+
+    def __init__(self, folder: Optional[Path] = None):
+        """Initializing attachment store
+
+        Args:
+            folder (Optional[Path], optional): Store folder (default - FILES_FOLDER)
+        """
+        self.folder = folder or skippy.config.FILES_FOLDER
+
+    def path(self, source: str) -> Path:
+        """Get stored file of reference
+
+        Args:
+            source (str): Reference
+
+        Returns:
+            Path: Stored file
+        """
+        return self.folder / source[len(REFERENCE):]
+
+    def _commit(self, tmp: str, digest: str) -> str:
+        """Move written temporary file to its place in store
+
+        Args:
+            tmp (str): Temporary file
+            digest (str): Hex digest of file data
+
+        Returns:
+            str: Reference
+        """
+        reference = REFERENCE + digest
+        path = self.path(reference)
+        if path.is_file():
+            os.unlink(tmp)
+            os.utime(path)
+        else:
+            os.replace(tmp, path)
+        return reference
+
+    def put(self, data: bytes) -> str:
+        """Store file data
+
+        Args:
+            data (bytes): File data
+
+        Returns:
+            str: Reference
+        """
+        self.folder.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=self.folder, suffix=".tmp", delete=False) as tmp:
+            tmp.write(data)
+        return self._commit(tmp.name, hashlib.sha256(data).hexdigest())
+
+    def download(self, url: str) -> str:
+        """Stream file to store, hashing it while it's downloaded
+
+        Args:
+            url (str): File URL
+
+        Returns:
+            str: Reference
+
+        Raises:
+            requests.exceptions.RequestException: File can't be downloaded
+        """
+        self.folder.mkdir(parents=True, exist_ok=True)
+        digest = hashlib.sha256()
+        with tempfile.NamedTemporaryFile(dir=self.folder, suffix=".tmp", delete=False) as tmp:
+            try:
+                with connections.session().get(url, stream=True, timeout=self.timeout) as response:
+                    response.raise_for_status()
+                    for chunk in response.iter_content(CHUNK_SIZE):
+                        tmp.write(chunk)
+                        digest.update(chunk)
+            except BaseException:
+                tmp.close()
+                os.unlink(tmp.name)
+                raise
+        return self._commit(tmp.name, digest.hexdigest())
+
+    def read(self, source: str) -> bytes:
+        """Read file data
+
+        Args:
+            source (str): Base64 source or reference
+
+        Returns:
+            bytes: File data
+
+        Raises:
+            OSError: Referenced file is missing from store
+        """
+        if not is_reference(source):
+            return base64.b64decode(source)
+        path = self.path(source)
+        data = path.read_bytes()
+        os.utime(path)
+        return data
+
+    def encode(self, source: str) -> str:
+        """Get base64 source of file
+
+        Args:
+            source (str): Base64 source or reference
+
+        Returns:
+            str: Base64 source
+        """
+        return base64.b64encode(self.read(source)).decode("utf-8") if is_reference(source) else source
+
+    def inline(self, files: Mapping[str, str]) -> Dict[str, str]:
+        """Get files dict with references replaced by base64 sources
+
+        Args:
+            files (Mapping[str, str]): Files dict (name -> base64 source or reference)
+
+        Returns:
+            Dict[str, str]: Files dict (name -> base64 source)
+        """
+        return {name: self.encode(source) for name, source in files.items()}
+
+    def sha256(self, source: str) -> str:
+        """Get SHA-256 digest of file data, stored files aren't read
+
+        Args:
+            source (str): Base64 source or reference
+
+        Returns:
+            str: Hex digest
+        """
+        if is_reference(source):
+            return source[len(REFERENCE):]
+        return hashlib.sha256(base64.b64decode(source)).hexdigest()
+
+    def size(self, source: str) -> int:
+        """Get size of file data
+
+        Args:
+            source (str): Base64 source or reference
+
+        Returns:
+            int: Size in bytes
+        """
+        if is_reference(source):
+            return self.path(source).stat().st_size
+        return len(base64.b64decode(source))
+
+    def prune(self, keep: Iterable[str], age: float = STORE_TTL):
+        """Remove files that aren't referenced and weren't used for a while
+
+        Args:
+            keep (Iterable[str]): Sources still in use
+            age (float, optional): Seconds since last use
+        """
+        kept = {self.path(source).name for source in keep if is_reference(source)}
+        for file in self.folder.glob("*"):
+            try:
+                if file.name not in kept and time.time() - file.stat().st_mtime > age:
+                    file.unlink()
+                    log.debug(f"Stored attachment pruned: {file.name}")
+            except OSError:
+                continue
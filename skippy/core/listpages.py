@@ -0,0 +1,361 @@
+"""Evaluation of ListPages and CountPages modules against a site index
+
+Attributes:
+    DATE_FORMAT (str): Default format of %%created_at%% and %%updated_at%%
+    EMULATED (Tuple[str, ...]): Lowercase names of emulated modules
+    ORDERS (Dict[str, Callable[[IndexedPage], Any]]): Sort keys of order parameter
+    PARAMETER (Pattern): Pattern of module parameter
+    PER_PAGE (int): Default count of pages listed at once
+    UNITS (Dict[str, int]): Seconds in units of "last n unit" dates
+    VARIABLE (Pattern): Pattern of module body variable
+"""
+from skippy.core.siteindex import IndexedPage, category
+
+from typing import Optional, NamedTuple, Callable, Tuple, Dict, List, Any
+import random
+import time
+import re
+
+
+EMULATED = ("listpages", "countpages")
+
+PER_PAGE = 20
+
+DATE_FORMAT = "%d %b %Y %H:%M"
+
+PARAMETER = re.compile(r"([\w-]+)\s*=\s*(?:\"([^\"]*)\"|'([^']*)'|(\S+))")
+
+VARIABLE = re.compile(r"%%([\w-]+)(?:\|([^\n]*?))?%%")
+
+UNITS = {
+    "hour": 60 * 60,
+    "day": 24 * 60 * 60,
+    "week": 7 * 24 * 60 * 60,
+    "month": 30 * 24 * 60 * 60,
+    "year": 365 * 24 * 60 * 60,
+}
+
+ORDERS: Dict[str, Callable[[IndexedPage], Any]] = {
+    "created_at": lambda page: page.created_at,
+    "updated_at": lambda page: page.updated_at,
+    "rating": lambda page: page.rating,
+    "title": lambda page: page.title.casefold(),
+    "name": lambda page: short(page.name),
+    "fullname": lambda page: page.name,
+}
+
+
+class Context(NamedTuple):
+
+    """Page the module is evaluated on
+
+    Attributes:
+        site (str): Site host
+        name (str): Page unix name with category
+        tags (Tuple[str, ...]): Page tags
+        parent (Optional[str]): Unix name of parent page
+    """
+
+    site: str
+    name: str
+    tags: Tuple[str, ...]
+    parent: Optional[str]
+
+    @property
+    def category(self) -> str:
+        return category(self.name)
+
+
+Filter = Callable[[IndexedPage], bool]
+
+
+def short(name: str) -> str:
+    """Get page name without category
+
+    Args:
+        name (str): Page unix name
+
+    Returns:
+        str: Page name
+    """
+    return name.split(":", 1)[-1]
+
+
+def emulated(args: str) -> bool:
+    """Check if module is emulated
+
+    Args:
+        args (str): Module block arguments
+
+    Returns:
+        bool: Is module ListPages or CountPages
+    """
+    return args.lower().split()[:1] in [[name] for name in EMULATED]
+
+
+def parameters(args: str) -> Dict[str, str]:
+    """Parse module parameters
+
+    Args:
+        args (str): Module block arguments
+
+    Returns:
+        Dict[str, str]: Parameters by lowercase name
+    """
+    return {
+        name.lower(): next(value for value in values if value is not None)
+        for name, *values in PARAMETER.findall(args)
+    }
+
+
+def _pagetype(value: str) -> Optional[Filter]:
+    if value == "*":
+        return None
+    hidden = value == "hidden"
+    return lambda page: short(page.name).startswith("_") == hidden
+
+
+def _category(value: str, context: Context) -> Optional[Filter]:
+    included, excluded = set(), set()
+    for item in re.split(r"[\s,]+", value.strip()):
+        if item:
+            target = excluded if item.startswith("-") else included
+            item = item.lstrip("-")
+            target.add(context.category if item == "." else item)
+    if "*" in included:
+        included = set()
+    if not included and not excluded:
+        return None
+    return lambda page: (not included or page.category in included) and page.category not in excluded
+
+
+def _tags(value: str, context: Context) -> Optional[Filter]:
+    value = value.strip()
+    if value == "-":
+        return lambda page: not page.tags
+    if value == "=":
+        return lambda page: bool(set(page.tags) & set(context.tags))
+    if value == "==":
+        return lambda page: set(page.tags) == set(context.tags)
+
+    required, excluded, optional = set(), set(), set()
+    for tag in re.split(r"[\s,]+", value):
+        if tag.startswith("+"):
+            required.add(tag[1:])
+        elif tag.startswith("-"):
+            excluded.add(tag[1:])
+        elif tag:
+            optional.add(tag)
+    if not required and not excluded and not optional:
+        return None
+    return lambda page: (
+        required.issubset(page.tags)
+        and excluded.isdisjoint(page.tags)
+        and (not optional or not optional.isdisjoint(page.tags))
+    )
+
+
+def _parent(value: str, context: Context) -> Optional[Filter]:
+    value = value.strip()
+    if value == "-":
+        return lambda page: page.parent is None
+    if value == "=":
+        return lambda page: page.parent == context.parent
+    if value == "-=":
+        return lambda page: page.parent != context.parent
+    parent = context.name if value == "." else value
+    return lambda page: page.parent == parent
+
+
+def _created_at(value: str) -> Optional[Filter]:
+    value = value.strip().lower()
+    last = re.fullmatch(r"last\s+(\d+)\s+(hour|day|week|month|year)s?", value)
+    if last:
+        since = time.time() - int(last.group(1)) * UNITS[last.group(2)]
+        return lambda page: page.created_at >= since
+    date = re.fullmatch(r"(\d{4})(?:\.(\d{1,2}))?", value)
+    if date:
+        period = tuple(int(part) for part in date.groups() if part)
+        return lambda page: time.localtime(page.created_at)[:len(period)] == period
+    return None
+
+
+def _rating(value: str) -> Optional[Filter]:
+    match = re.fullmatch(r"\s*(>=|<=|<>|>|<|=)?\s*(-?\d+)\s*", value)
+    if not match:
+        return None
+    operator, rating = match.group(1) or "=", int(match.group(2))
+    compare = {
+        ">=": lambda page: page.rating >= rating,
+        "<=": lambda page: page.rating <= rating,
+        "<>": lambda page: page.rating != rating,
+        ">": lambda page: page.rating > rating,
+        "<": lambda page: page.rating < rating,
+        "=": lambda page: page.rating == rating,
+    }
+    return compare[operator]
+
+
+def _name(value: str) -> Optional[Filter]:
+    value = value.strip()
+    if value.endswith("*"):
+        return lambda page: short(page.name).startswith(value[:-1])
+    return lambda page: short(page.name) == value
+
+
+def _number(value: Optional[str], default: Optional[int]) -> Optional[int]:
+    try:
+        return max(int(value), 0)
+    except (TypeError, ValueError):
+        return default
+
+
+def select(pages: List[IndexedPage], params: Dict[str, str], context: Context) -> Tuple[List[IndexedPage], int]:
+    """Select pages listed by module
+
+    Args:
+        pages (List[IndexedPage]): Indexed pages of site
+        params (Dict[str, str]): Module parameters
+        context (Context): Page the module is evaluated on
+
+    Returns:
+        Tuple[List[IndexedPage], int]: Pages of the first list page and total count of selected pages
+    """
+    filters = [
+        _pagetype(params.get("pagetype", "normal")),
+        _category(params.get("category", "."), context),
+        _tags(params["tags"], context) if "tags" in params else None,
+        _parent(params["parent"], context) if "parent" in params else None,
+        _created_at(params["created_at"]) if "created_at" in params else None,
+        _rating(params["rating"]) if "rating" in params else None,
+        _name(params["name"]) if "name" in params else None,
+        (lambda page: page.name == params["fullname"]) if "fullname" in params else None,
+    ]
+    filters = [test for test in filters if test is not None]
+    selected = [page for page in pages if all(test(page) for test in filters)]
+
+    order = params.get("order", "created_at desc").split()
+    if order[:1] == ["random"]:
+        random.shuffle(selected)
+    else:
+        key = ORDERS.get(order[0] if order else "", ORDERS["created_at"])
+        selected.sort(key=lambda page: (key(page), page.name), reverse=order[1:2] == ["desc"])
+    if params.get("reverse", "").lower() in ("yes", "true"):
+        selected.reverse()
+
+    selected = selected[_number(params.get("offset"), 0):]
+    limit = _number(params.get("limit"), None)
+    if limit is not None:
+        selected = selected[:limit]
+    return selected[:_number(params.get("perpage"), PER_PAGE)], len(selected)
+
+
+def date(timestamp: int, format: Optional[str]) -> str:
+    """Format page date
+
+    Args:
+        timestamp (int): Timestamp
+        format (Optional[str]): strftime format (None - DATE_FORMAT)
+
+    Returns:
+        str: Formatted date
+    """
+    moment = time.localtime(timestamp)
+    try:
+        return time.strftime(format or DATE_FORMAT, moment)
+    except ValueError:
+        return time.strftime(DATE_FORMAT, moment)
+
+
+def substitute(body: str, page: IndexedPage, context: Context, index: int, total: int, titles: Dict[str, str]) -> str:
+    """Substitute page variables into module body, unknown variables are left as is
+
+    Args:
+        body (str): Module body
+        page (IndexedPage): Listed page
+        context (Context): Page the module is evaluated on
+        index (int): Page number in list
+        total (int): Count of selected pages
+        titles (Dict[str, str]): Titles of indexed pages by name
+
+    Returns:
+        str: Module body of page
+    """
+    parent = page.parent or ""
+    values = {
+        "title": page.title,
+        "title_linked": f"[[[/{page.name}|{page.title}]]]",
+        "linked_title": f"[[[/{page.name}|{page.title}]]]",
+        "name": short(page.name),
+        "fullname": page.name,
+        "category": page.category,
+        "link": f"http://{context.site}/{page.name}",
+        "tags": " ".join(tag for tag in page.tags if not tag.startswith("_")),
+        "_tags": " ".join(tag for tag in page.tags if tag.startswith("_")),
+        "rating": str(page.rating),
+        "parent_fullname": parent,
+        "parent_name": short(parent),
+        "parent_title": titles.get(parent, ""),
+        "index": str(index),
+        "total": str(total),
+    }
+
+    def replace(match: re.Match) -> str:
+        variable, format = match.groups()
+        if variable in ("created_at", "updated_at"):
+            return date(getattr(page, variable), format)
+        return values.get(variable, match.group(0))
+
+    return VARIABLE.sub(replace, body)
+
+
+def section(body: str, name: str) -> Optional[str]:
+    """Get [[head]], [[body]] or [[foot]] section of module body
+
+    Args:
+        body (str): Module body
+        name (str): Section name
+
+    Returns:
+        Optional[str]: Section content or None if there is no such section
+    """
+    match = re.search(rf"\[\[{name}\]\]\n?(.*?)\n?\[\[/{name}\]\]", body, re.S | re.I)
+    return match.group(1) if match else None
+
+
+def render(args: str, body: str, pages: List[IndexedPage], context: Context) -> str:
+    """Render module to Wikidot markup
+
+    Args:
+        args (str): Module block arguments
+        body (str): Module body
+        pages (List[IndexedPage]): Indexed pages of site
+        context (Context): Page the module is evaluated on
+
+    Returns:
+        str: Module output
+    """
+    params = parameters(args)
+    selected, total = select(pages, params, context)
+    body = body.strip("\n")
+
+    if args.lower().split()[0] == "countpages":
+        return VARIABLE.sub(
+            lambda match: str(total) if match.group(1) == "total" else match.group(0), body or "%%total%%"
+        )
+    if not selected:
+        return ""
+
+    titles = {page.name: page.title for page in pages}
+    head, item, foot = section(body, "head"), section(body, "body"), section(body, "foot")
+    if item is None:
+        item = body or "%%title_linked%%"
+    wrapper = params.get("wrapper", "yes").lower() not in ("no", "false")
+    separate = wrapper and params.get("separate", "yes").lower() not in ("no", "false")
+
+    items = [substitute(item, page, context, index, total, titles) for index, page in enumerate(selected, 1)]
+    if separate:
+        items = [f'[[div class="list-pages-item"]]\n{text}\n[[/div]]' for text in items]
+    lines = [params.get("prependline"), head, *items, foot, params.get("appendline")]
+    output = "\n".join(line for line in lines if line)
+    return f'[[div class="list-pages-box"]]\n{output}\n[[/div]]' if wrapper else output
@@ -3,12 +3,13 @@
 from skippy.api import Singleton
 
 from skippy.core.fields import AbstractField
+from skippy.core.processors import ProcessorRegistry, ProcessorSpec
 
 from skippy.utils.logger import log
 
 import skippy.config
 
-from typing import Iterator, Optional, Callable, Union, Dict, List, Any
+from typing import Iterator, Optional, Callable, Union, Dict, List, Tuple, Any
 from abc import ABCMeta, abstractmethod
 from pathlib import Path
 import importlib
@@ -69,7 +70,18 @@ class ABCPluginMeta(PluginMeta, ABCMeta):
 
 
 class AbstractPlugin(metaclass=ABCPluginMeta):
-    """Base plugin class"""
+    """Base plugin class
+
+    Preview processors are declared by plugin, not registered by it: they
+    must be known once plugin is loaded and its settings are loaded, so
+    they are declared on class or built in ``__init__``, never in ``start``.
+    Plugin loader registers them after ``start`` and removes them before
+    ``stop``, render workers register them after ``load_settings`` without
+    starting plugin.
+
+    Attributes:
+        processors (Tuple[ProcessorSpec, ...]): Preview processors declared by plugin
+    """
 
     __alias__: str
 
@@ -77,6 +89,8 @@ class AbstractPlugin(metaclass=ABCPluginMeta):
     __author__: str
     __version__: str
 
+    processors: Tuple[ProcessorSpec, ...] = ()
+
     def __init__(self):
         self._settingsPath: Path = skippy.config.PLUGINS_FOLDER / f"{self.__alias__}.toml"
         self._fields: Dict[str, AbstractField] = {}
@@ -152,11 +166,17 @@ class PluginLoader(metaclass=Singleton):
         for plugin in self._plugins:
             plugin.load_settings()
             plugin.start()
+            for spec in plugin.processors:
+                spec.owner = plugin.__alias__
+                spec.module = type(plugin).__module__
+                ProcessorRegistry().add(spec)
             log.debug(f"{plugin.__alias__} was started")
 
     def stop_plugins(self):
         """Stop all plugins"""
         for plugin in self._plugins:
+            for spec in plugin.processors:
+                ProcessorRegistry().remove(spec.name)
             plugin.stop()
             plugin.save_settings()
             log.debug(f"{plugin.__alias__} was stoped")
@@ -0,0 +1,404 @@
+"""Process pool rendering previews outside of GUI process
+
+Worker processes are spawned, so state set up in the GUI process doesn't
+reach them by itself: renderer router settings, processors of started
+plugins and generation of preview caches are sent with every render and
+applied when they change.
+"""
+from skippy.api import Singleton, PageData
+
+from skippy.core import attachments, cancel, preview
+from skippy.core.cache import Cache
+from skippy.core.filestore import AttachmentStore, is_reference
+from skippy.core.processors import ProcessorRegistry, STAGES
+from skippy.core.renderer import RendererRouter
+from skippy.core.report import RenderReport
+from skippy.core.themes import AssetBundle
+
+from skippy.utils.logger import log
+
+import skippy.config
+
+from concurrent.futures import ProcessPoolExecutor, Future
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from multiprocessing.sharedctypes import SynchronizedArray
+from typing import Optional, NamedTuple, Tuple, Dict, List, Set
+import multiprocessing
+import importlib
+import threading
+import hashlib
+import base64
+import uuid
+import os
+
+
+class WorkerSettings(NamedTuple):
+
+    """Settings of GUI process applied in worker processes
+
+    Attributes:
+        race (bool): Race mode of renderer router
+        offline (bool): Offline mode of renderer router
+        plugins (Tuple[Tuple[str, str], ...]): Plugin modules and names of processors they registered
+        caches (int): Generation of preview caches, memory levels are dropped when it changes
+    """
+
+    race: bool
+    offline: bool
+    plugins: Tuple[Tuple[str, str], ...]
+    caches: int
+
+
+_applied: Optional[WorkerSettings] = None
+
+_registered: List[str] = []
+
+
+def settings() -> WorkerSettings:
+    """Get settings of current process to apply in workers
+
+    Returns:
+        WorkerSettings: Renderer router settings, plugin processors and preview caches generation
+    """
+    router = RendererRouter()
+    specs = [spec for stage in STAGES for spec in ProcessorRegistry().processors(stage) if spec.module]
+    return WorkerSettings(
+        router.race, router.offline_only, tuple((spec.module, spec.name) for spec in specs), Cache.generation
+    )
+
+
+def _configure(settings: WorkerSettings):
+    """Apply settings of GUI process in worker process
+
+    Plugins are imported and their processors are registered without
+    starting plugins, only settings of plugins are loaded.
+
+    Args:
+        settings (WorkerSettings): Settings of GUI process
+    """
+    global _applied
+    if settings == _applied:
+        return
+    router = RendererRouter()
+    router.race = settings.race
+    router.offline_only = settings.offline
+
+    if _applied is not None and settings.caches != _applied.caches:
+        preview.forget_caches()
+
+    if _applied is None or settings.plugins != _applied.plugins:
+        registry = ProcessorRegistry()
+        for name in _registered:
+            registry.remove(name)
+        _registered.clear()
+
+        modules = sorted({module for module, _ in settings.plugins})
+        if modules:
+            # Plugins import skippy.core.plugins, which imports GUI package.
+            import skippy.gui
+            import skippy.core.plugins
+        for module in modules:
+            try:
+                plugin = importlib.import_module(module).load()
+                plugin.load_settings()
+            except Exception as e:
+                log.error(f"Can't load plugin {module} in render worker: {e}")
+                continue
+            for spec in plugin.processors:
+                if (module, spec.name) in settings.plugins:
+                    spec.owner = plugin.__alias__
+                    spec.module = module
+                    registry.add(spec)
+                    _registered.append(spec.name)
+    _applied = settings
+
+
+def _initialize(level: int, generations: SynchronizedArray):
+    """Prepare worker process
+
+    Args:
+        level (int): Log level of parent process
+        generations (SynchronizedArray): Render generations of parent process
+    """
+    log.setLevel(level)
+    cancel.Generations().share(generations)
+
+
+def _warmup() -> int:
+    """Empty task spawning a worker
+
+    Returns:
+        int: Worker process id
+    """
+    return os.getpid()
+
+
+def _render(
+        pdata: PageData,
+        key: Optional[str],
+        files: List[attachments.SharedFile],
+        generation: Optional[Tuple[int, int]],
+        settings: WorkerSettings,
+) -> Tuple[str, RenderReport]:
+    """Render page in worker process
+
+    Args:
+        pdata (PageData): Page data without files
+        key (Optional[str]): Tab key of page files
+        files (List[attachments.SharedFile]): Page files in shared memory
+        generation (Optional[Tuple[int, int]]): Slot and generation of render (None - render can't be cancelled)
+        settings (WorkerSettings): Settings of GUI process
+
+    Returns:
+        Tuple[str, RenderReport]: Rendered HTML and render report
+
+    Raises:
+        RenderCancelled: Render was superseded
+    """
+    _configure(settings)
+    pdata["files"] = attachments.SharedFiles(files)
+    registry = attachments.AttachmentRegistry()
+    if key is not None:
+        registry.register(pdata["files"], key)
+    try:
+        with cancel.scope(_token(generation)):
+            return preview.render_with_report(pdata)
+    finally:
+        if key is not None:
+            registry.unregister(key)
+
+
+def _token(generation: Optional[Tuple[int, int]]) -> cancel.CancelToken:
+    """Get cancel token of render
+
+    Args:
+        generation (Optional[Tuple[int, int]]): Slot and generation of render
+
+    Returns:
+        cancel.CancelToken: Cancel token
+    """
+    if generation is None:
+        return cancel.CancelToken()
+    return cancel.Generations().token(*generation)
+
+
+class SharedSegment:
+
+    """Shared memory segment holding decoded file source
+
+    Attributes:
+        source (str): Base64 source the segment was created from
+        memory (shared_memory.SharedMemory): Segment
+        file (attachments.SharedFile): Segment reference passed to workers
+    """
+
+    def __init__(self, name: str, source: str):
+        """Initializing shared segment
+
+        Args:
+            name (str): File name
+            source (str): Base64 file source or stored file reference
+        """
+        self.source = source
+        if is_reference(source):
+            path = AttachmentStore().path(source)
+            size = path.stat().st_size
+            self.memory = shared_memory.SharedMemory(create=True, size=max(size, 1))
+            with open(path, "rb") as file:
+                file.readinto(self.memory.buf[:size])
+        else:
+            data = base64.b64decode(source)
+            size = len(data)
+            self.memory = shared_memory.SharedMemory(create=True, size=max(size, 1))
+            self.memory.buf[:size] = data
+        self.file = attachments.SharedFile(
+            name, self.memory.name, size, hashlib.sha256(source.encode("utf-8")).hexdigest()
+        )
+
+    def release(self):
+        """Close and remove segment"""
+        self.memory.close()
+        try:
+            self.memory.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class RenderPool(metaclass=Singleton):
+
+    """Warm pool of spawned processes running the preview pipeline
+
+    Page files are passed to workers by reference through shared memory
+    segments, which are reused while file sources don't change.
+
+    Attributes:
+        workers (int): Count of worker processes
+    """
+
+    workers: int = 2
+
+    def __init__(self):
+        """Initializing render pool"""
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._segments: Dict[str, Dict[str, SharedSegment]] = {}
+        self._temporary: Set[str] = set()
+        self._background: Set[str] = set()
+        self._foreground = 0
+        self._idle = threading.Event()
+        self._idle.set()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Spawn worker processes if they aren't running"""
+        with self._lock:
+            if self._executor is not None:
+                return
+            os.environ["SKIPPY_LOG_FILE"] = str(skippy.config.LOG_FILE)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_initialize,
+                initargs=(log.level, cancel.Generations().array),
+            )
+            for _ in range(self.workers):
+                self._executor.submit(_warmup)
+
+    def shutdown(self):
+        """Stop worker processes and remove all shared segments"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+            for key in list(self._segments):
+                self._release(key)
+
+    def share(self, key: str, files: Dict[str, str]) -> List[attachments.SharedFile]:
+        """Put files to shared memory, reusing segments of unchanged files
+
+        Args:
+            key (str): Tab key
+            files (Dict[str, str]): Files dict (name -> base64 source)
+
+        Returns:
+            List[attachments.SharedFile]: Shared files
+        """
+        with self._lock:
+            for registered in list(self._segments):
+                if (
+                    registered != key
+                    and registered not in self._temporary
+                    and not attachments.AttachmentRegistry().registered(registered)
+                ):
+                    self._release(registered)
+
+            segments = self._segments.setdefault(key, {})
+            for name in list(segments):
+                if files.get(name) is not segments[name].source:
+                    segments.pop(name).release()
+            for name, source in list(files.items()):
+                if name not in segments:
+                    segments[name] = SharedSegment(name, source)
+            return [segment.file for segment in segments.values()]
+
+    def _release(self, key: str):
+        """Remove shared segments of tab
+
+        Args:
+            key (str): Tab key
+        """
+        self._temporary.discard(key)
+        for segment in self._segments.pop(key, {}).values():
+            segment.release()
+
+    def submit(self, pdata: PageData, generation: Optional[Tuple[int, int]] = None) -> Future:
+        """Schedule page rendering in worker process
+
+        Files of unregistered pages are shared only for this render.
+
+        Args:
+            pdata (PageData): Page data
+            generation (Optional[Tuple[int, int]], optional): Slot and generation of render (None - render can't be cancelled)
+
+        Returns:
+            Future: Future of rendered HTML and render report
+        """
+        self.start()
+        key = attachments.AttachmentRegistry().key(pdata["files"])
+        shared = key or uuid.uuid4().hex
+        if key is None:
+            with self._lock:
+                self._temporary.add(shared)
+        files = self.share(shared, pdata["files"]) if pdata["files"] else []
+        data = {name: value for name, value in pdata.items() if name != "files"}
+
+        future = self._executor.submit(_render, data, key, files, generation, settings())
+        if key is None:
+            future.add_done_callback(lambda _: self.release(shared))
+        return future
+
+    def release(self, key: str):
+        """Remove shared segments of tab
+
+        Args:
+            key (str): Tab key
+        """
+        with self._lock:
+            self._release(key)
+
+    def render(
+            self, pdata: PageData, channel: Optional[str] = None, background: bool = False
+    ) -> Tuple[str, RenderReport]:
+        """Render page in worker process, falling back to current process if pool is broken
+
+        A render supersedes older renders of the same channel, they stop as
+        soon as possible and never return their result. Background renders
+        give workers away to others: they start only while no other render
+        runs and are cancelled as soon as another render is requested. Theme of
+        page site is discovered here, once per request, workers only read it.
+
+        Args:
+            pdata (PageData): Page data
+            channel (Optional[str], optional): Render channel (None - render can't be cancelled)
+            background (bool, optional): Render yields to other renders (channel is required)
+
+        Returns:
+            Tuple[str, RenderReport]: Rendered HTML and render report
+
+        Raises:
+            RenderCancelled: Render was superseded
+        """
+        AssetBundle().theme(preview.site(pdata))
+        generation = cancel.Generations().advance(channel) if channel is not None else None
+        token = _token(generation)
+        if background:
+            with self._lock:
+                self._background.add(channel)
+            while not self._idle.wait(cancel.POLL):
+                token.check()
+        else:
+            self._preempt()
+        try:
+            result = token.result(self.submit(pdata, generation))
+        except (BrokenProcessPool, OSError, RuntimeError) as e:
+            log.error(f"Render pool failed, rendering in current process: {e}")
+            self.shutdown()
+            with cancel.scope(token):
+                result = preview.render_with_report(pdata)
+        finally:
+            if not background:
+                with self._lock:
+                    self._foreground -= 1
+                    if not self._foreground:
+                        self._idle.set()
+        token.check()
+        return result
+
+    def _preempt(self):
+        """Cancel background renders and hold new ones until this render is done"""
+        with self._lock:
+            self._foreground += 1
+            self._idle.clear()
+            channels = list(self._background)
+        for channel in channels:
+            cancel.Generations().cancel(channel)
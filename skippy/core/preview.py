@@ -1,24 +1,44 @@
 """Wikidot syntax previewer
+
+Attributes:
+    ARGUMENT (Pattern): Pattern of include argument
+    BLOCK (str): Name prefix of regions holding top-level blocks of page content
+    REGION (Pattern): Pattern of updatable region of rendered page
+    SLOT (Pattern): Pattern of include argument slot in included page
 """
 from skippy.api import PageData
 
+from skippy.core import attachments, cancel, chunking, connections, listpages
+from skippy.core.cache import IncludeCache, MarkdownCache, RenderCache, digest
+from skippy.core.filestore import AttachmentStore
+from skippy.core.processors import ProcessorRegistry, ProcessorSpec
+from skippy.core.renderer import AbstractRenderer, RendererRouter
+from skippy.core.scpclient import SCPClient
+from skippy.core.report import ProcessorTiming, RenderReport
+from skippy.core.siteindex import SiteIndex
+from skippy.core.themes import AssetBundle, host
+from skippy.core.tokenizer import Document, Block, tokenize, splice
+
 from skippy.utils.logger import log
 
-from requests.exceptions import RequestException
-from typing import Dict, List, Type
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple, Dict, List, Type, Set
 from abc import ABCMeta, abstractmethod
+from html.parser import HTMLParser
 import unicodedata
-import pyscp
+import cProfile
 import html
+import time
 import re
 
-try:
-    import pyftml
-except ImportError:
-    class pyftml:
-        @staticmethod
-        def render_html(_: str) -> Dict[str, str]:
-            return {"body": "<h1>Error</h1><p>You don't have \"pyftml\" module installed. Therefore, offline preview is not possible.</p>"}
+
+REGION = re.compile(r"<!--region:([\w-]+)-->(.*?)<!--/region:\1-->", re.DOTALL)
+
+BLOCK = "block-"
+
+SLOT = re.compile(r"\{\$([\w-]+)\}")
+
+ARGUMENT = re.compile(r"([\w-]+)(?:\s|)=(?:\s|)((?:.|\n+?)+)")
 
 
 def render(pdata: PageData) -> str:
@@ -30,9 +50,263 @@ def render(pdata: PageData) -> str:
     Returns:
         str: Rendered HTML
     """
-    preprocess = PreProcessorsHandler(pdata).process()
-    htmlprocess = HTMLProcessorsHandler(preprocess, pdata).process()
-    return PostProcessorsHandler(htmlprocess, pdata).process()
+    return render_with_report(pdata)[0]
+
+
+def render_with_report(pdata: PageData, profile: bool = False) -> Tuple[str, RenderReport]:
+    """Render page by page data and report time spent by each processor
+
+    Args:
+        pdata (PageData): Page data (title, source, tags and files)
+        profile (bool, optional): Capture cProfile statistics of the render thread
+
+    Returns:
+        Tuple[str, RenderReport]: Rendered HTML and render report
+    """
+    report = RenderReport()
+    profiler = cProfile.Profile() if profile else None
+    start = time.perf_counter()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        preprocess = PreProcessorsHandler(pdata, report).process()
+        handler = HTMLProcessorsHandler(preprocess, pdata, report)
+        handler.markdown()
+        report.renderer = handler.renderer
+
+        key = render_key(preprocess, pdata, handler.renderer)
+        result = RenderCache().get(key) if key is not None else None
+        report.cached = result is not None
+        if result is None:
+            cancel.check()
+            result = PostProcessorsHandler(handler.process(), pdata, report).process()
+            if key is not None:
+                RenderCache().set(key, result)
+        result = attachments.resolve(result, attachments.AttachmentRegistry().key(pdata["files"]))
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            report.attach_profile(profiler)
+        report.seconds = time.perf_counter() - start
+
+    log.debug(f"Preview report:\n{report}")
+    log.debug(f"Preview cache stats: {cache_stats()}")
+    return result, report
+
+
+def render_key(source: str, pdata: PageData, renderer: str) -> Optional[str]:
+    """Get render cache key
+
+    Args:
+        source (str): Preprocessed page source
+        pdata (PageData): Page data
+        renderer (str): Name of renderer used for page body
+
+    Returns:
+        Optional[str]: Digest of everything rendered page depends on (None - page mustn't be cached)
+    """
+    renderer = RendererRouter().cache_key(renderer)
+    if renderer is None:
+        return None
+    files = attachments.digests(pdata["files"])
+    registered = attachments.AttachmentRegistry().key(pdata["files"]) is not None
+    return digest(source, pdata["title"], sorted(pdata["tags"]), files, registered, theme(pdata), renderer)
+
+
+def fingerprint(pdata: PageData) -> str:
+    """Get digest of page data identifying a rendered page without rendering it
+
+    Args:
+        pdata (PageData): Page data
+
+    Returns:
+        str: Digest of page title, source, tags, link and files
+    """
+    return digest(
+        pdata["source"], pdata["title"], sorted(pdata["tags"]), pdata["link"], attachments.digests(pdata["files"])
+    )
+
+
+def theme(pdata: PageData) -> List[str]:
+    """Get theme stylesheets of page site, themes are discovered and bundled outside of render
+
+    Args:
+        pdata (PageData): Page data
+
+    Returns:
+        List[str]: Stylesheet URLs
+    """
+    return AssetBundle().stylesheets(site(pdata))
+
+
+def site(pdata: PageData) -> Optional[str]:
+    """Get site of page
+
+    Args:
+        pdata (PageData): Page data
+
+    Returns:
+        Optional[str]: Site name or URL (None - page isn't linked to a site)
+    """
+    return pdata["link"][0] if pdata["link"] else None
+
+
+def regions(page: str) -> Tuple[str, Dict[str, str]]:
+    """Split rendered page to static shell and updatable regions
+
+    Regions are parts of the page template between "<!--region:name-->" and
+    "<!--/region:name-->" markers (title, content and tags). Top-level blocks
+    of content are regions nested in content region, they are returned too.
+
+    Args:
+        page (str): Rendered HTML page
+
+    Returns:
+        Tuple[str, Dict[str, str]]: Page with emptied regions and regions content by name
+    """
+    parts = {}
+
+    def extract(match: re.Match) -> str:
+        parts[match.group(1)] = match.group(2)
+        return f"<!--region:{match.group(1)}--><!--/region:{match.group(1)}-->"
+
+    shell = REGION.sub(extract, page)
+    for match in REGION.finditer(parts.get("content", "")):
+        if match.group(1).startswith(BLOCK):
+            parts[match.group(1)] = match.group(2)
+    return shell, parts
+
+
+def patches(previous: Dict[str, str], current: Dict[str, str]) -> Dict[str, str]:
+    """Get regions to update in place of a page with the same shell
+
+    Changed content is patched block by block while blocks are the same,
+    otherwise the whole content region is replaced.
+
+    Args:
+        previous (Dict[str, str]): Regions of shown page
+        current (Dict[str, str]): Regions of rendered page
+
+    Returns:
+        Dict[str, str]: Changed regions content by name
+    """
+    changed = {name: part for name, part in current.items() if previous.get(name) != part}
+    blocks = [name for name in current if name.startswith(BLOCK)]
+    if blocks and blocks == [name for name in previous if name.startswith(BLOCK)]:
+        changed.pop("content", None)
+    else:
+        changed = {name: part for name, part in changed.items() if not name.startswith(BLOCK)}
+    return changed
+
+
+class BlockSplitter(HTMLParser):
+
+    """Splitter of rendered HTML to top-level blocks
+
+    Attributes:
+        VOID (Set[str]): Elements without end tag
+    """
+
+    VOID: Set[str] = {
+        "area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"
+    }
+
+    def __init__(self, source: str):
+        """Initializing block splitter
+
+        Args:
+            source (str): Rendered HTML
+        """
+        super(BlockSplitter, self).__init__(convert_charrefs=False)
+        self.source: str = source
+        self.lines: List[int] = [0] + [match.end() for match in re.finditer("\n", source)]
+        self.depth: int = 0
+        self.bounds: List[int] = []
+
+    def _offset(self) -> int:
+        line, column = self.getpos()
+        return self.lines[line - 1] + column
+
+    def _close(self, end: str = ">"):
+        """Mark end of top-level block ending with markup at current position
+
+        Args:
+            end (str, optional): End of the markup
+        """
+        if self.depth == 0:
+            self.bounds.append(self.source.index(end, self._offset()) + len(end))
+
+    def handle_starttag(self, tag: str, attrs: List):
+        if tag in self.VOID:
+            self._close()
+        else:
+            self.depth += 1
+
+    def handle_startendtag(self, tag: str, attrs: List):
+        self._close()
+
+    def handle_endtag(self, tag: str):
+        if tag in self.VOID:
+            return
+        self.depth -= 1
+        if self.depth < 0:
+            raise ValueError(f"unexpected end tag </{tag}>")
+        self._close()
+
+    def handle_comment(self, data: str):
+        self._close("-->")
+
+    def split(self) -> List[str]:
+        """Split HTML to top-level blocks, HTML that can't be split is one block
+
+        Returns:
+            List[str]: Blocks, they add up to the whole HTML
+        """
+        try:
+            self.feed(self.source)
+            self.close()
+        except ValueError:
+            return [self.source]
+        if self.depth != 0:
+            return [self.source]
+        bounds = [0] + [bound for bound in self.bounds if bound < len(self.source.rstrip())] + [len(self.source)]
+        return [self.source[start:end] for start, end in zip(bounds, bounds[1:]) if start < end]
+
+
+def blocks(content: str) -> str:
+    """Mark top-level blocks of page content as regions
+
+    Args:
+        content (str): Rendered page content
+
+    Returns:
+        str: Content with every block wrapped in "<!--region:block-N-->" markers
+    """
+    return "".join(
+        f"<!--region:{BLOCK}{index}-->{block}<!--/region:{BLOCK}{index}-->"
+        for index, block in enumerate(BlockSplitter(content).split())
+    )
+
+
+def cache_stats() -> Dict[str, Dict[str, float]]:
+    """Get statistics of all preview caches
+
+    Returns:
+        Dict[str, Dict[str, float]]: Statistics by cache name
+    """
+    return {cache.name: cache.stats() for cache in (IncludeCache(), MarkdownCache(), RenderCache())}
+
+
+def clear_caches():
+    """Remove all items of all preview caches"""
+    for cache in (IncludeCache(), MarkdownCache(), RenderCache()):
+        cache.clear()
+
+
+def forget_caches():
+    """Remove memory levels of all preview caches, keeping disk levels"""
+    for cache in (IncludeCache(), MarkdownCache(), RenderCache()):
+        cache.forget()
 
 
 #################################################
@@ -40,9 +314,14 @@ def render(pdata: PageData) -> str:
 #################################################
 class AbstractProcessor(metaclass=ABCMeta):
 
-    """Abstract processor class"""
+    """Abstract processor class
+
+    Attributes:
+        block (Optional[str]): Block name the processor works on (None - always applicable)
+    """
 
     pattern: str
+    block: Optional[str] = None
 
     def __init__(self, source: str, pdata: PageData):
         """Initializing Processor
@@ -54,6 +333,27 @@ class AbstractProcessor(metaclass=ABCMeta):
         self.source: str = source
         self.pdata: PageData = pdata
 
+    @classmethod
+    def applicable(cls, document: Document) -> bool:
+        """Check if processor has anything to do in the document
+
+        Args:
+            document (Document): Tokenized source
+
+        Returns:
+            bool: Does processor's block appear in the document
+        """
+        return cls.block is None or document.has(cls.block)
+
+    @property
+    def document(self) -> Document:
+        """Get block tree of source
+
+        Returns:
+            Document: Tokenized source
+        """
+        return tokenize(self.source)
+
     @property
     def matches(self) -> List:
         """Get all matches in source by pattern
@@ -66,6 +366,14 @@ class AbstractProcessor(metaclass=ABCMeta):
             self.source,
         )
 
+    def count(self) -> Optional[int]:
+        """Count items the processor works on
+
+        Returns:
+            Optional[int]: Count of processor's blocks (None - processor works on the whole page)
+        """
+        return len(self.document.find(self.block)) if self.block is not None else None
+
     @abstractmethod
     def process(self):
         """Abstract process method"""
@@ -74,36 +382,99 @@ class AbstractProcessor(metaclass=ABCMeta):
 
 class ProcessorsHandlerBase:
 
-    """Abstract processor's handler class"""
+    """Abstract processor's handler class
 
-    def __init__(self, source: str, pdata: PageData):
+    Attributes:
+        stage (str): Preview stage whose registered processors the handler runs
+    """
+
+    stage: str = ""
+
+    def __init__(self, source: str, pdata: PageData, report: Optional[RenderReport] = None):
         """Summary
 
         Args:
             source (str): Page source
             pdata (PageData): Page data
+            report (Optional[RenderReport], optional): Report receiving processors timings
         """
         self.source: str = source
         self.pdata: PageData = pdata
-        self.processors: List[Type[AbstractProcessor]] = []
+        self.processors: List[ProcessorSpec] = ProcessorRegistry().processors(self.stage)
+        self.report: RenderReport = report if report is not None else RenderReport()
 
     def register(self, processor: Type[AbstractProcessor]):
-        """Register a processor
+        """Register a processor for this handler only
 
         Args:
             processor (Type[_Processor]): Processor class
         """
-        self.processors.append(processor)
+        self.processors.append(ProcessorSpec(processor, self.stage, budget=None))
+
+    @property
+    def document(self) -> Document:
+        """Get block tree of source
+
+        Returns:
+            Document: Tokenized source
+        """
+        return tokenize(self.source)
+
+    def applicable(self, spec: ProcessorSpec) -> bool:
+        """Check if processor should run and report it otherwise
+
+        Args:
+            spec (ProcessorSpec): Processor declaration
+
+        Returns:
+            bool: Should processor run
+        """
+        if spec.applicable(self.document, self.pdata):
+            return True
+        self.report.skip(spec.stage, spec.name)
+        return False
+
+    def run(self, spec: ProcessorSpec, processor: AbstractProcessor, source: str) -> str:
+        """Run processor, record its timing and track its budget
+
+        Args:
+            spec (ProcessorSpec): Processor declaration
+            processor (AbstractProcessor): Processor
+            source (str): Processor input used for size measurement
+
+        Returns:
+            str: Processor output
+        """
+        matches = processor.count()
+        start = time.perf_counter()
+        try:
+            result = processor.process()
+        except Exception:
+            seconds = time.perf_counter() - start
+            self.report.record(ProcessorTiming(
+                spec.stage, spec.name, seconds, len(source), len(source), matches, failed=True,
+            ))
+            spec.track(seconds)
+            raise
+        seconds = time.perf_counter() - start
+        self.report.record(ProcessorTiming(
+            spec.stage, spec.name, seconds, len(source), len(result), matches,
+        ))
+        spec.track(seconds)
+        return result
 
     def process(self) -> str:
-        """Run all processor
+        """Run all applicable processors
 
         Returns:
             str: Processed source
         """
-        for processor in self.processors:
+        for spec in self.processors:
+            cancel.check()
+            if not self.applicable(spec):
+                continue
             try:
-                self.source = processor(self.source, self.pdata).process()
+                self.source = self.run(spec, spec.processor(self.source, self.pdata), self.source)
             except Exception as e:
                 log.error(e, exc_info=True)
         return self.source
@@ -116,34 +487,52 @@ class PreProcessorsHandler(ProcessorsHandlerBase):
 
     """Handler of preprocessors"""
 
-    def __init__(self, pdata: PageData):
+    stage: str = "pre"
+
+    def __init__(self, pdata: PageData, report: Optional[RenderReport] = None):
         """Initializing preprocessors handler
 
         Args:
             pdata (PageData): Page data
+            report (Optional[RenderReport], optional): Report receiving processors timings
         """
-        super(PreProcessorsHandler, self).__init__(pdata["source"], pdata)
-        self.register(IncludesProcessor)
-        self.register(IftagsProcessor)
+        super(PreProcessorsHandler, self).__init__(pdata["source"], pdata, report)
 
 
 class HTMLProcessorsHandler(ProcessorsHandlerBase):
 
     """Handler of HTML processors"""
 
-    def __init__(self, source: str, pdata: PageData):
+    stage: str = "html"
+
+    def __init__(self, source: str, pdata: PageData, report: Optional[RenderReport] = None):
         """Initializing HTML processors handler
 
         Args:
             source (str): Page source
             pdata (PageData): Page data
+            report (Optional[RenderReport], optional): Report receiving processors timings
         """
-        super(HTMLProcessorsHandler, self).__init__(source, pdata)
-        self.register(MarkdownProcessor)
-        self.register(InsertDataProcessor)
-        self.register(ModuleCSSProcessor)
+        super(HTMLProcessorsHandler, self).__init__(source, pdata, report)
 
         self.html: str = ""
+        self.renderer: Optional[str] = None
+
+    def markdown(self) -> str:
+        """Run the first enabled markdown processor once
+
+        Returns:
+            str: Rendered page body
+        """
+        if self.renderer is None:
+            for spec in ProcessorRegistry().processors("markdown"):
+                if spec.enabled:
+                    cancel.check()
+                    processor = spec.processor(self.source, self.pdata)
+                    self.html = self.run(spec, processor, self.source)
+                    self.renderer = getattr(processor, "renderer", None) or spec.name
+                    break
+        return self.html
 
     def process(self) -> str:
         """Run all processor
@@ -151,10 +540,13 @@ class HTMLProcessorsHandler(ProcessorsHandlerBase):
         Returns:
             str: Processed source
         """
-        self.html = self.processors[0](self.source, self.pdata).process()
-        for processor in self.processors[1:]:
+        self.markdown()
+        for spec in self.processors:
+            cancel.check()
+            if not self.applicable(spec):
+                continue
             try:
-                self.html = processor(self.source, self.pdata, self.html).process()
+                self.html = self.run(spec, spec.processor(self.source, self.pdata, self.html), self.html)
             except Exception as e:
                 log.error(e, exc_info=True)
         return self.html
@@ -164,16 +556,17 @@ class PostProcessorsHandler(ProcessorsHandlerBase):
 
     """Handler of postprocessors"""
 
-    def __init__(self, source: str, pdata: PageData):
+    stage: str = "post"
+
+    def __init__(self, source: str, pdata: PageData, report: Optional[RenderReport] = None):
         """Initializing postprocessors handler
 
         Args:
             source (str): Page source
             pdata (PageData): Page data
+            report (Optional[RenderReport], optional): Report receiving processors timings
         """
-        super(PostProcessorsHandler, self).__init__(source, pdata)
-        self.register(LocalImagesProcessor)
-        self.register(HTMLTagsProcessor)
+        super(PostProcessorsHandler, self).__init__(source, pdata, report)
 
 
 #################################################
@@ -183,42 +576,293 @@ class IncludesProcessor(AbstractProcessor):
 
     """Include processor"""
 
-    pattern: str = r"(\[\[include\s(?::(.+?):|)((?:.+?:|)[\d\w-]+)(?:\s((?:.|\n)+?)|)]])"
+    block: str = "include"
 
-    def process(self, iteration: int = 0) -> str:
-        """Replace all include tags with included page source
+    depth: int = 5
+    workers: int = 8
+
+    @staticmethod
+    def fetch(site: str, page: str) -> "IncludeTemplate":
+        """Get included page template from include cache or from Wikidot, only from cache offline
 
         Args:
-            iteration (int, optional): Include iteration (max=5)
+            site (str): Wikidot site name
+            page (str): Page name
 
         Returns:
-            str: Processed source
+            IncludeTemplate: Included page template
+
+        Raises:
+            ConnectionError: Page isn't cached and current process is offline
+        """
+
+        def source() -> str:
+            if connections.is_offline():
+                raise ConnectionError(f"Included page {site}/{page} isn't cached and can't be fetched offline")
+            return SCPClient().wiki(site)(page).source
+
+        return IncludeCache().template(IncludeCache.key(site, page), source, IncludeTemplate)
+
+    @classmethod
+    def fetch_all(cls, targets: Set[Tuple[str, str]]) -> Dict[Tuple[str, str], Optional["IncludeTemplate"]]:
+        """Fetch included pages concurrently, one request per unique target
+
+        If render gets stale, queued requests are cancelled and running ones
+        are left to finish into include cache.
+
+        Args:
+            targets (Set[Tuple[str, str]]): Set of (site, page) targets
+
+        Returns:
+            Dict[Tuple[str, str], Optional[IncludeTemplate]]: Included page templates (None if fetching failed)
+
+        Raises:
+            RenderCancelled: Render was superseded
         """
-        for include in self.matches:
-            site = include[1]
-            page = include[2]
+        templates = {}
+        executor = ThreadPoolExecutor(max_workers=min(cls.workers, len(targets)))
+        try:
+            futures = {target: executor.submit(cls.fetch, *target) for target in sorted(targets)}
+            try:
+                cancel.current().wait(futures.values())
+            except cancel.RenderCancelled:
+                for future in futures.values():
+                    future.cancel()
+                raise
+        finally:
+            executor.shutdown(wait=False)
+
+        for target, future in futures.items():
             try:
-                wiki = pyscp.wikidot.Wiki(site)
-                p = wiki(page).source
-                args = [i[1:] if i.startswith("\n") else i for i in include[3].split("|")]
-                if args[0]:
-                    for arg in args:
-                        argument = re.match(r"([\w-]+)(?:\s|)=(?:\s|)((?:.|\n+?)+)", arg)
-                        if argument:
-                            p = p.replace("{$" + argument.group(1) + "}", argument.group(2))
-                self.source = self.source.replace(include[0], p)
+                templates[target] = future.result()
             except Exception as e:
                 log.error(e)
-        if self.matches and iteration != 5:
-            self.process(iteration + 1)
+                templates[target] = None
+        return templates
+
+    @staticmethod
+    def substitute(source: str, arguments: str) -> str:
+        """Substitute include arguments into included page source
+
+        Args:
+            source (str): Included page source
+            arguments (str): Include arguments
+
+        Returns:
+            str: Included page source with substituted arguments
+        """
+        return IncludeTemplate(source).render(IncludeTemplate.arguments(arguments))
+
+    def process(self) -> str:
+        """Replace all include tags with included page source
+
+        Includes are resolved level by level: every nesting level is fetched
+        concurrently, then the included sources are scanned for the next level.
+        Includes nested deeper than depth or including one of their own
+        ancestors are left as is.
+
+        Returns:
+            str: Processed source
+        """
+        root = IncludeNode(self.source, ())
+        level = [root]
+        for _ in range(self.depth):
+            pending = [(node, index, include) for node in level for index, include in enumerate(node.includes)]
+            targets = {
+                node.target(index) for node, index, _ in pending if node.target(index) not in node.ancestors
+            }
+            if not targets:
+                break
+
+            templates = self.fetch_all(targets)
+
+            level = []
+            for node, index, include in pending:
+                target = node.target(index)
+                if target in node.ancestors:
+                    log.warning(f"Include cycle detected: {' -> '.join(map(':'.join, node.ancestors + (target,)))}")
+                elif templates[target] is not None:
+                    child = IncludeNode(
+                        templates[target].render(node.arguments(index)),
+                        node.ancestors + (target,),
+                    )
+                    node.children[index] = child
+                    level.append(child)
+        self.source = root.render()
         return self.source
 
 
+class IncludeNode:
+
+    """Node of includes tree"""
+
+    def __init__(self, source: str, ancestors: Tuple[Tuple[str, str], ...]):
+        """Initializing includes tree node
+
+        Args:
+            source (str): Page source
+            ancestors (Tuple[Tuple[str, str], ...]): (site, page) targets including this source
+        """
+        self.document: Document = tokenize(source)
+        self.ancestors: Tuple[Tuple[str, str], ...] = ancestors
+        self.includes: List[Block] = self.document.find("include")
+        self.children: Dict[int, IncludeNode] = {}
+
+    @staticmethod
+    def parse(include: Block) -> Tuple[str, str, str]:
+        """Parse include block arguments
+
+        Args:
+            include (Block): Include block
+
+        Returns:
+            Tuple[str, str, str]: Site, page and include arguments
+        """
+        args = include.args
+        site = ""
+        if args.startswith(":"):
+            site, _, args = args[1:].partition(":")
+        parts = args.split(None, 1)
+        page = parts[0] if parts else ""
+        return site, page, parts[1] if len(parts) > 1 else ""
+
+    def target(self, index: int) -> Tuple[str, str]:
+        """Get (site, page) target of include
+
+        Args:
+            index (int): Include index
+
+        Returns:
+            Tuple[str, str]: Include target
+        """
+        site, page, _ = self.parse(self.includes[index])
+        return site, page
+
+    def arguments(self, index: int) -> Dict[str, str]:
+        """Get arguments of include
+
+        Args:
+            index (int): Include index
+
+        Returns:
+            Dict[str, str]: Include arguments by name
+        """
+        return IncludeTemplate.arguments(self.parse(self.includes[index])[2])
+
+    def render(self) -> str:
+        """Replace resolved includes with their rendered children
+
+        Returns:
+            str: Source with resolved includes
+        """
+        return self.document.replace(
+            (self.includes[index], child.render()) for index, child in self.children.items()
+        )
+
+
+class IncludeTemplate:
+
+    """Included page source compiled to literal segments and {$name} slots
+
+    Attributes:
+        segments (Tuple[str, ...]): Literal segments, one more than slots
+        slots (Tuple[str, ...]): Argument names of slots
+    """
+
+    def __init__(self, source: str):
+        """Compiling include template
+
+        Args:
+            source (str): Included page source
+        """
+        parts = SLOT.split(source)
+        self.segments: Tuple[str, ...] = tuple(parts[::2])
+        self.slots: Tuple[str, ...] = tuple(parts[1::2])
+
+    @staticmethod
+    def arguments(arguments: str) -> Dict[str, str]:
+        """Parse include arguments, the first of repeated arguments wins
+
+        Nothing is substituted when arguments start with "|".
+
+        Args:
+            arguments (str): Include arguments ("name = value | ...")
+
+        Returns:
+            Dict[str, str]: Argument values by name
+        """
+        args = [arg[1:] if arg.startswith("\n") else arg for arg in arguments.split("|")]
+        values: Dict[str, str] = {}
+        if not args[0]:
+            return values
+        for arg in args:
+            argument = ARGUMENT.match(arg)
+            if argument:
+                values.setdefault(argument.group(1), argument.group(2))
+        return values
+
+    def render(self, arguments: Dict[str, str]) -> str:
+        """Fill slots with argument values, slots without value are kept as is
+
+        Args:
+            arguments (Dict[str, str]): Argument values by name
+
+        Returns:
+            str: Included page source with substituted arguments
+        """
+        if not self.slots:
+            return self.segments[0]
+        parts = [self.segments[0]]
+        for name, segment in zip(self.slots, self.segments[1:]):
+            value = arguments.get(name)
+            parts.append(value if value is not None else "{$" + name + "}")
+            parts.append(segment)
+        return "".join(parts)
+
+
 class IftagsProcessor(AbstractProcessor):
 
     """Iftags processor"""
 
-    pattern: str = r"(\[\[iftags (.+?)]]((?:(?:.|\n|\s)+?))\[\[\/iftags]])"
+    block: str = "iftags"
+
+    def match(self, iftag: Block) -> bool:
+        """Check if iftags block matches with page tags
+
+        Args:
+            iftag (Block): Iftags block
+
+        Returns:
+            bool: Does block match
+        """
+        match = True
+        elem = re.findall(r"(\+.+?(?=\s|$)|-.+?(?=\s|$))", iftag.args)
+        for e in elem:
+            if e.startswith("+"):
+                if e[1:] not in self.pdata["tags"]:
+                    match = False
+            elif e[1:] in self.pdata["tags"]:
+                match = False
+        return match
+
+    def render(self, iftag: Block, nested: Dict[Block, List[Block]]) -> str:
+        """Get content of iftags block with resolved nested iftags
+
+        Args:
+            iftag (Block): Iftags block
+            nested (Dict[Block, List[Block]]): Iftags blocks by nearest iftags ancestor
+
+        Returns:
+            str: Block content if it matches, else empty string
+        """
+        if not self.match(iftag):
+            return ""
+        return splice(
+            self.source,
+            iftag.tag_end,
+            iftag.inner_end,
+            [(child, self.render(child, nested)) for child in nested.get(iftag, [])],
+        )
 
     def process(self) -> str:
         """Remove iftags if it not matches with page tags
@@ -226,17 +870,94 @@ class IftagsProcessor(AbstractProcessor):
         Returns:
             str: Processed source
         """
-        for iftag in self.matches:
-            match = True
-            elem = re.findall(r"(\+.+?(?=\s|$)|-.+?(?=\s|$))", iftag[1])
-            for e in elem:
-                if e.startswith("+"):
-                    if e[1:] not in self.pdata["tags"]:
-                        match = False
-                elif e[1:] in self.pdata["tags"]:
-                    match = False
-            if match:
-                self.source = self.source.replace(iftag[0], iftag[2])
+        nested = {}
+        for iftag in self.document.find("iftags"):
+            if iftag.closed:
+                nested.setdefault(iftag.ancestor("iftags"), []).append(iftag)
+        self.source = self.document.replace(
+            (iftag, self.render(iftag, nested)) for iftag in nested.get(None, [])
+        )
+        return self.source
+
+
+class ListPagesProcessor(AbstractProcessor):
+
+    """ListPages and CountPages processor
+
+    Modules are evaluated against local index of the page site, pages
+    without site are left for the renderer.
+    """
+
+    block: str = "module"
+
+    @classmethod
+    def applicable(cls, document: Document) -> bool:
+        """Check if document has ListPages or CountPages modules
+
+        Args:
+            document (Document): Tokenized source
+
+        Returns:
+            bool: Are there modules to evaluate
+        """
+        return any(cls.emulated(module) for module in document.find(cls.block))
+
+    @staticmethod
+    def emulated(module: Block) -> bool:
+        """Check if module block is closed ListPages or CountPages module
+
+        Args:
+            module (Block): Module block
+
+        Returns:
+            bool: Is module evaluated
+        """
+        return module.closed and listpages.emulated(module.args)
+
+    @property
+    def modules(self) -> List[Block]:
+        """Get ListPages and CountPages modules not nested in other ones
+
+        Returns:
+            List[Block]: Modules
+        """
+        modules = []
+        for module in self.document.find(self.block):
+            parent = module.ancestor(self.block)
+            while parent is not None and not self.emulated(parent):
+                parent = parent.ancestor(self.block)
+            if parent is None and self.emulated(module):
+                modules.append(module)
+        return modules
+
+    def count(self) -> int:
+        """Count ListPages and CountPages modules
+
+        Returns:
+            int: Count of modules
+        """
+        return len(self.modules)
+
+    def process(self) -> str:
+        """Replace ListPages and CountPages modules with their output
+
+        Returns:
+            str: Processed source
+        """
+        if not self.pdata["link"]:
+            return self.source
+        site, name = self.pdata["link"]
+        pages = SiteIndex().pages(site)
+        if pages is None:
+            output = f'[[div class="list-pages-box"]]\n//Page index of {site} is syncing//\n[[/div]]'
+            self.source = self.document.replace((module, output) for module in self.modules)
+            return self.source
+
+        parents = {page.name: page.parent for page in pages}
+        context = listpages.Context(host(site), name, tuple(self.pdata["tags"]), parents.get(name))
+        self.source = self.document.replace(
+            (module, listpages.render(module.args, module.inner, pages, context)) for module in self.modules
+        )
         return self.source
 
 
@@ -245,9 +966,18 @@ class IftagsProcessor(AbstractProcessor):
 #################################################
 class MarkdownProcessor(AbstractProcessor):
 
-    """Markdown processor"""
+    """Markdown processor
+
+    Attributes:
+        renderer (Optional[str]): Name of renderer used by the last process call
+        chunk_threshold (int): Page length from which page is rendered in chunks
+        workers (int): Count of chunks rendered at the same time
+    """
 
-    wiki: pyscp.wikidot.Wiki = pyscp.wikidot.Wiki("www.wikidot.com")
+    renderer: Optional[str] = None
+
+    chunk_threshold: int = chunking.CHUNK_THRESHOLD
+    workers: int = 4
 
     def _wikidot(self) -> str:
         """If connected to internet, get previewed HTML from Wikidot
@@ -255,7 +985,7 @@ class MarkdownProcessor(AbstractProcessor):
         Returns:
             str: Previewed source
         """
-        return self.wiki._module("edit/PagePreviewModule", source=self.source)["body"]
+        return RendererRouter().online.render(self.source)
 
     def _ftml(self) -> str:
         """If don't have connection to internet, get previewed HTML from local FTML previewer
@@ -263,18 +993,139 @@ class MarkdownProcessor(AbstractProcessor):
         Returns:
             str: Previewed source
         """
-        return pyftml.render_html(self.source)["body"]
+        return RendererRouter().offline.render(self.source)
+
+    @staticmethod
+    def cached(source: str) -> Optional[Tuple[str, str]]:
+        """Get rendered source from markdown cache
+
+        A source already rendered by Wikidot is taken even when offline.
+
+        Args:
+            source (str): Wikidot source
+
+        Returns:
+            Optional[Tuple[str, str]]: Renderer name and rendered HTML or None
+        """
+        router = RendererRouter()
+        for renderer in dict.fromkeys((router.online, router.route())):
+            if renderer.cache_key is None:
+                continue
+            html = MarkdownCache().get(digest(source, renderer.cache_key))
+            if html is not None:
+                return renderer.name, html
+        return None
+
+    @staticmethod
+    def store(source: str, renderer: str, html: str):
+        """Put rendered source to markdown cache unless renderer output mustn't be cached
+
+        Args:
+            source (str): Wikidot source
+            renderer (str): Renderer name
+            html (str): Rendered HTML
+        """
+        key = RendererRouter().cache_key(renderer)
+        if key is not None:
+            MarkdownCache().set(digest(source, key), html)
+
+    @classmethod
+    def render(cls, source: str) -> Tuple[str, str]:
+        """Render source by renderer router through markdown cache
+
+        Args:
+            source (str): Wikidot source
+
+        Returns:
+            Tuple[str, str]: Renderer name and rendered HTML
+        """
+        result = cls.cached(source)
+        if result is None:
+            result = RendererRouter().render(source)
+            cls.store(source, *result)
+        return result
+
+    def chunked(self, page: chunking.ChunkedPage) -> Tuple[str, str]:
+        """Render page chunks concurrently and stitch them
+
+        Renderer is chosen once for the whole page, so chunks are never
+        rendered by different renderers. If online renderer fails on any
+        chunk, the whole page is rendered offline. Every chunk goes through
+        markdown cache, so editing a large page rerenders only changed chunks.
+
+        Args:
+            page (chunking.ChunkedPage): Page split to chunks
+
+        Returns:
+            Tuple[str, str]: Renderer name and rendered HTML
+
+        Raises:
+            RenderCancelled: Render was superseded
+        """
+        router = RendererRouter()
+        renderer = router.route()
+        try:
+            return renderer.name, self._chunks(page, renderer)
+        except Exception as e:
+            if renderer is router.offline:
+                raise
+            log.error(f"Can't render page chunks by {renderer.name}, rendering them by {router.offline.name}: {e}")
+            return router.offline.name, self._chunks(page, router.offline)
+
+    def _chunks(self, page: chunking.ChunkedPage, renderer: AbstractRenderer) -> str:
+        """Render page chunks by renderer through markdown cache and stitch them
+
+        Args:
+            page (chunking.ChunkedPage): Page split to chunks
+            renderer (AbstractRenderer): Renderer of all chunks
+
+        Returns:
+            str: Rendered HTML
+
+        Raises:
+            RenderCancelled: Render was superseded
+        """
+
+        def render(source: str) -> str:
+            html = MarkdownCache().get(digest(source, renderer.cache_key)) if renderer.cache_key else None
+            if html is None:
+                html = RendererRouter().render_by(renderer, source)
+                self.store(source, renderer.name, html)
+            return html
+
+        sources = page.sources()
+        executor = ThreadPoolExecutor(max_workers=min(self.workers, len(sources)))
+        try:
+            futures = [executor.submit(render, source) for source in sources]
+            cancel.current().wait(futures)
+        finally:
+            executor.shutdown(wait=False)
+
+        html = page.stitch([future.result() for future in futures])
+        log.debug(f"Page rendered in {len(page.ranges)} chunks by {renderer.name}")
+        return html
 
     def process(self) -> str:
         """Get previewed page with online/offline methods
 
+        A page already rendered by Wikidot is taken from markdown cache even
+        when offline. Otherwise the renderer router decides which renderer to
+        use depending on Wikidot health. Pages longer than chunk_threshold are
+        rendered in chunks when they can be split safely.
+
         Returns:
             str: Processed source
         """
-        try:
-            return self._wikidot()
-        except RequestException:
-            return self._ftml()
+        result = self.cached(self.source)
+        if result is None and len(self.source) >= self.chunk_threshold:
+            page = chunking.ChunkedPage(self.source)
+            if page.splittable:
+                result = self.chunked(page)
+                self.store(self.source, *result)
+        if result is None:
+            result = self.render(self.source)
+        self.renderer, html = result
+        return html
 
 
 class InsertDataProcessor(AbstractProcessor):
@@ -286,9 +1137,7 @@ class InsertDataProcessor(AbstractProcessor):
         <html xmlns="http://www.w3.org/1999/xhtml" xml:lang="ru" lang="ru" pdata-lt-installed="true">
             <head>
                 <style type="text/css">
-                    @import url(http://d3g0gp89917ko0.cloudfront.net/v--3e3a6f7dbcc9/common--theme/base/css/style.css);
-                    @import url(http://scp-ru.wdfiles.com/local--code/component:theme2/1);
-                    @import url(http://d3g0gp89917ko0.cloudfront.net/v--3e3a6f7dbcc9/common--modules/css/pagerate/PageRateWidgetModule.css);
+                    <<THEME>>
                 </style>
                 <script type="text/javascript" src="http://d3g0gp89917ko0.cloudfront.net/v--3e3a6f7dbcc9/common--javascript/init.combined.js"></script>
                 <script type="text/javascript">
@@ -338,14 +1187,14 @@ class InsertDataProcessor(AbstractProcessor):
             <body id="html-body">
                 <div id="dummy-ondomready-block" style="display:none;"></div>
                 <div id="page-title">
-                    <<TITLE>>
+                    <!--region:title--><<TITLE>><!--/region:title-->
                 </div>
                 <div id="page-content" style="min-height: 500px;">
-                    <<CONTENT>>
+                    <!--region:content--><<CONTENT>><!--/region:content-->
                 </div>
                 <div class="page-tags">
                     <span>
-                        <<TAGS>>
+                        <!--region:tags--><<TAGS>><!--/region:tags-->
                     </span>
                 </div>
             </body>
@@ -370,9 +1219,12 @@ class InsertDataProcessor(AbstractProcessor):
             str: Processed HTML page
         """
         self.source = self.html_base.replace(
+            "<<THEME>>", "\n".join(f"@import url({url});" for url in theme(self.pdata))
+        )
+        self.source = self.source.replace(
             "<<TITLE>>", html.escape(self.pdata["title"])
         )
-        self.source = self.source.replace("<<CONTENT>>", self.html)
+        self.source = self.source.replace("<<CONTENT>>", blocks(self.html))
         self.source = self.source.replace(
             "<<TAGS>>",
             " ".join([f"<a href='#'>{tag}</a>" for tag in self.pdata["tags"]]),
@@ -384,8 +1236,6 @@ class ModuleCSSProcessor(AbstractProcessor):
 
     """Module CSS processor"""
 
-    pattern: str = r"\[\[module (?:CSS|css)(?:.+?|)]]\n((?:.|\n)+?)\n\[\[/module]]"
-
     def __init__(self, source: str, pdata: PageData, html_text: str):
         """Initializing Module CSS processor
 
@@ -397,13 +1247,54 @@ class ModuleCSSProcessor(AbstractProcessor):
         super(ModuleCSSProcessor, self).__init__(source, pdata)
         self.html: str = html_text
 
+    @staticmethod
+    def strip(style: str) -> str:
+        """Strip line breaks after opening and before closing tags
+
+        Args:
+            style (str): Module content
+
+        Returns:
+            str: Stripped content
+        """
+        if style.startswith("\n"):
+            style = style[1:]
+        if style.endswith("\n"):
+            style = style[:-1]
+        return style
+
+    @property
+    def modules(self) -> List[Block]:
+        """Get closed [[module CSS]] blocks
+
+        Returns:
+            List[Block]: CSS modules
+        """
+        return [
+            module for module in self.document.find("module")
+            if module.closed and module.args.lower().split()[:1] == ["css"]
+        ]
+
+    def count(self) -> int:
+        """Count CSS modules
+
+        Returns:
+            int: Count of CSS modules
+        """
+        return len(self.modules)
+
     def process(self) -> str:
         """Convert [[module CSS]] block to <style> tag
 
         Returns:
             str: Processed HTML page
         """
-        styles = "\n".join([f"<style>\n{unicodedata.normalize('NFKD', style)}\n</style>" for style in self.matches])
+        styles = "\n".join(
+            [
+                f"<style>\n{unicodedata.normalize('NFKD', self.strip(module.inner))}\n</style>"
+                for module in self.modules
+            ]
+        )
         self.html = self.html.replace("<<MODULE-CSS-PREVIEW>>", styles)
         return self.html
 
@@ -413,10 +1304,23 @@ class ModuleCSSProcessor(AbstractProcessor):
 #################################################
 class LocalImagesProcessor(AbstractProcessor):
 
-    """Local images processor"""
+    """Local images processor
+
+    Images of registered tabs are referenced by previewer URL scheme and
+    read on request, others are inlined as data URIs. Tab key of the URLs
+    is left as a placeholder, so rendered page can be cached across sessions.
+    """
 
     pattern: str = r'<img src="(http://www.wdfiles.com/local--files//|https://sandbox.wjfiles.com/local--files/some-page/)(.+?)"'
 
+    def count(self) -> int:
+        """Count local images
+
+        Returns:
+            int: Count of local images
+        """
+        return len(self.matches)
+
     def process(self) -> str:
         """Insert local images to page
 
@@ -424,9 +1328,16 @@ class LocalImagesProcessor(AbstractProcessor):
             str: Processed HTML page
         """
         files = self.pdata["files"]
+        if not files:
+            return self.source
+        registered = attachments.AttachmentRegistry().key(files) is not None
         for img in self.matches:
             if img[1] in files:
-                self.source = self.source.replace("".join(img), f"data:{img[1].split('.')[1]}/;base64,{files[img[1]]}")
+                if registered:
+                    src = attachments.url(attachments.PLACEHOLDER, img[1])
+                else:
+                    src = f"data:{img[1].split('.')[1]}/;base64,{AttachmentStore().encode(files[img[1]])}"
+                self.source = self.source.replace("".join(img), src)
         return self.source
 
 
@@ -434,7 +1345,7 @@ class HTMLTagsProcessor(AbstractProcessor):
 
     """HTML tags processor"""
 
-    pattern: str = r"(\[\[html(?:(?:.+?)| |)]]((?:.|\n|\s)+?)\[\[\/html]])"
+    block: str = "html"
 
     def process(self) -> str:
         """Unescape [[html]] tags
@@ -442,6 +1353,18 @@ class HTMLTagsProcessor(AbstractProcessor):
         Returns:
             str: Processed HTML page
         """
-        for tag in self.matches:
-            self.source = self.source.replace(tag[0], html.unescape(tag[1]))
+        self.source = self.document.replace(
+            (tag, html.unescape(tag.inner)) for tag in self.document.find("html") if tag.closed
+        )
         return self.source
+
+
+registry = ProcessorRegistry()
+registry.register(IncludesProcessor, "pre", budget=None)
+registry.register(IftagsProcessor, "pre", after=("IncludesProcessor",), budget=None)
+registry.register(ListPagesProcessor, "pre", after=("IftagsProcessor",), budget=None)
+registry.register(MarkdownProcessor, "markdown", budget=None)
+registry.register(InsertDataProcessor, "html", budget=None)
+registry.register(ModuleCSSProcessor, "html", after=("InsertDataProcessor",), budget=None)
+registry.register(LocalImagesProcessor, "post", budget=None)
+registry.register(HTMLTagsProcessor, "post", after=("LocalImagesProcessor",), budget=None)
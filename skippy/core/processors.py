@@ -0,0 +1,250 @@
+"""Registry of preview processors
+
+Attributes:
+    DEFAULT_BUDGET (float): Default time budget of a processor in seconds
+    STAGES (Tuple[str, ...]): Preview stages in run order
+    STRIKES (int): Count of consecutive budget overruns that disables a processor
+"""
+from skippy.api import Singleton, PageData
+
+from skippy.core.tokenizer import Document
+
+from skippy.utils.logger import log
+
+from typing import Optional, Callable, Iterable, Tuple, Dict, List, Type, Any
+import threading
+
+
+STAGES: Tuple[str, ...] = ("pre", "markdown", "html", "post")
+
+DEFAULT_BUDGET = 0.5
+
+STRIKES = 3
+
+Predicate = Callable[[Document, PageData], bool]
+
+
+class ProcessorSpec:
+
+    """Processor declaration
+
+    Processors of "html" stage are created with (source, pdata, html), others
+    with (source, pdata). Only the first enabled "markdown" processor runs.
+
+    Attributes:
+        processor (Type): Processor class
+        name (str): Processor name used in ordering constraints
+        stage (str): Preview stage
+        before (Tuple[str, ...]): Names of processors this one must run before
+        after (Tuple[str, ...]): Names of processors this one must run after
+        predicate (Optional[Predicate]): Cheap check if processor has anything to do
+        budget (Optional[float]): Time budget in seconds (None - unlimited)
+        overruns (int): Count of consecutive budget overruns
+        enabled (bool): Is processor enabled
+        owner (Optional[str]): Alias of plugin which declared the processor
+        module (Optional[str]): Module of plugin which declared the processor
+    """
+
+    def __init__(
+            self,
+            processor: Type,
+            stage: str,
+            before: Iterable[str] = (),
+            after: Iterable[str] = (),
+            predicate: Optional[Predicate] = None,
+            budget: Optional[float] = DEFAULT_BUDGET,
+            name: Optional[str] = None,
+    ):
+        """Initializing processor declaration
+
+        Args:
+            processor (Type): Processor class
+            stage (str): Preview stage
+            before (Iterable[str], optional): Names of processors this one must run before
+            after (Iterable[str], optional): Names of processors this one must run after
+            predicate (Optional[Predicate], optional): Check if processor has anything to do (default - processor's block)
+            budget (Optional[float], optional): Time budget in seconds (None - unlimited)
+            name (Optional[str], optional): Processor name (default - class name)
+
+        Raises:
+            ValueError: Unknown stage
+        """
+        if stage not in STAGES:
+            raise ValueError(f"Unknown preview stage \"{stage}\"")
+        self.processor = processor
+        self.name = name or processor.__name__
+        self.stage = stage
+        self.before = tuple(before)
+        self.after = tuple(after)
+        self.predicate = predicate
+        self.budget = budget
+        self.overruns = 0
+        self.enabled = True
+        self.owner: Optional[str] = None
+        self.module: Optional[str] = None
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.name!r}, {self.stage!r})"
+
+    def applicable(self, document: Document, pdata: PageData) -> bool:
+        """Check if processor should run
+
+        Args:
+            document (Document): Tokenized source
+            pdata (PageData): Page data
+
+        Returns:
+            bool: Is processor enabled and has anything to do
+        """
+        if not self.enabled:
+            return False
+        if self.predicate is not None:
+            return self.predicate(document, pdata)
+        return self.processor.applicable(document)
+
+    def track(self, seconds: float):
+        """Track processor run time and disable it after repeated budget overruns
+
+        Args:
+            seconds (float): Run time
+        """
+        if self.budget is None:
+            return
+        if seconds <= self.budget:
+            self.overruns = 0
+            return
+        self.overruns += 1
+        log.warning(f"{self.name} exceeded its {self.budget} s budget: {seconds:.3f} s")
+        if self.overruns >= STRIKES:
+            self.enabled = False
+            log.warning(f"{self.name} was disabled after {self.overruns} budget overruns")
+
+
+class ProcessorRegistry(metaclass=Singleton):
+
+    """Registry of preview processors ordered by constraints"""
+
+    def __init__(self):
+        """Initializing processor registry"""
+        self._specs: List[ProcessorSpec] = []
+        self._ordered: Dict[str, List[ProcessorSpec]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, spec: ProcessorSpec) -> ProcessorSpec:
+        """Add processor declaration, replacing one with the same name
+
+        Args:
+            spec (ProcessorSpec): Processor declaration
+
+        Returns:
+            ProcessorSpec: Added declaration
+        """
+        with self._lock:
+            self._specs = [registered for registered in self._specs if registered.name != spec.name]
+            self._specs.append(spec)
+            self._ordered.clear()
+        return spec
+
+    def register(self, processor: Type, stage: str, **kwargs: Any) -> ProcessorSpec:
+        """Declare and add processor
+
+        Args:
+            processor (Type): Processor class
+            stage (str): Preview stage
+            **kwargs (Any): Other ProcessorSpec arguments
+
+        Returns:
+            ProcessorSpec: Added declaration
+        """
+        return self.add(ProcessorSpec(processor, stage, **kwargs))
+
+    def remove(self, name: str):
+        """Remove processor by name
+
+        Args:
+            name (str): Processor name
+        """
+        with self._lock:
+            self._specs = [spec for spec in self._specs if spec.name != name]
+            self._ordered.clear()
+
+    def get(self, name: str) -> Optional[ProcessorSpec]:
+        """Get processor declaration by name
+
+        Args:
+            name (str): Processor name
+
+        Returns:
+            Optional[ProcessorSpec]: Processor declaration or None
+        """
+        for spec in self._specs:
+            if spec.name == name:
+                return spec
+        return None
+
+    def enable(self, name: str):
+        """Enable processor and reset its overruns
+
+        Args:
+            name (str): Processor name
+        """
+        spec = self.get(name)
+        if spec is not None:
+            spec.enabled = True
+            spec.overruns = 0
+
+    def processors(self, stage: str) -> List[ProcessorSpec]:
+        """Get processors of stage in run order
+
+        Args:
+            stage (str): Preview stage
+
+        Returns:
+            List[ProcessorSpec]: Ordered processor declarations
+        """
+        with self._lock:
+            if stage not in self._ordered:
+                self._ordered[stage] = self._order([spec for spec in self._specs if spec.stage == stage])
+            return list(self._ordered[stage])
+
+    @staticmethod
+    def _order(specs: List[ProcessorSpec]) -> List[ProcessorSpec]:
+        """Sort processors topologically keeping registration order where unconstrained
+
+        Constraints naming unknown processors are ignored, on a cycle
+        registration order is used.
+
+        Args:
+            specs (List[ProcessorSpec]): Processor declarations in registration order
+
+        Returns:
+            List[ProcessorSpec]: Ordered processor declarations
+        """
+        names = {spec.name: spec for spec in specs}
+        edges: Dict[str, List[str]] = {spec.name: [] for spec in specs}
+        degree = {spec.name: 0 for spec in specs}
+        for spec in specs:
+            for name in spec.after:
+                if name in names:
+                    edges[name].append(spec.name)
+                    degree[spec.name] += 1
+            for name in spec.before:
+                if name in names:
+                    edges[spec.name].append(name)
+                    degree[name] += 1
+
+        ordered = []
+        ready = [spec.name for spec in specs if not degree[spec.name]]
+        while ready:
+            name = ready.pop(0)
+            ordered.append(names[name])
+            for following in edges[name]:
+                degree[following] -= 1
+                if not degree[following]:
+                    ready.append(following)
+            ready.sort(key=lambda name: specs.index(names[name]))
+
+        if len(ordered) != len(specs):
+            log.error(f"Preview processors have cyclic ordering constraints: {specs}")
+            return specs
+        return ordered
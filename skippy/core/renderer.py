@@ -0,0 +1,325 @@
+"""Online/offline renderers routing
+"""
+from skippy.api import Singleton
+
+from skippy.core import cancel, connections
+
+from skippy.utils.logger import log
+
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED
+from requests.exceptions import RequestException
+from abc import ABCMeta, abstractmethod
+from typing import Optional, Tuple
+import threading
+import requests
+import time
+
+try:
+    import pyftml
+except ImportError:
+    pyftml = None
+
+
+class AbstractRenderer(metaclass=ABCMeta):
+
+    """Abstract renderer class"""
+
+    name: str
+
+    @property
+    def cache_key(self) -> Optional[str]:
+        """Get renderer part of cache keys of its output
+
+        Returns:
+            Optional[str]: Renderer name (None - output mustn't be cached)
+        """
+        return self.name
+
+    @abstractmethod
+    def render(self, source: str) -> str:
+        """Abstract render method"""
+        pass
+
+
+class WikidotRenderer(AbstractRenderer):
+
+    """Online renderer using Wikidot PagePreviewModule
+
+    Attributes:
+        timeout (Tuple[float, float]): Connect and read timeouts in seconds
+    """
+
+    name: str = "wikidot"
+
+    site: str = "http://www.wikidot.com"
+    timeout: Tuple[float, float] = (3.05, 15.0)
+
+    def __init__(self):
+        """Initializing Wikidot renderer"""
+        self.session = connections.session()
+
+    def render(self, source: str) -> str:
+        """Render source by Wikidot
+
+        Args:
+            source (str): Wikidot source
+
+        Returns:
+            str: Rendered HTML
+
+        Raises:
+            RuntimeError: Wikidot returned not "ok" status
+        """
+        response = self.session.post(
+            self.site + "/ajax-module-connector.php",
+            data={
+                "moduleName": "edit/PagePreviewModule",
+                "wikidot_token7": "123456",
+                "source": source,
+            },
+            headers={"Cookie": "wikidot_token7=123456;"},
+            timeout=self.timeout,
+        ).json()
+        if response["status"] != "ok":
+            raise RuntimeError(response.get("message") or response["status"])
+        return response["body"]
+
+    def probe(self) -> bool:
+        """Check if Wikidot is reachable
+
+        Returns:
+            bool: Is Wikidot healthy
+        """
+        try:
+            return self.session.head(self.site, timeout=self.timeout).status_code < 500
+        except RequestException:
+            return False
+
+
+class FTMLRenderer(AbstractRenderer):
+
+    """Offline renderer using pyftml
+
+    Without pyftml installed it renders an error message, which isn't cached.
+    """
+
+    name: str = "ftml"
+
+    @property
+    def cache_key(self) -> Optional[str]:
+        """Get renderer part of cache keys of its output, pyftml version included
+
+        Returns:
+            Optional[str]: Renderer name and pyftml version (None - pyftml isn't installed)
+        """
+        if pyftml is None:
+            return None
+        return f"{self.name}-{getattr(pyftml, '__version__', 'unknown')}"
+
+    def render(self, source: str) -> str:
+        """Render source by local FTML
+
+        Args:
+            source (str): Wikidot source
+
+        Returns:
+            str: Rendered HTML
+        """
+        if pyftml is None:
+            return "<h1>Error</h1><p>You don't have \"pyftml\" module installed. Therefore, offline preview is not possible.</p>"
+        return pyftml.render_html(source)["body"]
+
+
+class CircuitBreaker:
+
+    """Circuit breaker tracking health of online renderer
+
+    Attributes:
+        threshold (int): Count of consecutive failures that opens the circuit
+        failures (int): Count of consecutive failures
+    """
+
+    def __init__(self, threshold: int = 3):
+        """Initializing circuit breaker
+
+        Args:
+            threshold (int, optional): Count of consecutive failures that opens the circuit
+        """
+        self.threshold = threshold
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    @property
+    def closed(self) -> bool:
+        """Is online renderer considered healthy
+
+        Returns:
+            bool: Is circuit closed
+        """
+        return self.failures < self.threshold
+
+    def success(self):
+        """Register successful request and close the circuit"""
+        with self._lock:
+            if not self.closed:
+                log.info("Wikidot is reachable again, online preview enabled")
+            self.failures = 0
+
+    def failure(self, fatal: bool = False):
+        """Register failed request
+
+        Args:
+            fatal (bool, optional): Open the circuit immediately
+        """
+        with self._lock:
+            was_closed = self.closed
+            self.failures = self.threshold if fatal else self.failures + 1
+            if was_closed and not self.closed:
+                log.warning("Wikidot is unreachable, offline preview enabled")
+
+
+class RendererRouter(metaclass=Singleton):
+
+    """Router choosing between online and offline renderers
+
+    Attributes:
+        race (bool): Start both renderers and use whichever finishes first
+        offline_only (bool): Never use online renderer
+        probe_interval (float): Seconds between background health probes while circuit is open
+    """
+
+    probe_interval: float = 30.0
+
+    def __init__(self):
+        """Initializing renderer router"""
+        self.online = WikidotRenderer()
+        self.offline = FTMLRenderer()
+        self.breaker = CircuitBreaker()
+        self.race = False
+        self.offline_only = False
+
+        self._executor = ThreadPoolExecutor(max_workers=4)
+        self._probe: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def route(self) -> AbstractRenderer:
+        """Get renderer that will be used for the next render
+
+        Returns:
+            AbstractRenderer: Online renderer if it's healthy, else offline renderer
+        """
+        return self.online if self.breaker.closed and not self.offline_only else self.offline
+
+    def cache_key(self, name: str) -> Optional[str]:
+        """Get cache key part of renderer output
+
+        Args:
+            name (str): Renderer name
+
+        Returns:
+            Optional[str]: Cache key part (None - output mustn't be cached or renderer is unknown)
+        """
+        for renderer in (self.online, self.offline):
+            if renderer.name == name:
+                return renderer.cache_key
+        return None
+
+    def render(self, source: str) -> Tuple[str, str]:
+        """Render source by the best available renderer
+
+        Waiting for Wikidot stops when the current render gets stale.
+
+        Args:
+            source (str): Wikidot source
+
+        Returns:
+            Tuple[str, str]: Renderer name and rendered HTML
+
+        Raises:
+            RenderCancelled: Render was superseded
+        """
+        if self.offline_only:
+            return self.offline.name, self.offline.render(source)
+        if not self.breaker.closed:
+            self.probe()
+            return self.offline.name, self.offline.render(source)
+        if self.race:
+            return self._race(source)
+        try:
+            return self.online.name, cancel.current().result(self._executor.submit(self._online, source))
+        except Exception as e:
+            log.error(e)
+            return self.offline.name, self.offline.render(source)
+
+    def render_by(self, renderer: AbstractRenderer, source: str) -> str:
+        """Render source by given renderer, tracking health of online renderer
+
+        Args:
+            renderer (AbstractRenderer): Online or offline renderer of the router
+            source (str): Wikidot source
+
+        Returns:
+            str: Rendered HTML
+
+        Raises:
+            RenderCancelled: Render was superseded
+        """
+        if renderer is self.online:
+            return cancel.current().result(self._executor.submit(self._online, source))
+        return renderer.render(source)
+
+    def _online(self, source: str) -> str:
+        """Render source by online renderer and track its health
+
+        Args:
+            source (str): Wikidot source
+
+        Returns:
+            str: Rendered HTML
+        """
+        try:
+            html = self.online.render(source)
+        except (RequestException, ValueError) as e:
+            self.breaker.failure(isinstance(e, requests.ConnectionError))
+            if not self.breaker.closed:
+                self.probe()
+            raise
+        self.breaker.success()
+        return html
+
+    def _race(self, source: str) -> Tuple[str, str]:
+        """Start both renderers and use whichever finishes first without error
+
+        Args:
+            source (str): Wikidot source
+
+        Returns:
+            Tuple[str, str]: Renderer name and rendered HTML
+        """
+        futures = {
+            self._executor.submit(self._online, source): self.online.name,
+            self._executor.submit(self.offline.render, source): self.offline.name,
+        }
+        pending = set(futures)
+        while pending:
+            done, pending = cancel.current().wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return futures[future], future.result()
+                log.error(future.exception())
+        return self.offline.name, self.offline.render(source)
+
+    def probe(self):
+        """Start background health probe if it's not running"""
+        with self._lock:
+            if self._probe is not None and self._probe.is_alive():
+                return
+            self._probe = threading.Thread(target=self._probe_loop, daemon=True)
+            self._probe.start()
+
+    def _probe_loop(self):
+        """Probe online renderer until it's healthy"""
+        while not self.breaker.closed:
+            time.sleep(self.probe_interval)
+            if self.online.probe():
+                self.breaker.success()
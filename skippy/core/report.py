@@ -0,0 +1,104 @@
+"""Preview render instrumentation
+"""
+from typing import NamedTuple, Optional, List
+import cProfile
+import pstats
+import io
+
+
+class ProcessorTiming(NamedTuple):
+    stage: str
+    processor: str
+    seconds: float
+    input_size: int
+    output_size: int
+    matches: Optional[int] = None
+    skipped: bool = False
+    failed: bool = False
+
+
+class RenderReport:
+
+    """Timings of a single preview render
+
+    Attributes:
+        timings (List[ProcessorTiming]): Timings of processors in run order
+        seconds (float): Wall time of the whole render
+        renderer (Optional[str]): Name of renderer used for page body
+        cached (bool): Was the rendered page taken from render cache
+        profile (Optional[str]): cProfile statistics of the render thread
+    """
+
+    def __init__(self):
+        """Initializing render report"""
+        self.timings: List[ProcessorTiming] = []
+        self.seconds: float = 0.0
+        self.renderer: Optional[str] = None
+        self.cached: bool = False
+        self.profile: Optional[str] = None
+
+    def __str__(self) -> str:
+        lines = [
+            f"Render: {self.seconds * 1000:.1f} ms, renderer: {self.renderer}, cached: {self.cached}"
+        ]
+        for timing in self.timings:
+            if timing.skipped:
+                lines.append(f"  {timing.stage:<8} {timing.processor:<24} skipped")
+                continue
+            lines.append(
+                f"  {timing.stage:<8} {timing.processor:<24} {timing.seconds * 1000:>9.1f} ms"
+                f" {timing.input_size:>9} -> {timing.output_size:<9}"
+                f" matches: {'-' if timing.matches is None else timing.matches}"
+                + (" FAILED" if timing.failed else "")
+            )
+        return "\n".join(lines)
+
+    def record(self, timing: ProcessorTiming):
+        """Add processor timing
+
+        Args:
+            timing (ProcessorTiming): Processor timing
+        """
+        self.timings.append(timing)
+
+    def skip(self, stage: str, processor: str):
+        """Add timing of processor that had nothing to do
+
+        Args:
+            stage (str): Handler stage
+            processor (str): Processor name
+        """
+        self.record(ProcessorTiming(stage, processor, 0.0, 0, 0, skipped=True))
+
+    def stage(self, name: str) -> float:
+        """Get total time of handler stage
+
+        Args:
+            name (str): Handler stage
+
+        Returns:
+            float: Seconds
+        """
+        return sum(timing.seconds for timing in self.timings if timing.stage == name)
+
+    def slowest(self, count: int = 3) -> List[ProcessorTiming]:
+        """Get slowest processors
+
+        Args:
+            count (int, optional): Count of processors
+
+        Returns:
+            List[ProcessorTiming]: Timings sorted by time descending
+        """
+        return sorted(self.timings, key=lambda timing: timing.seconds, reverse=True)[:count]
+
+    def attach_profile(self, profiler: cProfile.Profile, limit: int = 30):
+        """Store statistics of finished profiler
+
+        Args:
+            profiler (cProfile.Profile): Disabled profiler
+            limit (int, optional): Count of functions to keep
+        """
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(limit)
+        self.profile = stream.getvalue()
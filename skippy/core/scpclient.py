@@ -2,11 +2,21 @@
 """
 from skippy.api import Singleton, PageData, critical, ignore
 
+from skippy.core import connections
+from skippy.core.cache import IncludeCache
+from skippy.core.filestore import AttachmentStore
+from skippy.core.themes import host
+from skippy.core.transfers import TransferPool, Progress
+
+from skippy.utils.filehandlers import AttachmentManifestHandler
+
 from urllib.parse import urlparse
-from pyscp.wikidot import Wiki
-from typing import Optional
+from pyscp.wikidot import Wiki, User
+from typing import Optional, Tuple, Dict, Any
+from functools import partial
+import threading
 import requests
-import base64
+import time
 
 
 RequestException = requests.exceptions.RequestException
@@ -14,7 +24,11 @@ RequestException = requests.exceptions.RequestException
 
 class SCPClient(metaclass=Singleton):
 
-    """Singleton facade for pyscp module."""
+    """Singleton facade for pyscp module.
+
+    Wiki objects are cached per site, all of them share the same connection
+    pool and session cookies.
+    """
 
     _session: Optional[str] = None
 
@@ -25,6 +39,9 @@ class SCPClient(metaclass=Singleton):
             login (Optional[str], optional): User login
             password (Optional[str], optional): User password
         """
+        self._lock = threading.Lock()
+        self._wikis: Dict[str, Wiki] = {}
+
         if login and password:
             self.auth(login, password)
 
@@ -38,9 +55,32 @@ class SCPClient(metaclass=Singleton):
             password (str): User password
         """
         wikidot = Wiki("www.wikidot.com")
+        connections.mount(wikidot.req)
         wikidot.auth(login, password)
 
         self._session = wikidot.cookies
+        with self._lock:
+            for wiki in self._wikis.values():
+                wiki.cookies = self._session
+
+    def wiki(self, site: str) -> Wiki:
+        """Get cached Wiki object of site with current session cookies.
+
+        Args:
+            site (str): Wikidot site name, host or URL
+
+        Returns:
+            Wiki: Wiki object using shared connection pool
+        """
+        site = host(site)
+        with self._lock:
+            if site not in self._wikis:
+                wiki = Wiki(site)
+                connections.mount(wiki.req)
+                if self._session:
+                    wiki.cookies = self._session
+                self._wikis[site] = wiki
+            return self._wikis[site]
 
     @critical
     @ignore(RequestException)
@@ -53,25 +93,105 @@ class SCPClient(metaclass=Singleton):
         Returns:
             Wiki: Wiki object instance with current session cookies
         """
-        wiki = Wiki(site)
-        if self._session:
-            wiki.cookies = self._session
+        return self.wiki(site)
 
-        return wiki
+    @staticmethod
+    def user(username: str) -> User:
+        """Get User object using shared connection pool.
+
+        Args:
+            username (str): Wikidot user name
+
+        Returns:
+            User: User object instance
+        """
+        user = User(username)
+        connections.mount(user.req)
+        return user
+
+    def prewarm(self, *sites: str):
+        """Open connections to Wikidot and selected sites in background.
+
+        Args:
+            *sites (str): Wikidot site names
+        """
+        connections.prewarm("http://www.wikidot.com", *(self.wiki(site).site for site in sites if site))
 
     @staticmethod
-    def download_file(url: str):
-        with requests.get(url) as res:
-            return base64.b64encode(res.content).decode("utf-8")
+    def download_file(url: str) -> str:
+        """Stream file to attachment store.
+
+        Args:
+            url (str): File URL
+
+        Returns:
+            str: Reference to stored file
+        """
+        return AttachmentStore().download(url)
+
+    @staticmethod
+    def file_entry(source: str, file_id: int, uploaded: float) -> Dict[str, Any]:
+        """Get attachments manifest entry of file
+
+        Args:
+            source (str): Base64 file source or reference to stored file
+            file_id (int): Wikidot file id
+            uploaded (float): Time the file was uploaded or downloaded
+
+        Returns:
+            Dict[str, Any]: Manifest entry
+        """
+        store = AttachmentStore()
+        return {"id": file_id, "size": store.size(source), "sha256": store.sha256(source), "time": uploaded}
+
+    def upload_file(self, p, name: str, source: str, remote, known: Optional[Dict[str, Any]]) -> Tuple[Dict[str, Any], bool]:
+        """Upload file to page if it differs from remote one
+
+        Args:
+            p (pyscp.wikidot.Page): Page
+            name (str): File name
+            source (str): Base64 file source or reference to stored file
+            remote (Optional[pyscp.core.File]): Remote file of the same name
+            known (Optional[Dict[str, Any]]): Manifest entry of file
+
+        Returns:
+            Tuple[Dict[str, Any], bool]: Manifest entry of file and was it uploaded
+        """
+        entry = self.file_entry(source, 0, time.time())
+        if remote is not None:
+            if known is not None and known["id"] == remote.id:
+                unchanged = known["sha256"] == entry["sha256"]
+            else:
+                unchanged = AttachmentStore().sha256(self.download_file(remote.url)) == entry["sha256"]
+            if unchanged:
+                return dict(entry, time=known["time"] if known else entry["time"]), False
+            p.remove_file(name)
+        p.upload(name, AttachmentStore().read(source))
+        return entry, True
 
     @critical
     @ignore(RequestException)
-    def upload(self, page: PageData, comment: str = "Edit using Skippy"):
+    def upload(
+            self, page: PageData, comment: str = "Edit using Skippy", progress: Optional[Progress] = None
+    ) -> Dict[str, str]:
         """Upload page with tags and files to selected Wikidot site.
 
+        Files are compared with the attachments manifest, a remote file is
+        downloaded only if it isn't in the manifest or its id changed (it was
+        replaced not by this client). Files are transferred in parallel by
+        transfer pool, a failed file doesn't stop the others.
+
+        A remote file missing from page data is removed only if it's in the
+        manifest, i.e. the page was downloaded or uploaded with it and the
+        file was deleted since. Files attached by others are left alone.
+
         Args:
             page (PageData): Page for given Wikidot site
             comment (str, optional): Comment for uploaded changes
+            progress (Optional[Progress], optional): Called with count of transferred and all files and failed ones
+
+        Returns:
+            Dict[str, str]: Errors of failed files by name
         """
         wiki = self.get_wiki(page["link"][0])
         p = wiki(page["link"][1])
@@ -82,39 +202,63 @@ class SCPClient(metaclass=Singleton):
             p.create(title=page["title"], source=page["source"], comment=comment)
 
         p.set_tags(page["tags"])
+        IncludeCache().invalidate_page(page["link"][0], page["link"][1])
 
-        file_urls = {file.name: file.url for file in p.files}
+        site = host(page["link"][0])
+        manifest = AttachmentManifestHandler()
+        known = manifest.get(site, page["link"][1])
+        remote = {file.name: file for file in p.files}
 
-        for file in page["files"]:
-            file_source = base64.b64decode(page["files"][file])
-            if file not in file_urls:
-                p.upload(file, file_source)
-            elif file in file_urls and page["files"][file] != self.download_file(
-                file_urls[file]
-            ):
-                p.remove_file(file)
-                p.upload(file, file_source)
+        tasks = {
+            name: (wiki.site, partial(self.upload_file, p, name, source, remote.get(name), known.get(name)))
+            for name, source in page["files"].items()
+        }
+        for name in remote:
+            if name not in page["files"] and name in known:
+                tasks[name] = (wiki.site, partial(p.remove_file, name))
+        results, errors = TransferPool().run(tasks, progress)
 
-        for file in p.files:
-            name = file.name
-            if name not in page["files"]:
-                p.remove_file(name)
+        if errors or any(name not in page["files"] or results[name][1] for name in results):
+            p = wiki(page["link"][1])
+        ids = {file.name: file.id for file in p.files}
+        entries = {
+            name: dict(results[name][0], id=ids[name])
+            for name in page["files"]
+            if name in results and name in ids
+        }
+        entries.update({name: known[name] for name in errors if name not in page["files"] and name in ids})
+        manifest.set(site, page["link"][1], entries)
+        return {name: str(error) for name, error in errors.items()}
 
     @ignore(RequestException, {})
-    def download(self, site: str, page: str) -> PageData:
+    def download(self, site: str, page: str, progress: Optional[Progress] = None) -> PageData:
         """Download page with tags and files fron selected Wikidot site.
 
+        Files are streamed to attachment store in parallel by transfer pool,
+        page data keeps references to them. If any file fails, the whole
+        download fails, so a page is never opened without some of its files
+        (and the next upload doesn't take them for deleted).
+
         Args:
             site (str): Wikidot site name
             page (str): Page for given Wikidot site
+            progress (Optional[Progress], optional): Called with count of downloaded and all files and failed ones
 
         Returns:
-            PageData: Page data
+            PageData: Page data (empty if page or any of its files can't be downloaded)
         """
         wiki = self.get_wiki(site)
         p = wiki(page)
 
-        files = {file.name: self.download_file(file.url) for file in p.files}
+        results, errors = TransferPool().run(
+            {file.name: (file.url, partial(self.download_file, file.url)) for file in p.files}, progress
+        )
+        if errors:
+            raise RequestException(f"Can't download files of {page}: {', '.join(sorted(errors))}")
+        files = {file.name: results[file.name] for file in p.files}
+        AttachmentManifestHandler().set(
+            host(site), page, {file.name: self.file_entry(files[file.name], file.id, time.time()) for file in p.files}
+        )
         return {
             "title": p.title,
             "source": p.source,
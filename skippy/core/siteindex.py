@@ -0,0 +1,400 @@
+"""Local index of Wikidot site pages used to emulate ListPages offline
+
+Pages are listed through the ListPages module of the site itself, newest
+updates first, so an incremental sync stops at the first page that is older
+than the previous sync. Ratings and deletions don't change update time, they
+are picked up by a full sync once per FULL_SYNC_INTERVAL.
+
+Attributes:
+    CLAIM_TTL (int): Seconds after which a sync claimed by another process is considered dead
+    FIELDS (Tuple[str, ...]): Page fields requested from ListPages module
+    FULL_SYNC_INTERVAL (int): Seconds between full syncs
+    PER_PAGE (int): Pages requested at once (ListPages maximum)
+    SCHEMA (str): Index database schema
+    SYNC_INTERVAL (int): Seconds after which index is synced incrementally
+    TIME (Pattern): Pattern of timestamp class in rendered dates
+"""
+from skippy.api import Singleton
+
+from skippy.core import connections
+from skippy.core.themes import host
+
+from skippy.utils.logger import log
+
+import skippy.config
+
+from concurrent.futures import ThreadPoolExecutor
+from requests.exceptions import RequestException
+from typing import Optional, NamedTuple, Tuple, Dict, List, Set
+from contextlib import closing
+from pathlib import Path
+from bs4 import BeautifulSoup, Tag
+import threading
+import sqlite3
+import time
+import re
+
+
+SYNC_INTERVAL = 10 * 60
+
+FULL_SYNC_INTERVAL = 24 * 60 * 60
+
+CLAIM_TTL = 5 * 60
+
+PER_PAGE = 250
+
+FIELDS = ("fullname", "title", "tags", "_tags", "created_at", "updated_at", "rating", "parent_fullname")
+
+TIME = re.compile(r"\btime_(\d+)\b")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    site TEXT NOT NULL,
+    name TEXT NOT NULL,
+    title TEXT NOT NULL,
+    tags TEXT NOT NULL,
+    created_at INTEGER NOT NULL,
+    updated_at INTEGER NOT NULL,
+    rating INTEGER NOT NULL,
+    parent TEXT,
+    category TEXT NOT NULL,
+    seen_at REAL NOT NULL,
+    PRIMARY KEY (site, name)
+);
+CREATE TABLE IF NOT EXISTS sync (
+    site TEXT PRIMARY KEY,
+    synced_at REAL NOT NULL DEFAULT 0,
+    full_at REAL NOT NULL DEFAULT 0,
+    changed_at REAL NOT NULL DEFAULT 0,
+    claimed_at REAL NOT NULL DEFAULT 0
+);
+"""
+
+
+class IndexedPage(NamedTuple):
+
+    """Page of site index
+
+    Attributes:
+        name (str): Page unix name with category ("component:theme")
+        title (str): Page title
+        tags (Tuple[str, ...]): Page tags including hidden ones
+        created_at (int): Creation timestamp
+        updated_at (int): Last edit timestamp
+        rating (int): Page rating
+        parent (Optional[str]): Unix name of parent page
+        category (str): Page category ("_default" for pages without one)
+    """
+
+    name: str
+    title: str
+    tags: Tuple[str, ...]
+    created_at: int
+    updated_at: int
+    rating: int
+    parent: Optional[str]
+    category: str
+
+
+def category(name: str) -> str:
+    """Get category of page
+
+    Args:
+        name (str): Page unix name
+
+    Returns:
+        str: Page category ("_default" for pages without one)
+    """
+    return name.split(":", 1)[0] if ":" in name else "_default"
+
+
+class SiteIndex(metaclass=Singleton):
+
+    """SQLite index of site pages shared by all Skippy processes
+
+    Index is never waited for: stale sites are synced in background and the
+    pages known so far are returned meanwhile.
+
+    Attributes:
+        timeout (Tuple[float, float]): Connect and read timeouts in seconds
+        retry (float): Seconds before failed sync is retried
+    """
+
+    timeout: Tuple[float, float] = (3.05, 30.0)
+    retry: float = 5 * 60
+
+    def __init__(self, path: Optional[Path] = None):
+        """Initializing site index
+
+        Args:
+            path (Optional[Path], optional): Database file (default - INDEX_FILE)
+        """
+        self.path = path or skippy.config.INDEX_FILE
+        self.session = connections.session()
+
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2)
+        self._pending: Set[str] = set()
+        self._failed: Dict[str, float] = {}
+        self._pages: Dict[str, Tuple[float, List[IndexedPage]]] = {}
+        self._ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open database, creating it if needed
+
+        Returns:
+            sqlite3.Connection: Connection
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(str(self.path), timeout=10)
+        if not self._ready:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+            self._ready = True
+        return connection
+
+    def _state(self, site: str) -> Optional[Tuple[float, float, float, float]]:
+        """Get sync state of site
+
+        Args:
+            site (str): Site host
+
+        Returns:
+            Optional[Tuple[float, float, float, float]]: Sync, full sync, change and claim times (None - never synced)
+        """
+        with closing(self._connect()) as connection:
+            return connection.execute(
+                "SELECT synced_at, full_at, changed_at, claimed_at FROM sync WHERE site = ?", (site,)
+            ).fetchone()
+
+    def pages(self, site: str) -> Optional[List[IndexedPage]]:
+        """Get indexed pages of site and sync index if it's stale
+
+        Args:
+            site (str): Site name, host or URL
+
+        Returns:
+            Optional[List[IndexedPage]]: Indexed pages (None - site isn't indexed yet)
+        """
+        site = host(site)
+        try:
+            state = self._state(site)
+        except sqlite3.Error as e:
+            log.error(f"Can't read site index: {e}")
+            return None
+
+        synced_at, full_at, changed_at, _ = state or (0, 0, 0, 0)
+        if time.time() - synced_at > SYNC_INTERVAL:
+            self.sync(site, full=time.time() - full_at > FULL_SYNC_INTERVAL)
+        if not synced_at:
+            return None
+
+        with self._lock:
+            cached = self._pages.get(site)
+        if cached is not None and cached[0] == changed_at:
+            return cached[1]
+
+        try:
+            with closing(self._connect()) as connection:
+                rows = connection.execute(
+                    "SELECT name, title, tags, created_at, updated_at, rating, parent, category "
+                    "FROM pages WHERE site = ?",
+                    (site,),
+                ).fetchall()
+        except sqlite3.Error as e:
+            log.error(f"Can't read site index: {e}")
+            return None
+        pages = [IndexedPage(name, title, tuple(tags.split()), *other) for name, title, tags, *other in rows]
+        with self._lock:
+            self._pages[site] = (changed_at, pages)
+        return pages
+
+    def sync(self, site: str, full: bool = False):
+        """Sync site index in background
+
+        Args:
+            site (str): Site name, host or URL
+            full (bool, optional): List all pages instead of recently updated ones
+        """
+        if connections.is_offline():
+            return
+        site = host(site)
+        with self._lock:
+            if site in self._pending or time.time() - self._failed.get(site, 0) < self.retry:
+                return
+            self._pending.add(site)
+        self._executor.submit(self._sync, site, full)
+
+    def _claim(self, site: str) -> bool:
+        """Claim sync of site, so other processes don't sync it at the same time
+
+        Args:
+            site (str): Site host
+
+        Returns:
+            bool: Was sync claimed
+        """
+        now = time.time()
+        with closing(self._connect()) as connection, connection:
+            connection.execute("INSERT OR IGNORE INTO sync (site) VALUES (?)", (site,))
+            return connection.execute(
+                "UPDATE sync SET claimed_at = ? WHERE site = ? AND claimed_at < ?", (now, site, now - CLAIM_TTL)
+            ).rowcount == 1
+
+    def _sync(self, site: str, full: bool):
+        """Download pages updated since the last sync (or all pages) to index
+
+        Args:
+            site (str): Site host
+            full (bool): List all pages and remove the ones not listed
+        """
+        try:
+            if not self._claim(site):
+                return
+            start = time.time()
+            synced_at = 0 if full else self._state(site)[0]
+            count = 0
+            for offset in range(0, 10 ** 6, PER_PAGE):
+                pages = self._list(site, offset)
+                fresh = [page for page in pages if page.updated_at >= synced_at - 60]
+                self._store(site, fresh, start)
+                count += len(fresh)
+                if len(pages) < PER_PAGE or len(fresh) < len(pages):
+                    break
+
+            with closing(self._connect()) as connection, connection:
+                if full:
+                    connection.execute("DELETE FROM pages WHERE site = ? AND seen_at < ?", (site, start))
+                connection.execute(
+                    "UPDATE sync SET synced_at = ?, changed_at = ?, claimed_at = 0"
+                    + (", full_at = ?" if full else "")
+                    + " WHERE site = ?",
+                    (start, time.time(), start, site) if full else (start, time.time(), site),
+                )
+            log.debug(f"Site index of {site} synced ({'full' if full else 'incremental'}, {count} pages)")
+        except (RequestException, ValueError, KeyError, sqlite3.Error) as e:
+            self._failed[site] = time.time()
+            log.error(f"Can't sync site index of {site}: {e}")
+            try:
+                with closing(self._connect()) as connection, connection:
+                    connection.execute("UPDATE sync SET claimed_at = 0 WHERE site = ?", (site,))
+            except sqlite3.Error:
+                pass
+        finally:
+            with self._lock:
+                self._pending.discard(site)
+
+    def query(self, site: str, tags: Optional[str] = None, category: Optional[str] = None) -> List[str]:
+        """List names of site pages with tags or in category by Wikidot, blocking until done
+
+        Args:
+            site (str): Site name, host or URL
+            tags (Optional[str], optional): ListPages tags parameter ("+tale -joke")
+            category (Optional[str], optional): ListPages category parameter (None - all categories)
+
+        Returns:
+            List[str]: Page names, recently updated first
+        """
+        site = host(site)
+        params = {"category": category or "*"}
+        if tags:
+            params["tags"] = tags
+
+        names = []
+        for offset in range(0, 10 ** 6, PER_PAGE):
+            pages = self._list(site, offset, **params)
+            names.extend(page.name for page in pages)
+            if len(pages) < PER_PAGE:
+                break
+        return names
+
+    def _list(self, site: str, offset: int, **params: str) -> List[IndexedPage]:
+        """List site pages by ListPages module, recently updated first
+
+        Args:
+            site (str): Site host
+            offset (int): Count of skipped pages
+            **params (str): ListPages parameters replacing default ones
+
+        Returns:
+            List[IndexedPage]: Listed pages
+        """
+        body = "".join(f'[[span class="skippy-{field}"]]%%{field}%%[[/span]]' for field in FIELDS)
+        response = self.session.post(
+            f"http://{site}/ajax-module-connector.php",
+            data={
+                "moduleName": "list/ListPagesModule",
+                "category": "*",
+                "pagetype": "*",
+                "order": "updated_at desc",
+                "separate": "yes",
+                "perPage": PER_PAGE,
+                "offset": offset,
+                "module_body": body,
+                "wikidot_token7": "123456",
+                **params,
+            },
+            cookies={"wikidot_token7": "123456"},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        data = response.json()
+        if data.get("status") != "ok":
+            raise ValueError(data.get("message") or data.get("status"))
+
+        pages = []
+        for item in BeautifulSoup(data["body"], "html.parser").select("div.list-pages-item"):
+            fields = {field: item.select_one(f"span.skippy-{field}") for field in FIELDS}
+            text = {field: span.get_text(" ", strip=True) if span else "" for field, span in fields.items()}
+            if not text["fullname"]:
+                continue
+            rating = re.search(r"-?\d+", text["rating"])
+            pages.append(
+                IndexedPage(
+                    name=text["fullname"],
+                    title=text["title"],
+                    tags=tuple(text["tags"].split() + text["_tags"].split()),
+                    created_at=self._time(fields["created_at"]),
+                    updated_at=self._time(fields["updated_at"]),
+                    rating=int(rating.group()) if rating else 0,
+                    parent=text["parent_fullname"] or None,
+                    category=category(text["fullname"]),
+                )
+            )
+        return pages
+
+    @staticmethod
+    def _time(field: Optional[Tag]) -> int:
+        """Get timestamp of rendered date
+
+        Args:
+            field (Optional[Tag]): Date field
+
+        Returns:
+            int: Timestamp (0 if date is missing)
+        """
+        match = TIME.search(str(field)) if field is not None else None
+        return int(match.group(1)) if match else 0
+
+    def _store(self, site: str, pages: List[IndexedPage], seen_at: float):
+        """Insert or update pages
+
+        Args:
+            site (str): Site host
+            pages (List[IndexedPage]): Pages
+            seen_at (float): Sync start time
+        """
+        if not pages:
+            return
+        with closing(self._connect()) as connection, connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO pages "
+                "(site, name, title, tags, created_at, updated_at, rating, parent, category, seen_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (site, page.name, page.title, " ".join(page.tags), page.created_at, page.updated_at,
+                     page.rating, page.parent, page.category, seen_at)
+                    for page in pages
+                ],
+            )
+            connection.execute("UPDATE sync SET changed_at = ? WHERE site = ?", (time.time(), site))
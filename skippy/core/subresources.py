@@ -0,0 +1,206 @@
+"""Persistent cache of remote subresources loaded by previewed pages
+
+Images, fonts and other subresources outside of theme asset hosts are
+downloaded in background when a preview requests them, the next previews are
+served from disk, even offline.
+
+Attributes:
+    MAX_ITEM_SIZE (int): Largest cached subresource in bytes
+    SUBRESOURCE_TTL (int): Seconds after which cached subresources are refreshed in background
+"""
+from skippy.api import Singleton
+
+from skippy.core import connections
+from skippy.core.themes import AssetBundle
+
+from skippy.utils.logger import log
+
+import skippy.config
+
+from concurrent.futures import ThreadPoolExecutor
+from requests.exceptions import RequestException
+from typing import Optional, Iterable, Tuple, Dict, List, Set
+from urllib.parse import urlparse
+from pathlib import Path
+import threading
+import tempfile
+import hashlib
+import json
+import time
+import os
+
+
+SUBRESOURCE_TTL = 7 * 24 * 60 * 60
+
+MAX_ITEM_SIZE = 20 * 1024 * 1024
+
+
+class SubresourceCache(metaclass=Singleton):
+
+    """Disk cache of preview subresources with LRU eviction by total size
+
+    Every file holds a JSON header line (URL, mimetype and download time)
+    followed by subresource data. Reads touch file modification time, which
+    is used as last access time on eviction.
+
+    Attributes:
+        timeout (Tuple[float, float]): Connect and read timeouts in seconds
+        retry (float): Seconds before failed download is retried
+    """
+
+    timeout: Tuple[float, float] = (3.05, 15.0)
+    retry: float = 5 * 60
+
+    def __init__(self, folder: Optional[Path] = None, maxsize: int = 256 * 1024 * 1024):
+        """Initializing subresource cache
+
+        Args:
+            folder (Optional[Path], optional): Cache folder (default - "subresources" in CACHE_FOLDER)
+            maxsize (int, optional): Maximum total size of cached files in bytes
+        """
+        self.folder = folder or skippy.config.CACHE_FOLDER / "subresources"
+        self.maxsize = maxsize
+        self.session = connections.session()
+
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=4)
+        self._pending: Set[str] = set()
+        self._failed: Dict[str, float] = {}
+
+    @staticmethod
+    def cacheable(url: str) -> bool:
+        """Check if subresource can be cached, theme assets are left to asset bundle
+
+        Args:
+            url (str): Subresource URL
+
+        Returns:
+            bool: Can subresource be cached
+        """
+        return urlparse(url).scheme in ("http", "https") and not AssetBundle.bundleable(url)
+
+    def _path(self, url: str) -> Path:
+        """Get cache file of subresource
+
+        Args:
+            url (str): Subresource URL
+
+        Returns:
+            Path: Cache file
+        """
+        return self.folder / (hashlib.sha1(url.encode("utf-8")).hexdigest() + ".res")
+
+    def read(self, url: str) -> Optional[Tuple[bytes, str]]:
+        """Read cached subresource, stale subresources are refreshed in background
+
+        Args:
+            url (str): Subresource URL
+
+        Returns:
+            Optional[Tuple[bytes, str]]: Subresource data and mimetype or None if it isn't cached
+        """
+        path = self._path(url)
+        try:
+            header, data = path.read_bytes().split(b"\n", 1)
+            entry = json.loads(header)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        if entry.get("url") != url:
+            return None
+        if time.time() - entry["time"] > SUBRESOURCE_TTL:
+            self.prefetch([url])
+        return data, entry["type"]
+
+    def cached(self, url: str) -> bool:
+        """Check if subresource is cached
+
+        Args:
+            url (str): Subresource URL
+
+        Returns:
+            bool: Is subresource cached
+        """
+        return self._path(url).is_file()
+
+    def drop(self, url: str):
+        """Remove cached subresource, so it's downloaded again
+
+        Args:
+            url (str): Subresource URL
+        """
+        self._path(url).unlink(missing_ok=True)
+
+    def prefetch(self, urls: Iterable[str]):
+        """Download subresources in background
+
+        Args:
+            urls (Iterable[str]): Subresource URLs
+        """
+        if connections.is_offline():
+            return
+        with self._lock:
+            for url in urls:
+                if url in self._pending or time.time() - self._failed.get(url, 0) < self.retry:
+                    continue
+                self._pending.add(url)
+                self._executor.submit(self._fetch, url)
+
+    def _fetch(self, url: str):
+        """Download subresource to cache
+
+        Args:
+            url (str): Subresource URL
+        """
+        try:
+            with self.session.get(url, timeout=self.timeout, stream=True) as response:
+                response.raise_for_status()
+                data = response.raw.read(MAX_ITEM_SIZE + 1, decode_content=True)
+                if len(data) > MAX_ITEM_SIZE:
+                    raise OSError(f"subresource is larger than {MAX_ITEM_SIZE} bytes")
+                mimetype = response.headers.get("Content-Type", "application/octet-stream").split(";")[0]
+
+            header = json.dumps({"url": url, "type": mimetype, "time": time.time()}).encode("utf-8")
+            self.folder.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=self.folder, suffix=".tmp", delete=False) as tmp:
+                tmp.write(header + b"\n" + data)
+            os.replace(tmp.name, self._path(url))
+            log.debug(f"Preview subresource cached: {url}")
+            self.evict()
+        except (RequestException, OSError) as e:
+            with self._lock:
+                self._failed[url] = time.time()
+            log.error(f"Can't cache preview subresource {url}: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(url)
+
+    def files(self) -> List[Tuple[float, int, Path]]:
+        """Get cache files, least recently used first
+
+        Returns:
+            List[Tuple[float, int, Path]]: Access time, size and path of files
+        """
+        files = []
+        for file in self.folder.glob("*.res"):
+            try:
+                stat = file.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, file))
+        return sorted(files)
+
+    def evict(self):
+        """Remove least recently used files over the size limit"""
+        files = self.files()
+        total = sum(size for _, size, _ in files)
+        for _, size, file in files:
+            if total <= self.maxsize:
+                break
+            file.unlink(missing_ok=True)
+            total -= size
+
+    def clear(self):
+        """Remove all cached subresources"""
+        for file in self.folder.glob("*.res"):
+            file.unlink(missing_ok=True)
@@ -0,0 +1,370 @@
+"""Offline bundle of Wikidot theme assets
+
+Attributes:
+    ASSET_HOSTS (Pattern): Hosts whose assets can be bundled
+    ASSET_TTL (int): Seconds after which bundled assets and themes are refreshed in background
+    BUNDLE_VERSION (int): Version of bundle layout, bundle is dropped on mismatch
+    COMMON_ASSETS (List[str]): Scripts used by every previewed page
+    DEFAULT_THEME (List[str]): Stylesheets used when page site is unknown or not discovered yet
+    IMPORT (Pattern): Pattern of CSS @import
+    SCHEME (str): URL scheme used by previewer to request bundled assets
+    STATIC (str): Wikidot static files URL
+"""
+from skippy.api import Singleton
+
+from skippy.core import connections
+
+from skippy.utils.logger import log
+
+import skippy.config
+
+from concurrent.futures import ThreadPoolExecutor
+from requests.exceptions import RequestException
+from typing import Optional, Iterable, Tuple, Dict, List, Set, Any
+from urllib.parse import urlparse
+from pathlib import Path
+import threading
+import tempfile
+import hashlib
+import json
+import time
+import os
+import re
+
+
+SCHEME = "skippy-asset"
+
+ASSET_TTL = 7 * 24 * 60 * 60
+
+BUNDLE_VERSION = 1
+
+STATIC = "http://d3g0gp89917ko0.cloudfront.net/v--3e3a6f7dbcc9"
+
+COMMON_ASSETS = [
+    f"{STATIC}/common--javascript/init.combined.js",
+    f"{STATIC}/common--javascript/WIKIDOT.combined.js",
+]
+
+DEFAULT_THEME = [
+    f"{STATIC}/common--theme/base/css/style.css",
+    "http://scp-ru.wdfiles.com/local--code/component:theme2/1",
+    f"{STATIC}/common--modules/css/pagerate/PageRateWidgetModule.css",
+]
+
+ASSET_HOSTS = re.compile(r"^(d3g0gp89917ko0\.cloudfront\.net|[\w-]+\.wdfiles\.com)$")
+
+IMPORT = re.compile(r"@import url\(\s*['\"]?([^'\")\s]+)['\"]?\s*\)")
+
+
+def host(site: str) -> str:
+    """Get host of Wikidot site
+
+    Args:
+        site (str): Site name ("scp-ru"), host or URL
+
+    Returns:
+        str: Site host
+    """
+    if "//" in site:
+        site = urlparse(site).netloc
+    site = site.lower().strip("/")
+    return site if "." in site else f"{site}.wikidot.com"
+
+
+def url(original: str) -> str:
+    """Get previewer URL of bundled asset
+
+    Host and path are kept, so relative URLs inside stylesheets resolve to
+    bundled assets too.
+
+    Args:
+        original (str): Asset URL
+
+    Returns:
+        str: Asset URL with previewer scheme
+    """
+    return SCHEME + original[original.index(":"):]
+
+
+def original(url: str) -> str:
+    """Get original URL of bundled asset
+
+    Args:
+        url (str): Asset URL with previewer scheme
+
+    Returns:
+        str: Asset URL
+    """
+    return "http" + url[url.index(":"):]
+
+
+class AssetBundle(metaclass=Singleton):
+
+    """Versioned disk bundle of theme stylesheets and scripts
+
+    Assets are downloaded once in background and then served from disk, stale
+    assets keep being served while they are refreshed.
+
+    Attributes:
+        timeout (Tuple[float, float]): Connect and read timeouts in seconds
+        retry (float): Seconds before failed download is retried
+    """
+
+    timeout: Tuple[float, float] = (3.05, 15.0)
+    retry: float = 5 * 60
+
+    def __init__(self, folder: Optional[Path] = None):
+        """Initializing asset bundle
+
+        Args:
+            folder (Optional[Path], optional): Bundle folder (default - ASSETS_FOLDER)
+        """
+        self.folder = folder or skippy.config.ASSETS_FOLDER
+        self.session = connections.session()
+
+        self._lock = threading.RLock()
+        self._executor = ThreadPoolExecutor(max_workers=4)
+        self._pending: Set[str] = set()
+        self._failed: Dict[str, float] = {}
+        self._manifest = self._load()
+
+    @property
+    def _manifest_path(self) -> Path:
+        return self.folder / "manifest.json"
+
+    def _read(self) -> Optional[Dict[str, Any]]:
+        """Read manifest from disk
+
+        Returns:
+            Optional[Dict[str, Any]]: Manifest or None if it's missing, broken or of another version
+        """
+        try:
+            self._mtime = self._manifest_path.stat().st_mtime
+            manifest = json.loads(self._manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        return manifest if manifest.get("version") == BUNDLE_VERSION else None
+
+    def _load(self) -> Dict[str, Any]:
+        """Load manifest, drop bundle of another version
+
+        Returns:
+            Dict[str, Any]: Manifest
+        """
+        self._mtime = 0.0
+        manifest = self._read()
+        if manifest is None:
+            for file in self.folder.glob("*.asset"):
+                file.unlink(missing_ok=True)
+            manifest = {"version": BUNDLE_VERSION, "assets": {}, "themes": {}}
+        return manifest
+
+    def _merge(self, manifest: Optional[Dict[str, Any]]):
+        """Merge entries saved by other processes, newer entries win
+
+        Args:
+            manifest (Optional[Dict[str, Any]]): Manifest read from disk
+        """
+        if manifest is None:
+            return
+        with self._lock:
+            for section in ("assets", "themes"):
+                for key, entry in manifest.get(section, {}).items():
+                    current = self._manifest[section].get(key)
+                    if current is None or entry["time"] > current["time"]:
+                        self._manifest[section][key] = entry
+
+    def _refresh(self):
+        """Merge manifest if another process changed it"""
+        try:
+            changed = self._manifest_path.stat().st_mtime > self._mtime
+        except OSError:
+            return
+        if changed:
+            self._merge(self._read())
+
+    def _save(self):
+        """Merge manifest with the one on disk and save it atomically"""
+        self.folder.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            self._merge(self._read())
+            data = json.dumps(self._manifest, ensure_ascii=False)
+            with tempfile.NamedTemporaryFile(
+                "w", dir=self.folder, suffix=".tmp", delete=False, encoding="utf-8"
+            ) as tmp:
+                tmp.write(data)
+            os.replace(tmp.name, self._manifest_path)
+            self._mtime = self._manifest_path.stat().st_mtime
+
+    @staticmethod
+    def bundleable(url: str) -> bool:
+        """Check if URL points to theme asset host
+
+        Args:
+            url (str): Asset URL
+
+        Returns:
+            bool: Can asset be bundled
+        """
+        parsed = urlparse(url)
+        return parsed.scheme in ("http", "https") and bool(ASSET_HOSTS.match(parsed.netloc))
+
+    def path(self, url: str) -> Optional[Path]:
+        """Get bundled asset file
+
+        Args:
+            url (str): Asset URL
+
+        Returns:
+            Optional[Path]: Asset file or None if asset isn't bundled
+        """
+        with self._lock:
+            entry = self._manifest["assets"].get(url)
+            if entry is None:
+                self._refresh()
+                entry = self._manifest["assets"].get(url)
+        if entry is None or not (self.folder / entry["file"]).is_file():
+            return None
+        if time.time() - entry["time"] > ASSET_TTL:
+            self.prefetch([url])
+        return self.folder / entry["file"]
+
+    def read(self, url: str) -> Optional[Tuple[bytes, str]]:
+        """Read bundled asset
+
+        Args:
+            url (str): Asset URL
+
+        Returns:
+            Optional[Tuple[bytes, str]]: Asset source and mimetype or None if asset isn't bundled
+        """
+        path = self.path(url)
+        if path is None:
+            return None
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return None
+        with self._lock:
+            return data, self._manifest["assets"][url]["type"]
+
+    def prefetch(self, urls: Iterable[str]):
+        """Download missing and stale assets in background
+
+        Args:
+            urls (Iterable[str]): Asset URLs
+        """
+        if connections.is_offline():
+            return
+        with self._lock:
+            for url in urls:
+                entry = self._manifest["assets"].get(url)
+                if url in self._pending or (entry and time.time() - entry["time"] <= ASSET_TTL):
+                    continue
+                if time.time() - self._failed.get(url, 0) < self.retry:
+                    continue
+                self._pending.add(url)
+                self._executor.submit(self._fetch, url)
+
+    def _fetch(self, url: str):
+        """Download asset to bundle
+
+        Args:
+            url (str): Asset URL
+        """
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+            response.raise_for_status()
+            file = hashlib.sha1(url.encode("utf-8")).hexdigest() + ".asset"
+            self.folder.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=self.folder, suffix=".tmp", delete=False) as tmp:
+                tmp.write(response.content)
+            os.replace(tmp.name, self.folder / file)
+
+            mimetype = response.headers.get("Content-Type", "application/octet-stream").split(";")[0]
+            with self._lock:
+                self._manifest["assets"][url] = {"file": file, "type": mimetype, "time": time.time()}
+            self._save()
+            log.debug(f"Theme asset bundled: {url}")
+
+            if mimetype == "text/css":
+                self.prefetch(
+                    imported for imported in IMPORT.findall(response.text) if self.bundleable(imported)
+                )
+        except (RequestException, OSError) as e:
+            with self._lock:
+                self._failed[url] = time.time()
+            log.error(f"Can't bundle theme asset {url}: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(url)
+
+    def stylesheets(self, site: Optional[str]) -> List[str]:
+        """Get theme stylesheets of site known to manifest, nothing is downloaded
+
+        Args:
+            site (Optional[str]): Site name, host or URL (None - default theme)
+
+        Returns:
+            List[str]: Stylesheet URLs (default theme if site isn't discovered yet)
+        """
+        if not site:
+            return DEFAULT_THEME
+        with self._lock:
+            self._refresh()
+            entry = self._manifest["themes"].get(host(site))
+        return entry["urls"] if entry is not None else DEFAULT_THEME
+
+    def theme(self, site: Optional[str]) -> List[str]:
+        """Get theme stylesheets of site and bundle them
+
+        Stylesheets are discovered from the site front page in background, the
+        default theme is used until then. Nothing is downloaded offline.
+
+        Args:
+            site (Optional[str]): Site name, host or URL (None - default theme)
+
+        Returns:
+            List[str]: Stylesheet URLs
+        """
+        if connections.is_offline():
+            return self.stylesheets(site)
+        if site:
+            site = host(site)
+            with self._lock:
+                entry = self._manifest["themes"].get(site)
+                if (
+                    (entry is None or time.time() - entry["time"] > ASSET_TTL)
+                    and site not in self._pending
+                    and time.time() - self._failed.get(site, 0) >= self.retry
+                ):
+                    self._pending.add(site)
+                    self._executor.submit(self._discover, site)
+        urls = self.stylesheets(site)
+        self.prefetch(COMMON_ASSETS + urls)
+        return urls
+
+    def _discover(self, site: str):
+        """Store stylesheets imported by site front page
+
+        Args:
+            site (str): Site host
+        """
+        try:
+            response = self.session.get(f"http://{site}/", timeout=self.timeout)
+            response.raise_for_status()
+            head = response.text.split("</head>", 1)[0]
+            urls = [url for url in IMPORT.findall(head) if self.bundleable(url)]
+            if urls:
+                with self._lock:
+                    self._manifest["themes"][site] = {"urls": urls, "time": time.time()}
+                self._save()
+                self.prefetch(urls)
+                log.debug(f"Theme of {site} discovered: {urls}")
+        except (RequestException, OSError) as e:
+            with self._lock:
+                self._failed[site] = time.time()
+            log.error(f"Can't discover theme of {site}: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(site)
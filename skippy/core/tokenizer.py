@@ -0,0 +1,318 @@
+"""Linear-time Wikidot block tokenizer
+
+Attributes:
+    MULTILINE_BLOCKS (Set[str]): Blocks whose opening tag can span lines
+    RAW_BLOCKS (Set[str]): Blocks whose content is not tokenized
+    VOID_BLOCKS (Set[str]): Blocks that never have a closing tag
+"""
+from typing import Iterable, Optional, Pattern, Tuple, Dict, List, Set
+import functools
+import re
+
+
+MULTILINE_BLOCKS: Set[str] = {"include"}
+
+RAW_BLOCKS: Set[str] = {"html", "code"}
+
+VOID_BLOCKS: Set[str] = {
+    "include",
+    "image",
+    "=image",
+    "<image",
+    ">image",
+    "f<image",
+    "f>image",
+    "toc",
+    "f<toc",
+    "f>toc",
+    "user",
+    "*user",
+    "footnoteblock",
+    "bibliography",
+}
+
+
+class Block:
+
+    """Wikidot block node
+
+    Attributes:
+        name (str): Lowercase block name
+        args (str): Raw text after block name in opening tag
+        start (int): Start of opening tag
+        tag_end (int): End of opening tag
+        inner_end (int): Start of closing tag (same as tag_end for unclosed blocks)
+        end (int): End of closing tag (same as tag_end for unclosed blocks)
+        closed (bool): Has the block a closing tag
+        parent (Optional[Block]): Parent block (None for top-level blocks)
+        children (List[Block]): Nested blocks
+    """
+
+    __slots__ = ("source", "name", "args", "start", "tag_end", "inner_end", "end", "closed", "parent", "children")
+
+    def __init__(self, source: str, name: str, args: str, start: int, tag_end: int, parent: Optional["Block"]):
+        """Initializing block
+
+        Args:
+            source (str): Tokenized source
+            name (str): Lowercase block name
+            args (str): Raw text after block name in opening tag
+            start (int): Start of opening tag
+            tag_end (int): End of opening tag
+            parent (Optional[Block]): Parent block
+        """
+        self.source = source
+        self.name = name
+        self.args = args
+        self.start = start
+        self.tag_end = tag_end
+        self.inner_end = tag_end
+        self.end = tag_end
+        self.closed = False
+        self.parent = parent
+        self.children: List[Block] = []
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.name!r}, {self.start}, {self.end})"
+
+    def close(self, start: int, end: int):
+        """Close block by closing tag
+
+        Args:
+            start (int): Start of closing tag
+            end (int): End of closing tag
+        """
+        self.inner_end = start
+        self.end = end
+        self.closed = True
+
+    @property
+    def text(self) -> str:
+        """Block text with opening and closing tags
+
+        Returns:
+            str: Block text
+        """
+        return self.source[self.start:self.end]
+
+    @property
+    def inner(self) -> str:
+        """Block text between opening and closing tags
+
+        Returns:
+            str: Block content
+        """
+        return self.source[self.tag_end:self.inner_end]
+
+    def ancestor(self, name: str) -> Optional["Block"]:
+        """Get nearest ancestor block by name
+
+        Args:
+            name (str): Block name
+
+        Returns:
+            Optional[Block]: Nearest ancestor or None
+        """
+        parent = self.parent
+        while parent is not None and parent.name != name:
+            parent = parent.parent
+        return parent
+
+
+class Document:
+
+    """Block tree of tokenized source
+
+    Attributes:
+        source (str): Tokenized source
+        blocks (List[Block]): Top-level blocks
+        index (Dict[str, List[Block]]): Blocks by name in document order
+    """
+
+    def __init__(self, source: str, blocks: List[Block], index: Dict[str, List[Block]]):
+        """Initializing document
+
+        Args:
+            source (str): Tokenized source
+            blocks (List[Block]): Top-level blocks
+            index (Dict[str, List[Block]]): Blocks by name in document order
+        """
+        self.source = source
+        self.blocks = blocks
+        self.index = index
+
+    def has(self, name: str) -> bool:
+        """Check if document contains a block
+
+        Args:
+            name (str): Block name
+
+        Returns:
+            bool: Does block appear
+        """
+        return name in self.index
+
+    def find(self, name: str) -> List[Block]:
+        """Get all blocks by name
+
+        Args:
+            name (str): Block name
+
+        Returns:
+            List[Block]: Blocks in document order
+        """
+        return self.index.get(name, [])
+
+    def replace(self, replacements: Iterable[Tuple[Block, str]]) -> str:
+        """Replace blocks with text in a single pass
+
+        Args:
+            replacements (Iterable[Tuple[Block, str]]): Pairs of block and its replacement
+
+        Returns:
+            str: Source with replaced blocks
+        """
+        return splice(self.source, 0, len(self.source), replacements)
+
+
+def splice(source: str, start: int, end: int, replacements: Iterable[Tuple[Block, str]]) -> str:
+    """Get source slice with blocks replaced by text
+
+    Blocks overlapping already replaced ones are skipped.
+
+    Args:
+        source (str): Source
+        start (int): Slice start
+        end (int): Slice end
+        replacements (Iterable[Tuple[Block, str]]): Pairs of block and its replacement
+
+    Returns:
+        str: Slice with replaced blocks
+    """
+    parts = []
+    position = start
+    for block, text in sorted(replacements, key=lambda replacement: replacement[0].start):
+        if block.start < position:
+            continue
+        parts.append(source[position:block.start])
+        parts.append(text)
+        position = block.end
+    parts.append(source[position:end])
+    return "".join(parts)
+
+
+@functools.lru_cache(maxsize=None)
+def _closing(name: str) -> Pattern:
+    """Get compiled closing tag pattern
+
+    Args:
+        name (str): Block name
+
+    Returns:
+        Pattern: Closing tag pattern
+    """
+    return re.compile(r"\[\[/" + re.escape(name) + r"\s*]]", re.IGNORECASE)
+
+
+@functools.lru_cache(maxsize=8)
+def tokenize(source: str) -> Document:
+    """Tokenize source to block tree
+
+    Source is scanned once with str.find, so time is linear in source length.
+    Blocks without closing tag are treated as void blocks. A "[[" that isn't
+    closed before the next "[[" (or before the end of line, unless it opens
+    an include) is plain text. The result is memoized, so every processor
+    working on the same source shares one tree.
+
+    Args:
+        source (str): Wikidot source
+
+    Returns:
+        Document: Block tree
+    """
+    blocks: List[Block] = []
+    index: Dict[str, List[Block]] = {}
+    stack: List[Block] = []
+    opened: Dict[str, int] = {}
+    unclosed: Set[str] = set()
+    links = True
+
+    def flatten(block: Block):
+        siblings = block.parent.children if block.parent else blocks
+        for child in block.children:
+            child.parent = block.parent
+        siblings.extend(block.children)
+        block.children = []
+
+    def close(name: str, start: int, end: int):
+        while stack:
+            block = stack.pop()
+            opened[block.name] -= 1
+            if block.name == name:
+                block.close(start, end)
+                return
+            flatten(block)
+
+    position = 0
+    closing = -1
+    while True:
+        start = source.find("[[", position)
+        if start == -1:
+            break
+        if source.startswith("[[[", start) and links:
+            end = source.find("]]]", start + 3)
+            if end != -1:
+                position = end + 3
+                continue
+            links = False
+        if closing < start + 2:
+            closing = source.find("]]", start + 2)
+        end = closing
+        if end == -1:
+            break
+
+        nested = source.find("[[", start + 2, end)
+        if nested != -1:
+            position = nested
+            continue
+        newline = source.find("\n", start + 2, end)
+        if newline != -1:
+            name = source[start + 2:newline].split(None, 1)
+            if not name or name[0].lower() not in MULTILINE_BLOCKS:
+                position = start + 2
+                continue
+        position = end + 2
+
+        tag = source[start + 2:end]
+        if tag.startswith("/"):
+            name = tag[1:].strip().lower()
+            if opened.get(name):
+                close(name, start, position)
+            continue
+
+        parts = tag.split(None, 1)
+        if not parts:
+            continue
+        name = parts[0].lower()
+        args = parts[1] if len(parts) > 1 else ""
+
+        parent = stack[-1] if stack else None
+        block = Block(source, name, args, start, position, parent)
+        (parent.children if parent else blocks).append(block)
+        index.setdefault(name, []).append(block)
+
+        if name in RAW_BLOCKS or (name == "module" and args.lower().split()[:1] == ["css"]):
+            closing = _closing(name).search(source, position) if name not in unclosed else None
+            if closing:
+                block.close(closing.start(), closing.end())
+                position = closing.end()
+            else:
+                unclosed.add(name)
+        elif name not in VOID_BLOCKS:
+            stack.append(block)
+            opened[name] = opened.get(name, 0) + 1
+
+    while stack:
+        flatten(stack.pop())
+
+    return Document(source, blocks, index)
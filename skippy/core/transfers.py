@@ -0,0 +1,92 @@
+"""Bounded pool of network transfers with per-host concurrency limits
+
+Attachment downloads, uploads and removals are run at the same time, but no
+more than PER_HOST of them hit the same host at once, so a page with many
+files costs about one file's latency per batch instead of per file.
+
+Attributes:
+    MAX_WORKERS (int): Transfers run at once over all hosts
+    PER_HOST (int): Transfers run at once to the same host
+"""
+from skippy.api import Singleton
+
+from skippy.utils.logger import log
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional, Callable, Tuple, Dict, List, Any
+from urllib.parse import urlparse
+import threading
+
+
+MAX_WORKERS = 8
+
+PER_HOST = 4
+
+Progress = Callable[[int, int, List[str]], None]
+
+
+class TransferPool(metaclass=Singleton):
+
+    """Thread pool of transfers shared by all clients"""
+
+    def __init__(self, workers: int = MAX_WORKERS, per_host: int = PER_HOST):
+        """Initializing transfer pool
+
+        Args:
+            workers (int, optional): Transfers run at once over all hosts
+            per_host (int, optional): Transfers run at once to the same host
+        """
+        self.per_host = per_host
+
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="transfer")
+        self._hosts: Dict[str, threading.BoundedSemaphore] = {}
+
+    def _semaphore(self, url: str) -> threading.BoundedSemaphore:
+        """Get concurrency limit of host
+
+        Args:
+            url (str): URL or host of transfer
+
+        Returns:
+            threading.BoundedSemaphore: Host semaphore
+        """
+        host = urlparse(url).netloc or url
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = threading.BoundedSemaphore(self.per_host)
+            return self._hosts[host]
+
+    def _call(self, url: str, func: Callable[[], Any]) -> Any:
+        with self._semaphore(url):
+            return func()
+
+    def run(
+            self,
+            tasks: Dict[str, Tuple[str, Callable[[], Any]]],
+            progress: Optional[Progress] = None,
+    ) -> Tuple[Dict[str, Any], Dict[str, Exception]]:
+        """Run transfers and wait for all of them, failed transfers don't stop the others
+
+        Args:
+            tasks (Dict[str, Tuple[str, Callable[[], Any]]]): URLs (or hosts) and functions of transfers by name
+            progress (Optional[Progress], optional): Called with count of finished and all transfers and names of failed ones
+
+        Returns:
+            Tuple[Dict[str, Any], Dict[str, Exception]]: Results and errors of transfers by name
+        """
+        results, errors = {}, {}
+        if progress is not None and tasks:
+            progress(0, len(tasks), [])
+
+        futures = {self._executor.submit(self._call, url, func): name for name, (url, func) in tasks.items()}
+        for done, future in enumerate(as_completed(futures), 1):
+            name = futures[future]
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                errors[name] = e
+                log.error(f"Transfer of {name} failed: {e}")
+            if progress is not None:
+                progress(done, len(tasks), sorted(errors))
+        return results, errors
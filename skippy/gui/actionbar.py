@@ -36,6 +36,13 @@ class ActionBarBase:
             "open",
         )
 
+        self.bulk_open_action = Action(
+            Translator().translate("MENU_BAR.ACTION.FILE.BULK_OPEN_NAME"),
+            Translator().translate("MENU_BAR.ACTION.FILE.BULK_OPEN_STATUS_TIP"),
+            lambda: mainwindow.bulk_download(),
+            "open",
+        )
+
         self.upload_action = Action(
             Translator().translate("MENU_BAR.ACTION.FILE.UPLOAD_NAME"),
             Translator().translate("MENU_BAR.ACTION.FILE.UPLOAD_STATUS_TIP"),
@@ -143,6 +150,20 @@ class ActionBarBase:
             "preview",
         )
 
+        self.preview_section_action = Action(
+            Translator().translate("MENU_BAR.ACTION.EDIT.PREVIEW_SECTION_NAME"),
+            Translator().translate("MENU_BAR.ACTION.EDIT.PREVIEW_SECTION_STATUS_TIP"),
+            lambda: previewer.Previewer(
+                mainwindow.tab.currentWidget().sectionData(), mainwindow
+            ).deleteLater(),
+        )
+
+        self.live_preview_action = Action(
+            Translator().translate("MENU_BAR.ACTION.EDIT.LIVE_PREVIEW_NAME"),
+            Translator().translate("MENU_BAR.ACTION.EDIT.LIVE_PREVIEW_STATUS_TIP"),
+            lambda: mainwindow.toggle_live_preview(),
+        )
+
         self.toggle_theme_action = Action(
             Translator().translate("MENU_BAR.ACTION.SETTINGS.TOGGLE_THEME_NAME"),
             Translator().translate("MENU_BAR.ACTION.SETTINGS.TOGGLE_THEME_STATUS_TIP"),
@@ -159,6 +180,36 @@ class ActionBarBase:
             ),
         )
 
+        self.toggle_preview_race_action = Action(
+            Translator().translate("MENU_BAR.ACTION.SETTINGS.TOGGLE_RACE_NAME"),
+            Translator().translate("MENU_BAR.ACTION.SETTINGS.TOGGLE_RACE_STATUS_TIP"),
+            lambda: mainwindow.toggle_preview_race(),
+        )
+
+        self.toggle_idle_prerender_action = Action(
+            Translator().translate("MENU_BAR.ACTION.SETTINGS.TOGGLE_PRERENDER_NAME"),
+            Translator().translate("MENU_BAR.ACTION.SETTINGS.TOGGLE_PRERENDER_STATUS_TIP"),
+            lambda: mainwindow.toggle_idle_prerender(),
+        )
+
+        self.toggle_metered_action = Action(
+            Translator().translate("MENU_BAR.ACTION.SETTINGS.TOGGLE_METERED_NAME"),
+            Translator().translate("MENU_BAR.ACTION.SETTINGS.TOGGLE_METERED_STATUS_TIP"),
+            lambda: mainwindow.toggle_metered_connection(),
+        )
+
+        self.preview_cache_size_action = Action(
+            Translator().translate("MENU_BAR.ACTION.SETTINGS.PREVIEW_CACHE_SIZE_NAME"),
+            Translator().translate("MENU_BAR.ACTION.SETTINGS.PREVIEW_CACHE_SIZE_STATUS_TIP"),
+            lambda: mainwindow.set_preview_cache_size(),
+        )
+
+        self.clear_preview_cache_action = Action(
+            Translator().translate("MENU_BAR.ACTION.SETTINGS.CLEAR_PREVIEW_CACHE_NAME"),
+            Translator().translate("MENU_BAR.ACTION.SETTINGS.CLEAR_PREVIEW_CACHE_STATUS_TIP"),
+            lambda: mainwindow.clear_preview_cache(),
+        )
+
         self.elements_menu = QtWidgets.QMenu(
             Translator().translate("MENU_BAR.ACTION.EDIT.INSERT_MENU")
         )
@@ -246,6 +297,7 @@ class MenuBar(ActionBarBase, QtWidgets.QMenuBar):
         self.file_menu = self.addMenu(Translator().translate("MENU_BAR.FILE_MENU"))
         self.addAction(self.new_action, self.file_menu)
         self.addAction(self.open_action, self.file_menu, "F1")
+        self.addAction(self.bulk_open_action, self.file_menu, "Shift+F1")
         self.addAction(self.upload_action, self.file_menu, "Ctrl+S")
         self.addAction(self.upload_as_action, self.file_menu, "Ctrl+Shift+S")
         self.addAction(self.close_action, self.file_menu)
@@ -269,11 +321,18 @@ class MenuBar(ActionBarBase, QtWidgets.QMenuBar):
         self.addAction(self.find_action, self.edit_menu, "Ctrl+F")
         self.edit_menu.addSeparator()
         self.addAction(self.preview_action, self.edit_menu, "Ctrl+R")
+        self.addAction(self.preview_section_action, self.edit_menu, "Ctrl+Alt+R")
+        self.addAction(self.live_preview_action, self.edit_menu, "Ctrl+Shift+R")
         self.addMenu(self.elements_menu, self.edit_menu)
 
         self.settings_menu = self.addMenu(Translator().translate("MENU_BAR.SETTINGS_MENU"))
         self.addAction(self.toggle_theme_action, self.settings_menu)
         self.addAction(self.toggle_autocomplete_action, self.settings_menu, "Ctrl+Shift+C")
+        self.addAction(self.toggle_preview_race_action, self.settings_menu)
+        self.addAction(self.toggle_idle_prerender_action, self.settings_menu)
+        self.addAction(self.toggle_metered_action, self.settings_menu)
+        self.addAction(self.preview_cache_size_action, self.settings_menu)
+        self.addAction(self.clear_preview_cache_action, self.settings_menu)
         self.settings_menu.addSeparator()
         self.settings_menu.addMenu(self.plugins_menu)
         self.settings_menu.addMenu(self.language_menu)
@@ -0,0 +1,135 @@
+from PyQt5 import QtWidgets, QtCore, QtGui
+
+from skippy.api import ignore
+
+from skippy.core import bulk
+
+from skippy.gui import sitebox, thread, utils
+
+from skippy.utils import translator
+import skippy.config
+
+from requests.exceptions import RequestException
+from typing import Optional, List
+import pathlib
+
+
+class BulkDownloadWorker(thread.AbstractWorker):
+    page = QtCore.pyqtSignal(dict)
+    progress = QtCore.pyqtSignal(int, int, list)
+
+    def __init__(
+        self,
+        site: str,
+        text: str = "",
+        tags: Optional[str] = None,
+        category: Optional[str] = None,
+        path: Optional[pathlib.Path] = None,
+    ):
+        super(BulkDownloadWorker, self).__init__()
+        self.site = site
+        self.text = text
+        self.tags = tags
+        self.category = category
+        self.path = path
+
+    @ignore((RequestException, ValueError, KeyError), [])
+    def pages(self) -> List[str]:
+        return bulk.pages(self.site, self.text, self.tags, self.category)
+
+    def run(self):
+        pages = self.pages()
+        downloaded, failed = {}, []
+        self.progress.emit(0, len(pages), [])
+        for done, (name, pdata) in enumerate(bulk.download(self.site, pages), 1):
+            if pdata is None:
+                failed.append(name)
+            else:
+                downloaded[name] = pdata
+                if self.path is None:
+                    self.page.emit(pdata)
+            self.progress.emit(done, len(pages), sorted(failed))
+
+        if self.path is not None:
+            bulk.save(self.path, [downloaded[name] for name in pages if name in downloaded])
+        self.finished.emit()
+
+
+class BulkDownloadDialog(QtWidgets.QDialog):
+    MODES = ("PAGES", "TAGS", "CATEGORY")
+
+    def __init__(self, parent: Optional[QtWidgets.QWidget] = None):
+        super(BulkDownloadDialog, self).__init__(parent)
+        self._layout = QtWidgets.QVBoxLayout(self)
+
+        self.label = QtWidgets.QLabel(
+            translator.Translator().translate("DIALOG.BULK_DOWNLOAD_LABEL"), self
+        )
+
+        self.site_box = sitebox.SiteBox(self)
+
+        self.mode_box = QtWidgets.QComboBox(self)
+        for mode in self.MODES:
+            self.mode_box.addItem(translator.Translator().translate(f"DIALOG.BULK_MODE_{mode}"), mode)
+
+        self.query_box = QtWidgets.QPlainTextEdit(self)
+        self.query_box.setPlaceholderText(
+            translator.Translator().translate("DIALOG.BULK_QUERY_PLACEHOLDER")
+        )
+
+        self.session_box = QtWidgets.QCheckBox(
+            translator.Translator().translate("DIALOG.BULK_SAVE_SESSION"), self
+        )
+
+        self.button = QtWidgets.QPushButton(
+            translator.Translator().translate("DIALOG.OK_BUTTON"), self
+        )
+        self.button.clicked.connect(self.download)
+
+        self._layout.addWidget(self.label, alignment=QtCore.Qt.AlignCenter)
+        self._layout.addWidget(self.site_box)
+        self._layout.addWidget(self.mode_box)
+        self._layout.addWidget(self.query_box)
+        self._layout.addWidget(self.session_box)
+        self._layout.addWidget(self.button, alignment=QtCore.Qt.AlignRight)
+
+        self.setLayout(self._layout)
+
+        self.setWindowTitle(f"Skippy - {skippy.config.version}")
+        self.setWindowIcon(QtGui.QIcon((skippy.config.RESOURCES_FOLDER / "skippy.ico").as_posix()))
+        self.move(300, 300)
+        self.resize(300, 250)
+
+        self.show()
+
+    def download(self):
+        site = self.site_box.currentText()
+        mode = self.mode_box.currentData()
+        query = self.query_box.toPlainText().strip()
+        if not site or (mode == "PAGES" and not query):
+            return
+
+        path = None
+        if self.session_box.isChecked():
+            path, _ = QtWidgets.QFileDialog.getSaveFileName(
+                self, "Save file", "session.json", "JSON file (*.json)\nAll files (*.*)"
+            )
+            if not path:
+                return
+            path = pathlib.Path(path)
+
+        worker = BulkDownloadWorker(
+            site,
+            query if mode == "PAGES" else "",
+            " ".join(query.split()) if mode == "TAGS" else None,
+            query if mode == "CATEGORY" else None,
+            path,
+        )
+        self._thread = thread.Thread(worker)
+        self._thread.worker.page.connect(
+            lambda page_data: utils.getMainWindow().tab.newTab(*page_data.values())
+        )
+        self._thread.worker.progress.connect(utils.getMainWindow().show_pages_progress)
+        self._thread.start()
+
+        self.close()
@@ -12,6 +12,7 @@ from typing import Optional
 
 class DownloadWorker(thread.AbstractWorker):
     finished = QtCore.pyqtSignal(dict)
+    progress = QtCore.pyqtSignal(int, int, list)
 
     def __init__(self, site: str, page: str):
         super(DownloadWorker, self).__init__()
@@ -19,7 +20,7 @@ class DownloadWorker(thread.AbstractWorker):
         self.page = page
 
     def run(self):
-        pageData = scpclient.SCPClient().download(self.site, self.page)
+        pageData = scpclient.SCPClient().download(self.site, self.page, self.progress.emit)
         self.finished.emit(pageData)
 
 
@@ -63,9 +64,12 @@ class DownloadDialog(QtWidgets.QDialog):
         page = self.page_box.text()
 
         self._thread = thread.Thread(DownloadWorker(site, page))
-        self._thread.worker.finished.connect(
-            lambda page_data: utils.getMainWindow().tab.newTab(*page_data.values())
-        )
+        self._thread.worker.finished.connect(self.openPage)
+        self._thread.worker.progress.connect(utils.getMainWindow().show_transfer_progress)
         self._thread.start()
 
         self.close()
+
+    def openPage(self, page_data: dict):
+        if page_data:
+            utils.getMainWindow().tab.newTab(*page_data.values())
@@ -2,29 +2,36 @@ from PyQt5 import QtWidgets, QtCore, QtGui
 
 from skippy.api import PageData
 
-from skippy.core import preview
+from skippy.core import attachments, cancel, pool
 
-from skippy.gui import thread, utils
+from skippy.gui import thread, utils, webengine
 
 from skippy.utils import translator
+from skippy.utils.logger import log
 
 import skippy.config
 
 from typing import Optional
-import tempfile
 
 try:
     from PyQt5 import QtWebEngineWidgets
 
     class PreviewerWorker(thread.AbstractWorker):
-        finished = QtCore.pyqtSignal(str)
+        rendered = QtCore.pyqtSignal(str)
 
-        def __init__(self, pdata: PageData):
+        def __init__(self, pdata: PageData, channel: Optional[str] = None, background: bool = False):
             super(PreviewerWorker, self).__init__()
             self.pdata = pdata
+            self.channel = channel
+            self.background = background
 
         def run(self):
-            self.finished.emit(preview.render(self.pdata))
+            try:
+                self.rendered.emit(pool.RenderPool().render(self.pdata, self.channel, self.background)[0])
+            except cancel.RenderCancelled:
+                log.debug(f"Superseded preview render of {self.channel} was cancelled")
+            finally:
+                self.finished.emit()
 
 
     class Previewer(QtWidgets.QDialog):
@@ -32,11 +39,27 @@ try:
             super(Previewer, self).__init__(parent)
             self._layout = QtWidgets.QVBoxLayout(self)
 
-            self.webEngineView = QtWebEngineWidgets.QWebEngineView(self)
+            self.webEngineView = webengine.takeView(self)
 
-            self._thread = thread.Thread(PreviewerWorker(pdata))
-            self._thread.worker.finished.connect(self.load)
-            self._thread.start()
+            registry = attachments.AttachmentRegistry()
+            self.key = registry.key(pdata["files"])
+            if self.key is None:
+                self.key = registry.register(pdata["files"])
+                self.finished.connect(lambda: registry.unregister(self.key))
+            self.finished.connect(lambda: webengine.schemeHandler().removePage(self.key))
+
+            self.channel = f"previewer:{self.key}"
+            self.finished.connect(lambda: cancel.Generations().cancel(self.channel))
+
+            mainwindow = utils.getMainWindow()
+
+            html = mainwindow.idleRenderer.result(pdata)
+            if html is not None:
+                self.load(html)
+            else:
+                self._thread = thread.Thread(PreviewerWorker(pdata, self.channel))
+                self._thread.worker.rendered.connect(self.load)
+                self._thread.start()
 
             self._layout.addWidget(self.webEngineView)
 
@@ -45,8 +68,6 @@ try:
             self.setWindowTitle(f"Skippy - {skippy.config.version}")
             self.setWindowIcon(QtGui.QIcon((skippy.config.RESOURCES_FOLDER / "skippy.ico").as_posix()))
 
-            mainwindow = utils.getMainWindow()
-
             self.move(mainwindow.x(), mainwindow.y())
             self.resize(mainwindow.width(), mainwindow.height())
             self.setWindowState(mainwindow.windowState())
@@ -54,11 +75,8 @@ try:
             self.exec_()
 
         def load(self, html: str):
-            with tempfile.NamedTemporaryFile(
-                delete=False, suffix=".html", mode="w", encoding="utf-8"
-            ) as tmp:
-                tmp.write(html)
-                self.webEngineView.load(QtCore.QUrl.fromLocalFile(tmp.name))
+            webengine.schemeHandler().setPage(self.key, html)
+            self.webEngineView.load(QtCore.QUrl(attachments.url(self.key)))
 except ImportError:
     class Previewer(QtWidgets.QMessageBox):
         def __init__(self, _: PageData, parent: Optional[QtWidgets.QWidget] = None):
@@ -2,7 +2,7 @@ from PyQt5 import QtWidgets, QtCore, QtGui
 
 from skippy.api import PageData
 
-from skippy.gui import sitebox, workers, thread
+from skippy.gui import sitebox, workers, thread, utils
 
 from skippy.utils import translator
 import skippy.config
@@ -68,6 +68,7 @@ class UploadDialog(QtWidgets.QDialog):
             self.pdata["link"] = (site, page)
 
             self._thread = thread.Thread(workers.UploadWorker(self.pdata, comment))
+            self._thread.worker.progress.connect(utils.getMainWindow().show_transfer_progress)
             self._thread.start()
 
         self.close()
@@ -323,6 +323,19 @@ class AdvancedEditor(QtWidgets.QPlainTextEdit):
         if extra:
             self.insertPlainText(completion[-extra:])
 
+    def selectionRange(self) -> tuple[int, int]:
+        """Get selection range as indexes of toPlainText() string
+
+        Returns:
+            tuple[int, int]: Selection start and end (equal without selection)
+        """
+        cursor = self.textCursor()
+        encoded = self.toPlainText().encode("utf-16-le")
+        return tuple(
+            len(encoded[:position * 2].decode("utf-16-le", "ignore"))
+            for position in (cursor.selectionStart(), cursor.selectionEnd())
+        )
+
     def getLineUnderCursor(self):
         cursor = self.textCursor()
         cursor.select(cursor.BlockUnderCursor)
@@ -4,22 +4,28 @@ from PyQt5 import QtWidgets, QtGui, QtCore
 
 from skippy.api import PageData, critical
 
-from skippy.gui.dialogs import download, upload, login
+from skippy.core import preview, renderer
+
+from skippy.gui.dialogs import bulkdownload, download, upload, login
 from skippy.gui import (
     actionbar,
     tabwidget,
     loginstatus,
+    previewdock,
+    prerender,
     workers,
     thread,
     styles,
     settings,
     utils,
+    webengine,
 )
 
 from skippy.utils import translator, filehandlers
 
 import skippy.config
 
+from typing import List
 import pathlib
 
 
@@ -38,6 +44,9 @@ class Skippy(QtWidgets.QMainWindow):
 
         translator.Translator().load(self.settings.lang)
 
+        renderer.RendererRouter().race = self.settings.previewRace == "true"
+        webengine.setCacheSize(int(self.settings.previewCacheSize) * 1024 * 1024)
+
         self.menuBar = actionbar.MenuBar(self)
         self.toolBar = actionbar.ToolBar(self)
         self.setMenuBar(self.menuBar)
@@ -52,6 +61,16 @@ class Skippy(QtWidgets.QMainWindow):
 
         self.setCentralWidget(self.tab)
 
+        self.previewDock = previewdock.PreviewDock(self.tab, self)
+        self.tab.pageChanged.connect(self.previewDock.schedule)
+        self.addDockWidget(QtCore.Qt.RightDockWidgetArea, self.previewDock)
+        self.previewDock.setVisible(self.settings.livePreview == "true")
+
+        self.idleRenderer = prerender.IdleRenderer(self.tab, self.settings, self)
+        self.tab.pageChanged.connect(
+            lambda: self.idleRenderer.schedule() if not self.previewDock.isVisible() else None
+        )
+
         self.status = QtWidgets.QStatusBar(self)
         self.setStatusBar(self.status)
 
@@ -75,6 +94,10 @@ class Skippy(QtWidgets.QMainWindow):
         """Run page download dialog."""
         download.DownloadDialog(self)
 
+    def bulk_download(self):
+        """Run bulk page download dialog."""
+        bulkdownload.BulkDownloadDialog(self)
+
     @critical
     def upload(self, pdata: PageData):
         """Upload page at prepared URL from parent field, if don't has it run upload dialog.
@@ -84,6 +107,7 @@ class Skippy(QtWidgets.QMainWindow):
         """
         if pdata["link"]:
             uploadPageThread = thread.Thread(workers.UploadWorker(pdata))
+            uploadPageThread.worker.progress.connect(self.show_transfer_progress)
             uploadPageThread.finished.connect(
                 lambda: self.removeThread(uploadPageThread)
             )
@@ -92,6 +116,40 @@ class Skippy(QtWidgets.QMainWindow):
         else:
             self.upload_as(pdata)
 
+    def show_transfer_progress(self, done: int, total: int, failed: List[str]):
+        """Show progress of attachment transfer in status bar.
+
+        Args:
+            done (int): Count of transferred files
+            total (int): Count of all files
+            failed (List[str]): Names of failed files
+        """
+        self.show_progress("MAIN.TRANSFER_PROGRESS_LABEL", done, total, failed)
+
+    def show_pages_progress(self, done: int, total: int, failed: List[str]):
+        """Show progress of bulk page download in status bar.
+
+        Args:
+            done (int): Count of downloaded pages
+            total (int): Count of all pages
+            failed (List[str]): Names of failed pages
+        """
+        self.show_progress("MAIN.PAGES_PROGRESS_LABEL", done, total, failed)
+
+    def show_progress(self, label: str, done: int, total: int, failed: List[str]):
+        """Show progress message in status bar.
+
+        Args:
+            label (str): Translation key of message
+            done (int): Count of finished items
+            total (int): Count of all items
+            failed (List[str]): Names of failed items
+        """
+        message = translator.Translator().translate(label).format(done, total)
+        if failed:
+            message += ", " + translator.Translator().translate("MAIN.TRANSFER_FAILED_LABEL").format(", ".join(failed))
+        self.statusBar().showMessage(message)
+
     def upload_as(self, pdata: PageData):
         """Run upload dialog.
 
@@ -152,6 +210,45 @@ class Skippy(QtWidgets.QMainWindow):
         self.settings.theme = "dark" if self.settings.theme == "light" else "light"
         self.restart()
 
+    def toggle_preview_race(self):
+        """Toggle race mode of online and offline preview renderers."""
+        race = self.settings.previewRace != "true"
+        self.settings.previewRace = "true" if race else "false"
+        renderer.RendererRouter().race = race
+
+    def toggle_idle_prerender(self):
+        """Toggle background rendering of current page while typing is paused."""
+        self.settings.idlePrerender = "false" if self.settings.idlePrerender == "true" else "true"
+        self.idleRenderer.schedule()
+
+    def toggle_metered_connection(self):
+        """Toggle metered connection mode pausing background rendering."""
+        self.settings.meteredConnection = "false" if self.settings.meteredConnection == "true" else "true"
+        self.idleRenderer.schedule()
+
+    def set_preview_cache_size(self):
+        """Ask size limit of previewer cache in megabytes."""
+        size, ok = QtWidgets.QInputDialog.getInt(
+            self,
+            f"Skippy - {skippy.config.version}",
+            translator.Translator().translate("DIALOG.PREVIEW_CACHE_SIZE_LABEL"),
+            int(self.settings.previewCacheSize),
+            16,
+            16384,
+        )
+        if ok:
+            self.settings.previewCacheSize = size
+            webengine.setCacheSize(size * 1024 * 1024)
+
+    def clear_preview_cache(self):
+        """Remove cached included pages, renders, images and subresources of previewer."""
+        preview.clear_caches()
+        webengine.clearCache()
+
+    def toggle_live_preview(self):
+        """Show or hide live preview panel."""
+        self.previewDock.setVisible(not self.previewDock.isVisible())
+
     def update_translate(self, lang: str):
         """Update translate language.
 
@@ -194,6 +291,7 @@ class Skippy(QtWidgets.QMainWindow):
         self.settings.pos = self.pos()
         self.settings.state = self.windowState()
         self.settings.toolbarArea = self.toolBarArea(self.toolBar)
+        self.settings.livePreview = "true" if self.previewDock.isVisible() else "false"
 
         self.tab.save()
 
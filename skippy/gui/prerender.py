@@ -0,0 +1,119 @@
+from PyQt5 import QtCore
+
+from skippy.core import cancel, preview
+
+from skippy.gui import thread
+from skippy.gui.settings import Settings
+
+from skippy.utils.logger import log
+
+from typing import Optional, Dict, Tuple
+import time
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    from skippy.gui.dialogs.previewer import PreviewerWorker
+except ImportError:
+    PreviewerWorker = None
+
+
+def onBattery() -> bool:
+    """Check if computer runs on battery, always False without psutil
+
+    Returns:
+        bool: Is power unplugged
+    """
+    if psutil is None:
+        return False
+    try:
+        battery = psutil.sensors_battery()
+    except (AttributeError, NotImplementedError, RuntimeError, OSError):
+        return False
+    return battery is not None and not battery.power_plugged
+
+
+class IdleRenderer(QtCore.QObject):
+    """Renders current tab in background once typing has paused
+
+    Results are kept per tab, so explicit preview shows them immediately
+    while page data doesn't change. Renders run in background of render pool,
+    giving way to explicit previews, take at most budget share of time and
+    pause on battery and metered connection.
+    """
+
+    channel = "prerender"
+    budget = 0.25
+
+    def __init__(self, tabs, settings: Settings, parent: Optional[QtCore.QObject] = None):
+        super(IdleRenderer, self).__init__(parent)
+        self.tabs = tabs
+        self.settings = settings
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.startRender)
+
+        self.results: Dict[str, Tuple[str, str]] = {}
+        self._thread: Optional[thread.Thread] = None
+        self._pending = False
+        self._next = 0.0
+
+    @property
+    def paused(self) -> bool:
+        return (
+            PreviewerWorker is None
+            or self.settings.idlePrerender != "true"
+            or self.settings.meteredConnection == "true"
+            or (self.settings.prerenderOnBattery != "true" and onBattery())
+        )
+
+    def schedule(self):
+        cancel.Generations().cancel(self.channel)
+        if self.paused:
+            self.timer.stop()
+            return
+        delay = int(self.settings.idlePrerenderDelay)
+        self.timer.start(max(delay, int((self._next - time.monotonic()) * 1000)))
+
+    def result(self, pdata) -> Optional[str]:
+        tab = self.tabs.currentWidget()
+        if tab is None or tab.key not in self.results:
+            return None
+        fingerprint, html = self.results[tab.key]
+        return html if fingerprint == preview.fingerprint(pdata) else None
+
+    def startRender(self):
+        if self._thread is not None:
+            self._pending = True
+            return
+        tab = self.tabs.currentWidget()
+        if tab is None or self.paused:
+            return
+        pdata = dict(tab.pdata)
+        fingerprint = preview.fingerprint(pdata)
+        if self.results.get(tab.key, (None,))[0] == fingerprint:
+            return
+
+        key, start = tab.key, time.monotonic()
+        self._thread = thread.Thread(PreviewerWorker(pdata, self.channel, background=True))
+        self._thread.worker.rendered.connect(lambda html: self.store(key, fingerprint, html))
+        self._thread.finished.connect(lambda: self.renderFinished(start))
+        self._thread.start(QtCore.QThread.LowestPriority)
+
+    def store(self, key: str, fingerprint: str, html: str):
+        keys = {self.tabs.widget(index).key for index in range(self.tabs.count())}
+        self.results = {tab: result for tab, result in self.results.items() if tab in keys}
+        if key in keys:
+            self.results[key] = (fingerprint, html)
+            log.debug(f"Page {key} pre-rendered")
+
+    def renderFinished(self, start: float):
+        self._thread = None
+        self._next = start + (time.monotonic() - start) / self.budget
+        if self._pending:
+            self._pending = False
+            self.schedule()
@@ -0,0 +1,181 @@
+from PyQt5 import QtWidgets, QtCore
+
+from skippy.core import attachments, cancel, preview
+
+from skippy.gui import thread, webengine
+
+from skippy.utils import translator
+
+from typing import Optional, Dict
+
+PATCH_SCRIPT = """
+new QWebChannel(qt.webChannelTransport, function (channel) {
+    function bounds(name) {
+        var walker = document.createTreeWalker(document.body, NodeFilter.SHOW_COMMENT);
+        var start = null;
+        while (walker.nextNode()) {
+            if (walker.currentNode.data === "region:" + name) {
+                start = walker.currentNode;
+            } else if (start && walker.currentNode.data === "/region:" + name) {
+                return [start, walker.currentNode];
+            }
+        }
+        return null;
+    }
+
+    channel.objects.preview.updated.connect(function (name, html) {
+        var region = bounds(name);
+        if (!region) {
+            return;
+        }
+        var range = document.createRange();
+        range.setStartAfter(region[0]);
+        range.setEndBefore(region[1]);
+        range.deleteContents();
+        range.insertNode(range.createContextualFragment(html));
+    });
+});
+"""
+
+try:
+    from PyQt5 import QtWebEngineWidgets, QtWebChannel
+
+    from skippy.gui.dialogs.previewer import PreviewerWorker
+
+    class PreviewBridge(QtCore.QObject):
+        updated = QtCore.pyqtSignal(str, str)
+
+
+    class PreviewDock(QtWidgets.QDockWidget):
+        """Live preview docked next to the editor
+
+        Web engine view is taken when the dock is shown for the first time,
+        so a hidden dock doesn't slow down startup. Renders are debounced and
+        run one at a time in a worker thread, a newer render cancels the one
+        in flight. When only page regions changed, they are patched in place
+        through QWebChannel, content block by block, otherwise the page is
+        reloaded and scroll is restored.
+        """
+
+        delay = 500
+        channel = "preview-dock"
+
+        def __init__(self, tabs: QtWidgets.QTabWidget, parent: Optional[QtWidgets.QWidget] = None):
+            super(PreviewDock, self).__init__(
+                translator.Translator().translate("MENU_BAR.ACTION.EDIT.LIVE_PREVIEW_NAME"), parent
+            )
+            self.setObjectName("previewDock")
+            self.tabs = tabs
+
+            self.webEngineView: Optional[QtWebEngineWidgets.QWebEngineView] = None
+            self.bridge = PreviewBridge(self)
+            self.webChannel = QtWebChannel.QWebChannel(self)
+            self.webChannel.registerObject("preview", self.bridge)
+
+            self.timer = QtCore.QTimer(self)
+            self.timer.setSingleShot(True)
+            self.timer.setInterval(self.delay)
+            self.timer.timeout.connect(self.startRender)
+
+            self._thread: Optional[thread.Thread] = None
+            self._pending = False
+            self._renderKey: Optional[str] = None
+
+            self.key: Optional[str] = None
+            self.shell: Optional[str] = None
+            self.regions: Dict[str, str] = {}
+            self.scrolls: Dict[str, QtCore.QPointF] = {}
+            self.loaded = False
+
+            self.visibilityChanged.connect(lambda visible: self.schedule() if visible else None)
+
+        def setupView(self):
+            self.webEngineView = webengine.takeView(self)
+            self.webEngineView.loadFinished.connect(self.loadFinished)
+            self.webEngineView.page().setWebChannel(self.webChannel)
+            self.injectScript()
+            self.setWidget(self.webEngineView)
+
+        def injectScript(self):
+            qwebchannel = QtCore.QFile(":/qtwebchannel/qwebchannel.js")
+            qwebchannel.open(QtCore.QIODevice.ReadOnly)
+            source = bytes(qwebchannel.readAll()).decode("utf-8")
+            qwebchannel.close()
+
+            script = QtWebEngineWidgets.QWebEngineScript()
+            script.setName("skippy-preview-patch")
+            script.setSourceCode(source + PATCH_SCRIPT)
+            script.setInjectionPoint(QtWebEngineWidgets.QWebEngineScript.DocumentReady)
+            script.setWorldId(QtWebEngineWidgets.QWebEngineScript.MainWorld)
+            script.setRunsOnSubFrames(False)
+            self.webEngineView.page().scripts().insert(script)
+
+        def schedule(self):
+            if self.isVisible():
+                if self.webEngineView is None:
+                    self.setupView()
+                self.timer.start()
+
+        def startRender(self):
+            if self._thread is not None:
+                self._pending = True
+                cancel.Generations().cancel(self.channel)
+                return
+
+            tab = self.tabs.currentWidget()
+            if tab is None:
+                return
+
+            self._renderKey = tab.key
+            self._thread = thread.Thread(PreviewerWorker(dict(tab.pdata), self.channel))
+            self._thread.worker.rendered.connect(self.applyRender)
+            self._thread.finished.connect(self.renderFinished)
+            self._thread.start()
+
+        def renderFinished(self):
+            self._thread = None
+            if self._pending:
+                self._pending = False
+                self.startRender()
+
+        def applyRender(self, html: str):
+            key = self._renderKey
+            shell, regions = preview.regions(html)
+            webengine.schemeHandler().setPage(key, html)
+
+            tab = self.tabs.currentWidget()
+            if tab is None or tab.key != key:
+                return
+
+            if self.loaded and regions and key == self.key and shell == self.shell:
+                for name, content in preview.patches(self.regions, regions).items():
+                    self.bridge.updated.emit(name, content)
+            else:
+                if self.key is not None and self.loaded:
+                    self.scrolls[self.key] = self.webEngineView.page().scrollPosition()
+                self.loaded = False
+                self.webEngineView.load(QtCore.QUrl(attachments.url(key)))
+
+            self.key, self.shell, self.regions = key, shell, regions
+
+        def loadFinished(self, ok: bool):
+            self.loaded = ok
+            scroll = self.scrolls.get(self.key)
+            if ok and scroll is not None:
+                self.webEngineView.page().runJavaScript(f"window.scrollTo({scroll.x()}, {scroll.y()});")
+except ImportError:
+    class PreviewDock(QtWidgets.QDockWidget):
+        def __init__(self, tabs: QtWidgets.QTabWidget, parent: Optional[QtWidgets.QWidget] = None):
+            super(PreviewDock, self).__init__(
+                translator.Translator().translate("MENU_BAR.ACTION.EDIT.LIVE_PREVIEW_NAME"), parent
+            )
+            self.setObjectName("previewDock")
+            self.tabs = tabs
+
+            label = QtWidgets.QLabel(translator.Translator().translate("DIALOG.DONT_HAVE_QTWEBENGINE_LABEL"), self)
+            label.setWordWrap(True)
+            label.setAlignment(QtCore.Qt.AlignCenter)
+            self.setWidget(label)
+
+        def schedule(self):
+            pass
@@ -12,6 +12,13 @@ class Settings(QtCore.QSettings):
         "state": QtCore.Qt.WindowNoState,
         "toolbarArea": QtCore.Qt.LeftToolBarArea,
         "acEnabled": "true",
+        "previewRace": "false",
+        "livePreview": "false",
+        "idlePrerender": "true",
+        "idlePrerenderDelay": 1500,
+        "prerenderOnBattery": "false",
+        "meteredConnection": "false",
+        "previewCacheSize": 256,
     }
 
     def __init__(self):
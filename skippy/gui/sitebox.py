@@ -2,6 +2,8 @@ from PyQt5 import QtWidgets, QtCore
 
 from skippy.api import ignore
 
+from skippy.core import scpclient
+
 from skippy.gui import thread
 
 from skippy.utils import cached_property, translator, filehandlers
@@ -9,7 +11,6 @@ from skippy.utils import cached_property, translator, filehandlers
 from requests.exceptions import RequestException
 from typing import Optional, Callable, List, Any
 from urllib.parse import urlparse
-import pyscp
 
 
 class UserSitesWorker(thread.AbstractWorker):
@@ -23,7 +24,7 @@ class UserSitesWorker(thread.AbstractWorker):
     def sites(self) -> List[str]:
         return [
             urlparse(wiki.site).netloc
-            for wiki in pyscp.wikidot.User(
+            for wiki in scpclient.SCPClient().user(
                 filehandlers.ProfileHandler().load()[0]
             ).member
         ]
@@ -43,11 +44,16 @@ class SiteBox(QtWidgets.QComboBox):
         self.setEditable(True)
 
         self.setCurrentText(default)
+        self._lineEdit.editingFinished.connect(self.prewarm)
+        scpclient.SCPClient().prewarm(default)
 
         self._thread = thread.Thread(UserSitesWorker())
         self._thread.worker.finished.connect(self.addSites)
         self._thread.start()
 
+    def prewarm(self):
+        scpclient.SCPClient().prewarm(self.currentText())
+
     def addSites(self, sites: List[str]):
         self.addItems(sites)
         self.setCurrentText(self.default)
@@ -1,9 +1,10 @@
-from PyQt5 import QtWidgets
+from PyQt5 import QtWidgets, QtCore
 
 from skippy.api import critical
 
-from skippy.core import autoupdate, scpclient
+from skippy.core import autoupdate, filestore, pool, scpclient, themes
 
+from skippy.gui import webengine
 from skippy.gui.dialogs import login, updater
 from skippy.gui.mainwindow import Skippy
 
@@ -18,6 +19,15 @@ def start_ui():
     logger.log.info("Skippy was started...")
 
     scpclient.SCPClient(*filehandlers.ProfileHandler().load())
+    filestore.AttachmentStore().prune(
+        source
+        for page in filehandlers.SessionHandler().load()["session"]
+        for source in page["files"].values()
+    )
+
+    webengine.registerSchemes()
+    themes.AssetBundle().theme(None)
+    pool.RenderPool().start()
 
     exit_code = Skippy.EXIT_CODE_REBOOT
     while exit_code == Skippy.EXIT_CODE_REBOOT:
@@ -38,9 +48,12 @@ def start_ui():
             break
 
         window.show()
+        QtCore.QTimer.singleShot(webengine.WARMUP_DELAY, webengine.prewarm)
 
         exit_code = app.exec_()
+        webengine.releaseViews()
         app = None
+    pool.RenderPool().shutdown()
     logger.log.info("Skippy was stopped...")
 
     return exit_code
@@ -2,6 +2,9 @@ from PyQt5 import QtWidgets, QtCore
 
 from skippy.api import PageData, ignore
 
+from skippy.core import attachments, chunking
+from skippy.core.filestore import AttachmentStore
+
 from skippy.gui import settings, resources, editor, utils
 from skippy.gui.dialogs import filesdialog
 
@@ -9,12 +12,12 @@ from skippy.utils import translator, filehandlers
 
 from typing import Optional, List, Dict, Tuple, Any
 import pathlib
-import base64
 
 
 class ProjectList(QtWidgets.QTabWidget):
     titleChanged = QtCore.pyqtSignal(str)
     statsChanged = QtCore.pyqtSignal(str, int, int)
+    pageChanged = QtCore.pyqtSignal()
 
     def __init__(self, parent: Optional[QtWidgets.QWidget] = None):
         super(ProjectList, self).__init__(parent)
@@ -22,6 +25,7 @@ class ProjectList(QtWidgets.QTabWidget):
 
         self.tabCloseRequested.connect(self.removeTab)
         self.currentChanged.connect(lambda: self.titleChanged.emit(self.currentTitle()))
+        self.currentChanged.connect(lambda: self.pageChanged.emit())
         self.currentChanged.connect(
             lambda: self.currentWidget().statusBarStats()
             if self.currentWidget()
@@ -52,6 +56,7 @@ class ProjectList(QtWidgets.QTabWidget):
         tab.titleChanged.connect(self.setTitle)
         tab.titleChanged.connect(self.titleChanged.emit)
         tab.sourceChanged.connect(self.save)
+        tab.sourceChanged.connect(self.pageChanged.emit)
         tab.sourceChanged.connect(
             lambda: self.statsChanged.emit(
                 self.currentTitle(), *self.currentEditorStats()
@@ -74,9 +79,17 @@ class ProjectList(QtWidgets.QTabWidget):
         self.setTabText(self.currentIndex(), text)
 
     def removeTab(self, index: int):
+        widget = self.widget(index)
+        if widget:
+            attachments.AttachmentRegistry().unregister(widget.key)
         super().removeTab(index)
         self.checkCount()
 
+    def clear(self):
+        for i in range(self.count()):
+            attachments.AttachmentRegistry().unregister(self.widget(i).key)
+        super().clear()
+
     def checkCount(self):
         if not self.count():
             self.newTab()
@@ -87,7 +100,10 @@ class ProjectList(QtWidgets.QTabWidget):
             widget = self.widget(i)
             if type(widget.pdata["tags"]) == str:
                 widget.pdata["tags"] = widget.pdata["tags"].split()
-            session["session"].append(widget.pdata)
+            if path is None:
+                session["session"].append(widget.pdata)
+            else:
+                session["session"].append(dict(widget.pdata, files=AttachmentStore().inline(widget.pdata["files"])))
         session["pos"] = self.currentIndex()
 
         filehandlers.SessionHandler(path).save(session)
@@ -135,6 +151,7 @@ class TabWidget(QtWidgets.QWidget):
             "files": files,
             "link": link,
         }
+        self.key = attachments.AttachmentRegistry().register(files)
 
         self.title_box = QtWidgets.QLineEdit()
         self.title_box.setText(title)
@@ -176,12 +193,23 @@ class TabWidget(QtWidgets.QWidget):
         content = self.editor.toPlainText()
         return len(content.split()), len(content)
 
+    def sectionData(self) -> PageData:
+        """Get page data with source reduced to the section under cursor or selection
+
+        Returns:
+            PageData: Page data of section
+        """
+        page = chunking.ChunkedPage(self.pdata["source"])
+        pdata = dict(self.pdata)
+        pdata["source"] = page.excerpt(*page.section(*self.editor.selectionRange()))
+        return pdata
+
     def setData(self, param: str, data: Any):
         self.pdata[param] = data
         self.sourceChanged.emit()
 
     def uploadFile(self, filename: str, source: bytes):
-        self.pdata["files"][filename] = base64.b64encode(source).decode("utf-8")
+        self.pdata["files"][filename] = AttachmentStore().put(source)
 
     def statusBarStats(self):
         words, letters = self.editorStats()
@@ -0,0 +1,217 @@
+from PyQt5 import QtWidgets, QtCore
+
+from skippy.core import attachments, subresources, themes
+
+from skippy.utils.logger import log
+
+import skippy.config
+
+from typing import Optional, Dict, List
+from urllib.parse import urlparse, unquote
+import mimetypes
+
+WARMUP_DELAY = 1000
+
+try:
+    from PyQt5 import QtWebEngineCore, QtWebEngineWidgets
+
+    class AttachmentSchemeHandler(QtWebEngineCore.QWebEngineUrlSchemeHandler):
+        """Handler serving rendered pages and their attachments to previewer
+
+        "skippy-file://<key>/" is the rendered page of a tab and
+        "skippy-file://<key>/<name>" is its attachment, read only when requested.
+        """
+
+        def __init__(self, parent: Optional[QtCore.QObject] = None):
+            super(AttachmentSchemeHandler, self).__init__(parent)
+            self.pages: Dict[str, bytes] = {}
+
+        def setPage(self, key: str, html: str):
+            self.pages[key] = html.encode("utf-8")
+
+        def removePage(self, key: str):
+            self.pages.pop(key, None)
+
+        def requestStarted(self, job: QtWebEngineCore.QWebEngineUrlRequestJob):
+            url = job.requestUrl()
+            key, name = url.host(), unquote(url.path(QtCore.QUrl.FullyEncoded)[1:])
+
+            if name:
+                data = attachments.AttachmentRegistry().read(key, name)
+                mimetype = mimetypes.guess_type(name)[0] or "application/octet-stream"
+            else:
+                data = self.pages.get(key)
+                mimetype = "text/html"
+
+            if data is None:
+                log.debug(f"Previewer resource not found: {url.toString()}")
+                job.fail(QtWebEngineCore.QWebEngineUrlRequestJob.UrlNotFound)
+                return
+
+            buffer = QtCore.QBuffer(job)
+            buffer.setData(data)
+            buffer.open(QtCore.QIODevice.ReadOnly)
+            job.reply(mimetype.encode("utf-8"), buffer)
+
+
+    class AssetSchemeHandler(QtWebEngineCore.QWebEngineUrlSchemeHandler):
+        """Handler serving bundled theme assets and cached subresources from disk
+
+        Previewer scheme doesn't keep whether the original URL was secure, so
+        both schemes are looked up. Assets that can't be read fail, unreadable
+        cached subresources are dropped, so the next request isn't redirected
+        to disk and caches them again.
+        """
+
+        def requestStarted(self, job: QtWebEngineCore.QWebEngineUrlRequestJob):
+            url = themes.original(job.requestUrl().toString())
+            urls = [url, urlparse(url)._replace(scheme="https").geturl()]
+            if themes.AssetBundle.bundleable(url):
+                asset = next(filter(None, map(themes.AssetBundle().read, urls)), None)
+            else:
+                cache = subresources.SubresourceCache()
+                asset = next(filter(None, map(cache.read, urls)), None)
+                if asset is None:
+                    for variant in urls:
+                        cache.drop(variant)
+            if asset is None:
+                log.debug(f"Previewer asset can't be read: {url}")
+                job.fail(QtWebEngineCore.QWebEngineUrlRequestJob.UrlNotFound)
+                return
+
+            data, mimetype = asset
+            buffer = QtCore.QBuffer(job)
+            buffer.setData(data)
+            buffer.open(QtCore.QIODevice.ReadOnly)
+            job.reply(mimetype.encode("utf-8"), buffer)
+
+
+    class AssetInterceptor(QtWebEngineCore.QWebEngineUrlRequestInterceptor):
+        """Interceptor redirecting theme assets and subresources requests to disk
+
+        Theme assets that aren't bundled yet are bundled in background, other
+        subresources that aren't cached yet are cached in background.
+        """
+
+        types = (
+            QtWebEngineCore.QWebEngineUrlRequestInfo.ResourceTypeStylesheet,
+            QtWebEngineCore.QWebEngineUrlRequestInfo.ResourceTypeScript,
+            QtWebEngineCore.QWebEngineUrlRequestInfo.ResourceTypeImage,
+            QtWebEngineCore.QWebEngineUrlRequestInfo.ResourceTypeFontResource,
+            QtWebEngineCore.QWebEngineUrlRequestInfo.ResourceTypeMedia,
+        )
+
+        def interceptRequest(self, info: QtWebEngineCore.QWebEngineUrlRequestInfo):
+            url = info.requestUrl().toString()
+            if info.resourceType() not in self.types:
+                return
+            bundle, cache = themes.AssetBundle(), subresources.SubresourceCache()
+            if bundle.bundleable(url):
+                if bundle.path(url) is not None:
+                    info.redirect(QtCore.QUrl(themes.url(url)))
+                else:
+                    bundle.prefetch([url])
+            elif cache.cacheable(url):
+                if cache.cached(url):
+                    info.redirect(QtCore.QUrl(themes.url(url)))
+                else:
+                    cache.prefetch([url])
+
+
+    def registerSchemes():
+        """Register previewer URL schemes, must be called before QApplication is created"""
+        for name in (attachments.SCHEME, themes.SCHEME):
+            scheme = QtWebEngineCore.QWebEngineUrlScheme(name.encode("utf-8"))
+            scheme.setSyntax(QtWebEngineCore.QWebEngineUrlScheme.Syntax.Host)
+            scheme.setFlags(QtWebEngineCore.QWebEngineUrlScheme.CorsEnabled)
+            QtWebEngineCore.QWebEngineUrlScheme.registerScheme(scheme)
+
+    _profile: Optional[QtWebEngineWidgets.QWebEngineProfile] = None
+    _views: List[QtWebEngineWidgets.QWebEngineView] = []
+
+    def setupProfile() -> QtWebEngineWidgets.QWebEngineProfile:
+        """Set up disk HTTP cache, scheme handlers and asset interceptor of default web engine profile once
+
+        Returns:
+            QtWebEngineWidgets.QWebEngineProfile: Default profile
+        """
+        global _profile
+        if _profile is None:
+            profile = QtWebEngineWidgets.QWebEngineProfile.defaultProfile()
+            profile.setCachePath((skippy.config.CACHE_FOLDER / "web").as_posix())
+            profile.setHttpCacheType(QtWebEngineWidgets.QWebEngineProfile.DiskHttpCache)
+            profile.setHttpCacheMaximumSize(subresources.SubresourceCache().maxsize)
+            profile.installUrlSchemeHandler(attachments.SCHEME.encode("utf-8"), AttachmentSchemeHandler(profile))
+            profile.installUrlSchemeHandler(themes.SCHEME.encode("utf-8"), AssetSchemeHandler(profile))
+            profile.setUrlRequestInterceptor(AssetInterceptor(profile))
+            _profile = profile
+        return _profile
+
+    def schemeHandler() -> AttachmentSchemeHandler:
+        """Get attachments scheme handler of default web engine profile
+
+        Returns:
+            AttachmentSchemeHandler: Scheme handler
+        """
+        return setupProfile().urlSchemeHandler(attachments.SCHEME.encode("utf-8"))
+
+    def setCacheSize(size: int):
+        """Set size limit of profile HTTP cache and subresource cache, profile isn't set up by this
+
+        Args:
+            size (int): Size limit in bytes
+        """
+        subresources.SubresourceCache().maxsize = size
+        if _profile is not None:
+            _profile.setHttpCacheMaximumSize(size)
+        subresources.SubresourceCache().evict()
+
+    def clearCache():
+        """Remove profile HTTP cache and cached subresources"""
+        setupProfile().clearHttpCache()
+        subresources.SubresourceCache().clear()
+
+    def prewarm():
+        """Set up profile and start renderer process of a hidden view for the next previewer"""
+        if _views:
+            return
+        setupProfile()
+        view = QtWebEngineWidgets.QWebEngineView()
+        view.setUrl(QtCore.QUrl("about:blank"))
+        _views.append(view)
+        log.debug("Web engine view pre-warmed")
+
+    def takeView(parent: QtWidgets.QWidget) -> QtWebEngineWidgets.QWebEngineView:
+        """Get pre-warmed view (or a new one if there isn't any) and pre-warm the next one at idle time
+
+        Args:
+            parent (QtWidgets.QWidget): View parent
+
+        Returns:
+            QtWebEngineWidgets.QWebEngineView: View
+        """
+        setupProfile()
+        view = _views.pop() if _views else QtWebEngineWidgets.QWebEngineView()
+        view.setParent(parent)
+        QtCore.QTimer.singleShot(WARMUP_DELAY, prewarm)
+        return view
+
+    def releaseViews():
+        """Remove pre-warmed views, must be called before QApplication is destroyed"""
+        _views.clear()
+except ImportError:
+    def registerSchemes():
+        pass
+
+    def prewarm():
+        pass
+
+    def releaseViews():
+        pass
+
+    def setCacheSize(size: int):
+        subresources.SubresourceCache().maxsize = size
+        subresources.SubresourceCache().evict()
+
+    def clearCache():
+        subresources.SubresourceCache().clear()
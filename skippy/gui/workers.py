@@ -28,13 +28,15 @@ class FileWorker(thread.AbstractWorker):
 
 
 class UploadWorker(thread.AbstractWorker):
+    progress = QtCore.pyqtSignal(int, int, list)
+
     def __init__(self, pdata: PageData, comment: str = "Edit using Skippy"):
         super(UploadWorker, self).__init__()
         self.pdata = pdata
         self.comment = comment
 
     def run(self):
-        scpclient.SCPClient().upload(self.pdata, self.comment)
+        scpclient.SCPClient().upload(self.pdata, self.comment, self.progress.emit)
         self.finished.emit()
 
 
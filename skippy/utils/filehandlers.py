@@ -4,6 +4,8 @@ import skippy.config
 
 from typing import Optional, Tuple, Dict, Any
 from abc import ABCMeta, abstractmethod
+import threading
+import tempfile
 import pathlib
 import json
 import os
@@ -36,12 +38,14 @@ class AbstractFileHandler(metaclass=ABCMeta):
         return self.filepath.read_text()
 
     def write(self, text: str):
-        """Write file
+        """Write file atomically, readers never see it half-written
 
         Args:
             text (str): File text
         """
-        self.filepath.write_text(text)
+        with tempfile.NamedTemporaryFile("w", dir=self.filepath.parent, suffix=".tmp", delete=False) as tmp:
+            tmp.write(text)
+        os.replace(tmp.name, self.filepath)
 
     @abstractmethod
     def load(self):
@@ -119,3 +123,67 @@ class SessionHandler(AbstractFileHandler):
             session (Dict[str, Any]): Save session
         """
         self.write(json.dumps(session))
+
+
+class AttachmentManifestHandler(AbstractFileHandler):
+
+    """Manifest of remote attachments handler
+
+    Manifest maps "site/page" to attachments known to be on Wikidot, each with
+    its file id, size, SHA-256 digest and the time it was uploaded or downloaded.
+    Pages are transferred from many threads at once, so updates of the
+    manifest are serialized.
+
+    Attributes:
+        _file (str): Handled file name
+        _lock (threading.Lock): Lock of manifest updates shared by all handlers
+    """
+
+    _file = "attachments.json"
+    _lock = threading.Lock()
+
+    def load(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """Load manifest
+
+        Returns:
+            Dict[str, Dict[str, Dict[str, Any]]]: Attachments by page key and file name
+        """
+        try:
+            if os.path.exists(self.filepath) and self.read():
+                return json.loads(self.read())
+        except ValueError:
+            pass
+        return {}
+
+    def save(self, manifest: Dict[str, Dict[str, Dict[str, Any]]]):
+        """Save manifest
+
+        Args:
+            manifest (Dict[str, Dict[str, Dict[str, Any]]]): Attachments by page key and file name
+        """
+        self.write(json.dumps(manifest))
+
+    def get(self, site: str, page: str) -> Dict[str, Dict[str, Any]]:
+        """Get known attachments of page
+
+        Args:
+            site (str): Wikidot site host
+            page (str): Page name
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Attachments by file name
+        """
+        return self.load().get(f"{site}/{page}", {})
+
+    def set(self, site: str, page: str, files: Dict[str, Dict[str, Any]]):
+        """Replace known attachments of page
+
+        Args:
+            site (str): Wikidot site host
+            page (str): Page name
+            files (Dict[str, Dict[str, Any]]): Attachments by file name
+        """
+        with self._lock:
+            manifest = self.load()
+            manifest[f"{site}/{page}"] = files
+            self.save(manifest)
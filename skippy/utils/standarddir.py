@@ -13,6 +13,8 @@ def initdirs():
         makedir(skippy.config.APPDATA_FOLDER)
     makedir(skippy.config.LOGS_FOLDER)
     makedir(skippy.config.PROPERTY_FOLDER)
+    makedir(skippy.config.CACHE_FOLDER)
+    makedir(skippy.config.ASSETS_FOLDER)
     makedir(skippy.config.PLUGINS_FOLDER)
 
 
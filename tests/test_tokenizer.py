@@ -0,0 +1,16 @@
+from skippy.core.tokenizer import tokenize
+
+
+def test_unclosed_bracket_keeps_next_tag():
+    document = tokenize("text with [[ bracket\n[[include component:acs-bar]]")
+    assert [block.args for block in document.find("include")] == ["component:acs-bar"]
+
+
+def test_unclosed_link_keeps_next_tag():
+    document = tokenize("[[[broken link\n[[include foo]]")
+    assert [block.args for block in document.find("include")] == ["foo"]
+
+
+def test_include_arguments_span_lines():
+    document = tokenize("[[include foo\n| a=1\n| b=2]]")
+    assert [block.args for block in document.find("include")] == ["foo\n| a=1\n| b=2"]